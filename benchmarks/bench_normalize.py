@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Normalize Micro-benchmark
+So sánh records/s giữa chuẩn hoá từng phần tử (extract_price_smart + regex như trong
+html_parser, gọi cho mỗi sách) và batch_normalizer (pandas / NumPy vector hoá) trên
+một lô text thô tổng hợp, đồng thời kiểm tra hai cách cho cùng kết quả.
+
+Cách dùng:
+    python benchmarks/bench_normalize.py --records 200000 --repeat 3
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'crawler'))
+from batch_normalizer import normalize_batch
+from html_parser import RATING_RE, RATING_WIDTH_RE, SOLD_RE, extract_price_smart
+
+OUTPUT_FIELDS = ('discount_price', 'original_price', 'sold_count', 'sold_count_numeric', 'weight', 'rating')
+
+
+def synthetic_rows(count, seed=42):
+    """Text thô theo các dạng gặp trên trang Fahasa (kể cả trống / lỗi)"""
+    rng = random.Random(seed)
+
+    def price():
+        value = rng.randint(5, 900) * 1000 + rng.choice((0, 500))
+        return rng.choice((
+            f"{value:,}".replace(',', '.') + ' đ',
+            f"{value:,}đ",
+            str(value // 1000),
+            f"Giá: {value}",
+            '',
+            None,
+        ))
+
+    def sold():
+        return rng.choice((
+            f"Đã bán {rng.randint(1, 999)}",
+            f"Đã bán {rng.randint(1, 99)},{rng.randint(1, 9)}k+",
+            f"Đã bán {rng.randint(1, 9)}.{rng.randint(100, 999)}",
+            f"đã bán {rng.randint(1, 50)}k+",
+            '',
+            None,
+        ))
+
+    def weight():
+        return rng.choice((str(rng.randint(50, 2000)), f"{rng.randint(50, 2000)} gr",
+                           f"{rng.randint(1, 9)}.{rng.randint(0, 9)}", 'Đang cập nhật', ''))
+
+    def rating():
+        return rng.choice((f"{rng.randint(0, 5)}.{rng.randint(0, 9)}/5", f"{rng.randint(0, 5)},{rng.randint(0, 9)} / 5",
+                           '0/5', '', None))
+
+    return [{
+        'price_text': price(),
+        'original_price_text': rng.choice((price(), '')),
+        'sold_text': sold(),
+        'weight_text': weight(),
+        'rating_text': rating(),
+        'rating_style': rng.choice((f"width: {rng.randint(0, 100)}%", '', None)),
+    } for _ in range(count)]
+
+
+def normalize_row(row):
+    """Chuẩn hoá từng phần tử - cùng quy tắc html_parser dùng cho mỗi trang"""
+    discount_price = extract_price_smart(row['price_text'])
+    original_price = extract_price_smart(row['original_price_text']) or discount_price
+
+    sold_count, sold_count_numeric = '', 0
+    match = SOLD_RE.search(row['sold_text'] or '')
+    if match:
+        sold_count = match.group(1) + (match.group(2) or '')
+        try:
+            if match.group(2):
+                sold_count_numeric = int(float(match.group(1).replace(',', '.')) * 1000)
+            else:
+                num = match.group(1).replace('.', '').replace(',', '')
+                if num.isdigit():
+                    sold_count_numeric = int(num)
+        except ValueError:
+            pass
+
+    weight = 0.0
+    try:
+        weight_gram = float(re.sub(r'[^\d.]', '', row['weight_text'] or ''))
+        weight = round(weight_gram / 1000, 3) if weight_gram > 10 else weight_gram
+    except ValueError:
+        pass
+
+    rating = 0.0
+    match = RATING_RE.search(row['rating_text'] or '')
+    if match:
+        rating = float(match.group(1).replace(',', '.'))
+    else:
+        width_match = RATING_WIDTH_RE.search(row['rating_style'] or '')
+        if width_match:
+            rating = round(int(width_match.group(1)) / 20, 2)
+
+    return discount_price, original_price, sold_count, sold_count_numeric, weight, rating
+
+
+def best_of(repeat, fn):
+    """(thời gian nhanh nhất, kết quả lần cuối)"""
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def mismatches(scalar, vectorized):
+    """Số giá trị khác nhau theo từng trường"""
+    columns = {name: vectorized[name].tolist() for name in OUTPUT_FIELDS}
+    counts = {}
+    for i, row in enumerate(scalar):
+        for name, value in zip(OUTPUT_FIELDS, row):
+            if value != columns[name][i]:
+                counts[name] = counts.get(name, 0) + 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark chuẩn hoá giá / đã bán / trọng lượng / rating')
+    parser.add_argument('--records', type=int, default=200000, help='Số record tổng hợp')
+    parser.add_argument('--repeat', type=int, default=3, help='Số lần đo (lấy lần nhanh nhất)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.records, args.seed)
+    print(f"Lô tổng hợp: {len(rows):,} record")
+
+    scalar_s, scalar = best_of(args.repeat, lambda: [normalize_row(row) for row in rows])
+    vector_s, vectorized = best_of(args.repeat, lambda: normalize_batch(rows))
+
+    print(f"{'Cách':<22}{'giây':>9}{'records/s':>14}")
+    print(f"{'từng phần tử':<22}{scalar_s:>9.3f}{len(rows) / scalar_s:>14,.0f}")
+    print(f"{'vector hoá (pandas)':<22}{vector_s:>9.3f}{len(rows) / vector_s:>14,.0f}   x{scalar_s / vector_s:.1f}")
+
+    diff = mismatches(scalar, vectorized)
+    if diff:
+        print(f"❌ Kết quả khác nhau: {diff}")
+        sys.exit(1)
+    print("✅ Kết quả trùng khớp với chuẩn hoá từng phần tử")
+
+
+if __name__ == "__main__":
+    main()
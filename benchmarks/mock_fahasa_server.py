@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Mock Fahasa Server
+HTTP server cục bộ phục vụ trang danh mục và trang sản phẩm dựng lại từ các
+book dict đã crawl (data/YYYY/MM/DD/fahasa_books_*.json), cùng cấu trúc HTML
+mà html_parser / get_book_details đọc. Dùng cho benchmark không cần fahasa.com.
+
+- /sach-trong-nuoc.html?limit=24&p=N : trang danh mục (hết sản phẩm -> trang rỗng)
+- /<slug>.html                       : trang sản phẩm
+- latency_ms / jitter_ms             : độ trễ mỗi response
+- error_rate                         : tỉ lệ response 503
+
+Cách dùng:
+    python benchmarks/mock_fahasa_server.py --port 8800 --catalog-size 500 --latency-ms 80
+"""
+import argparse
+import glob
+import html
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'utils'))
+from product_url import product_key, product_slug
+
+DEFAULT_DATA_GLOB = os.path.join(os.path.dirname(__file__), '..', 'data', '2025', '11', '*', '*.json')
+LISTING_PATH = '/sach-trong-nuoc.html'
+
+
+def load_books(data_glob=DEFAULT_DATA_GLOB):
+    """Book dict duy nhất theo product_key từ các file JSON đã crawl"""
+    books = {}
+    for path in sorted(glob.glob(data_glob)):
+        with open(path, 'r', encoding='utf-8') as f:
+            for book in json.load(f):
+                key = product_key(book.get('url'))
+                if key and key not in books:
+                    books[key] = book
+    return list(books.values())
+
+
+def build_catalog(books, size=0):
+    """
+    Danh mục slug -> book. size lớn hơn số sách thật thì nhân bản sách
+    với slug / tiêu đề có hậu tố để có đủ trang cho benchmark.
+    """
+    size = size or len(books)
+    catalog = {}
+    for i in range(size):
+        book = dict(books[i % len(books)])
+        copy = i // len(books)
+        slug = product_slug(book['url'])
+        if copy:
+            slug = f"{slug}-b{copy}"
+            book['title'] = f"{book['title']} (bản {copy + 1})"
+        catalog[slug] = book
+    return catalog
+
+
+def _price(value):
+    return f"{int(value or 0):,}".replace(',', '.') + ' đ'
+
+
+def render_product(book, product_id):
+    e = lambda value: html.escape(str(value or ''))
+    specs = [
+        ('Tác giả', e(book.get('author'))),
+        ('Nhà xuất bản', e(book.get('publisher'))),
+        ('Năm XB', f"<div>{e(book.get('publish_year') or '')}</div>"),
+        ('Trọng lượng (gr)', f"<div>{round((book.get('weight') or 0) * 1000):d}</div>"),
+        ('Kích Thước Bao Bì', f"<div>{e(book.get('dimensions'))}</div>"),
+        ('Số trang', f"<div>{e(book.get('page_count') or '')}</div>"),
+    ]
+    rows = ''.join(f"<tr><th>{label}</th><td>{value}</td></tr>" for label, value in specs)
+    sold = f"<div class=\"product-view-qty-num\">Đã bán {e(book['sold_count'])}</div>" if book.get('sold_count') else ''
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{e(book['title'])}</title></head><body>
+<div class="breadcrumb"><ul>
+<li><a href="/">Trang chủ</a></li>
+<li><a href="/sach-trong-nuoc/c2.html">{e(book.get('category_2'))}</a></li>
+<li><a href="/sach-trong-nuoc/c2/c3.html">{e(book.get('category_3'))}</a></li>
+</ul></div>
+<div class="product-essential">
+<img class="fhs-p-img" src="{e(book.get('url_img'))}">
+<div class="price-box">
+<span class="price" id="product-price-{product_id}">{_price(book.get('discount_price'))}</span>
+<span class="price" id="old-price-{product_id}">{_price(book.get('original_price'))}</span>
+<span class="discount-percent">{book.get('discount_percent') or 0:g}%</span>
+</div>
+<h1>{e(book['title'])}</h1>
+<div class="product-view-sa-supplier"><span>Nhà cung cấp:</span><a href="#">{e(book.get('supplier'))}</a></div>
+<div class="product-view-sa-supplier"><span>Nhà xuất bản:</span><span>{e(book.get('publisher'))}</span></div>
+<div><span>{book.get('rating') or 0:g}/5</span></div>
+<p class="rating-links"><a href="#">({book.get('rating_count') or 0} đánh giá)</a></p>
+{sold}
+</div>
+<table class="data-table">{rows}</table>
+</body></html>"""
+
+
+def render_listing(items):
+    blocks = []
+    for slug, book in items:
+        title = html.escape(book['title'])
+        sold = f"<div class=\"sold\">Đã bán {html.escape(book['sold_count'])}</div>" if book.get('sold_count') else ''
+        blocks.append(f"""<li><div class="item-inner">
+<a href="/{slug}.html?fhs_campaign=CATEGORY" title="{title}"><img src="{html.escape(book.get('url_img') or '')}"></a>
+<h2 class="product-name-no-ellipsis"><a href="/{slug}.html?fhs_campaign=CATEGORY" title="{title}">{title}</a></h2>
+<div class="price-label"><p class="special-price"><span class="price">{_price(book.get('discount_price'))}</span></p></div>
+{sold}
+</div></li>""")
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Sách trong nước</title></head><body>
+<ul class="products-grid">{''.join(blocks)}</ul>
+</body></html>"""
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Backlog mặc định (5) làm rơi SYN khi engine async mở nhiều kết nối cùng lúc
+    request_queue_size = 128
+
+
+class MockFahasaServer:
+    """ThreadingHTTPServer chạy nền; stats đếm request theo loại trang"""
+
+    def __init__(self, catalog, port=0, latency_ms=0, jitter_ms=0, error_rate=0.0, seed=None):
+        self.catalog = catalog
+        self.slugs = list(catalog)
+        self.product_ids = {slug: i + 1 for i, slug in enumerate(self.slugs)}
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.stats = {'listing': 0, 'product': 0, 'errors': 0, 'not_found': 0}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.httpd = _Server(('127.0.0.1', port), self._handler())
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    @property
+    def listing_url(self):
+        """Template như LISTING_URL của scraper"""
+        return f"{self.base_url}{LISTING_PATH}?order=num_orders&limit={{limit}}&p={{page}}"
+
+    def _count(self, kind):
+        with self._lock:
+            self.stats[kind] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def _delay(self):
+        with self._lock:
+            delay = self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)
+            fail = self.random.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay / 1000)
+        return fail
+
+    def respond(self, path, query):
+        """(status, body) cho một request"""
+        if self._delay():
+            self._count('errors')
+            return 503, '<html><body>Service Unavailable</body></html>'
+        if path == LISTING_PATH:
+            self._count('listing')
+            limit = int(query.get('limit', ['24'])[0])
+            page = max(1, int(query.get('p', ['1'])[0]))
+            start = (page - 1) * limit
+            items = [(slug, self.catalog[slug]) for slug in self.slugs[start:start + limit]]
+            return 200, render_listing(items)
+        slug = path.strip('/')[:-len('.html')] if path.endswith('.html') else None
+        if slug in self.catalog:
+            self._count('product')
+            return 200, render_product(self.catalog[slug], self.product_ids[slug])
+        self._count('not_found')
+        return 404, '<html><body>Not Found</body></html>'
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Header và body được ghi riêng: tắt Nagle để keep-alive không bị trễ ~40ms do delayed ACK
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                status, body = server.respond(parts.path, parse_qs(parts.query))
+                payload = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock server Fahasa cho benchmark')
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--data', default=DEFAULT_DATA_GLOB, help='Glob file JSON đã crawl')
+    parser.add_argument('--catalog-size', type=int, default=0, help='Số sản phẩm (0 = số sách thật)')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    catalog = build_catalog(load_books(args.data), args.catalog_size)
+    server = MockFahasaServer(catalog, args.port, args.latency_ms, args.jitter_ms, args.error_rate)
+    print(f"Mock Fahasa: {len(catalog)} sản phẩm tại {server.listing_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Crawler Benchmark
+Chạy scrape_fahasa_bulk với từng cấu hình engine trên mock_fahasa_server
+(không truy cập fahasa.com) và báo cáo:
+    pages/s   - số trang (danh mục + sản phẩm) server trả về mỗi giây
+    books/s   - số sách ghi ra file mỗi giây
+    p50 / p95 - độ trễ trích xuất một trang sản phẩm (tải + parse, ms)
+    CPU / RSS - CPU (user + sys, gồm Chrome / chromedriver) và RSS tối đa của process crawl
+
+Mỗi lần chạy dùng một bản sao src/ trong thư mục tạm: frontier, checkpoint, file kết quả
+nằm trong bản sao (không đụng data/ thật), control logger không được nạp và không load staging.
+
+Cách dùng:
+    python benchmarks/run_benchmark.py --books 200 --engines http,http-4workers,async
+    python benchmarks/run_benchmark.py --engines selenium,selenium-js --latency-ms 80 --error-rate 0.02
+    python benchmarks/run_benchmark.py --baseline benchmarks/results/bench_20251125_101500.json
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from mock_fahasa_server import DEFAULT_DATA_GLOB, MockFahasaServer, build_catalog, load_books
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Tên cấu hình -> tham số của scrape_fahasa_bulk
+ENGINE_CONFIGS = {
+    'selenium': dict(engine='selenium'),
+    'selenium-snapshot': dict(engine='selenium', extract_mode='snapshot'),
+    'selenium-js': dict(engine='selenium', extract_mode='js'),
+    'selenium-lite': dict(engine='selenium', browser_profile='lite'),
+    'http': dict(engine='http'),
+    'http-4workers': dict(engine='http', workers=4, max_per_host=4),
+    'http-pipeline': dict(engine='http', workers=4, max_per_host=4, pipeline=True),
+    'async': dict(engine='async', concurrency=16, rate=1000.0),
+}
+DEFAULT_ENGINES = 'http,http-4workers,async'
+
+
+def percentile(values, pct):
+    """Percentile theo nearest-rank (None nếu không có giá trị)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+# ---------------------------------------------------------------------------
+# Process con: chạy scraper trong bản sao src/ và đo
+# ---------------------------------------------------------------------------
+
+def _instrument(scraper, async_crawler, latencies):
+    """Bọc hàm lấy trang sản phẩm của các engine để đo độ trễ từng trang"""
+    build_engine = scraper.build_engine
+
+    def timed_build_engine(*args, **kwargs):
+        session_factory, close_fn, listing_fn, detail_fn = build_engine(*args, **kwargs)
+
+        def timed_detail(session, url):
+            started = time.perf_counter()
+            try:
+                return detail_fn(session, url)
+            finally:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        return session_factory, close_fn, listing_fn, timed_detail
+
+    scraper.build_engine = timed_build_engine
+
+    # Async engine: từ lúc bắt đầu fetch (gồm chờ semaphore / token bucket) tới khi parse xong
+    fetch = async_crawler.AsyncHostThrottle.fetch
+    parse_book_html = async_crawler.parse_book_html
+    started_at = {}
+
+    async def timed_fetch(self, http, url):
+        started_at[url] = time.perf_counter()
+        return await fetch(self, http, url)
+
+    def timed_parse(page_html, url):
+        try:
+            return parse_book_html(page_html, url)
+        finally:
+            if url in started_at:
+                latencies.append((time.perf_counter() - started_at.pop(url)) * 1000)
+
+    async_crawler.AsyncHostThrottle.fetch = timed_fetch
+    async_crawler.parse_book_html = timed_parse
+
+
+def run_child(spec):
+    sandbox = spec['sandbox']
+    sys.path.insert(0, os.path.join(sandbox, 'src', 'crawler'))
+    import async_crawler
+    import fahasa_bulk_scraper as scraper
+
+    latencies = []
+    _instrument(scraper, async_crawler, latencies)
+    started = time.perf_counter()
+    scraper.scrape_fahasa_bulk(spec['books'], listing_url=spec['listing_url'], polite=False,
+                               load_staging=False, fresh_hours=0, **ENGINE_CONFIGS[spec['config']])
+    wall = time.perf_counter() - started
+
+    collected = 0
+    for path in glob.glob(os.path.join(sandbox, 'data', '*', '*', '*', '*.jsonl')):
+        with open(path, 'r', encoding='utf-8') as f:
+            collected += sum(1 for _ in f)
+
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    result = {
+        'wall_seconds': wall,
+        'collected': collected,
+        'latencies_ms': latencies,
+        'cpu_seconds': own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime,
+        # Linux: ru_maxrss tính bằng KB
+        'rss_mb': own.ru_maxrss / 1024,
+        'children_rss_mb': children.ru_maxrss / 1024,
+    }
+    with open(spec['result_path'], 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+
+
+# ---------------------------------------------------------------------------
+# Process cha: mock server, sandbox và báo cáo
+# ---------------------------------------------------------------------------
+
+def make_sandbox():
+    sandbox = tempfile.mkdtemp(prefix='fahasa_bench_')
+    shutil.copytree(SRC_DIR, os.path.join(sandbox, 'src'), ignore=shutil.ignore_patterns('__pycache__'))
+    return sandbox
+
+
+def run_config(server, config, books, keep_logs=False):
+    """Chạy một cấu hình trong process con; trả về dict kết quả (có 'error' nếu thất bại)"""
+    sandbox = make_sandbox()
+    spec = {
+        'sandbox': sandbox,
+        'config': config,
+        'books': books,
+        'listing_url': server.listing_url,
+        'result_path': os.path.join(sandbox, 'result.json'),
+    }
+    log_path = os.path.join(sandbox, 'crawl.log')
+    before = server.snapshot()
+    try:
+        with open(log_path, 'w', encoding='utf-8') as log:
+            code = subprocess.call([sys.executable, os.path.abspath(__file__), '--child', json.dumps(spec)],
+                                   stdout=log, stderr=subprocess.STDOUT, cwd=sandbox)
+        after = server.snapshot()
+        child = None
+        if code == 0 and os.path.exists(spec['result_path']):
+            with open(spec['result_path'], 'r', encoding='utf-8') as f:
+                child = json.load(f)
+        if not child or not child['collected']:
+            with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
+                tail = f.read()[-2000:]
+            error = f"exit {code}" if code != 0 else 'không thu thập được sách'
+            return {'config': config, 'error': error, 'log_tail': tail}
+
+        served = {k: after[k] - before[k] for k in after}
+        pages = served['listing'] + served['product']
+        wall = child['wall_seconds']
+        return {
+            'config': config,
+            'books': books,
+            'collected': child['collected'],
+            'wall_seconds': round(wall, 3),
+            'pages': pages,
+            'pages_per_sec': round(pages / wall, 2) if wall else None,
+            'books_per_sec': round(child['collected'] / wall, 2) if wall else None,
+            'p50_ms': percentile(child['latencies_ms'], 50),
+            'p95_ms': percentile(child['latencies_ms'], 95),
+            'cpu_seconds': round(child['cpu_seconds'], 2),
+            'rss_mb': round(child['rss_mb'], 1),
+            'children_rss_mb': round(child['children_rss_mb'], 1),
+            'server_errors': served['errors'],
+        }
+    finally:
+        if keep_logs:
+            print(f"   log: {log_path}")
+        else:
+            shutil.rmtree(sandbox, ignore_errors=True)
+
+
+def _fmt(value, pattern='{:.1f}'):
+    return '-' if value is None else pattern.format(value)
+
+
+def print_report(results, baseline=None):
+    baseline = {r['config']: r for r in (baseline or []) if 'error' not in r}
+    print(f"\n{'Cấu hình':<18}{'sách':>6}{'pages/s':>9}{'books/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'CPU s':>8}{'RSS MB':>8}{'lỗi 503':>9}")
+    print('-' * 85)
+    for r in results:
+        if 'error' in r:
+            print(f"{r['config']:<18} LỖI ({r['error']})")
+            continue
+        print(f"{r['config']:<18}{r['collected']:>6}{_fmt(r['pages_per_sec']):>9}{_fmt(r['books_per_sec']):>9}"
+              f"{_fmt(r['p50_ms']):>9}{_fmt(r['p95_ms']):>9}{_fmt(r['cpu_seconds']):>8}"
+              f"{_fmt(r['rss_mb'] + r['children_rss_mb']):>8}{r['server_errors']:>9}")
+        if r['collected'] < r['books']:
+            # Crawl dừng sớm (thường do lỗi 503 được inject) - tốc độ không so sánh được trực tiếp
+            print(f"{'':<18}⚠️ dừng sớm: {r['collected']}/{r['books']} sách")
+        base = baseline.get(r['config'])
+        if base and base.get('pages_per_sec') and r['pages_per_sec']:
+            speed = (r['pages_per_sec'] / base['pages_per_sec'] - 1) * 100
+            p95 = (f"{(r['p95_ms'] / base['p95_ms'] - 1) * 100:+.1f}%"
+                   if base.get('p95_ms') and r['p95_ms'] else '-')
+            print(f"{'':<18}so với baseline: pages/s {speed:+.1f}%, p95 {p95}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark crawler trên mock server cục bộ')
+    parser.add_argument('--books', type=int, default=100, help='Số sách mỗi lần chạy')
+    parser.add_argument('--engines', default=DEFAULT_ENGINES,
+                        help=f"Danh sách cấu hình, phân cách bằng dấu phẩy: {', '.join(ENGINE_CONFIGS)}")
+    parser.add_argument('--repeat', type=int, default=1, help='Số lần chạy mỗi cấu hình')
+    parser.add_argument('--data', default=DEFAULT_DATA_GLOB, help='Glob file JSON dùng dựng trang')
+    parser.add_argument('--catalog-size', type=int, default=0,
+                        help='Số sản phẩm của mock server (mặc định đủ cho --books)')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Độ trễ mỗi response')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Dao động độ trễ (±)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Tỉ lệ response 503')
+    parser.add_argument('--seed', type=int, default=42, help='Seed cho độ trễ / lỗi')
+    parser.add_argument('--baseline', help='File kết quả trước đó để so sánh')
+    parser.add_argument('--output', help='File JSON kết quả (mặc định benchmarks/results/bench_<thời gian>.json)')
+    parser.add_argument('--keep-logs', action='store_true', help='Giữ thư mục tạm và log crawl')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(json.loads(args.child))
+        return
+
+    configs = [name.strip() for name in args.engines.split(',') if name.strip()]
+    unknown = [name for name in configs if name not in ENGINE_CONFIGS]
+    if unknown:
+        parser.error(f"Cấu hình không hợp lệ: {', '.join(unknown)}")
+
+    books = load_books(args.data)
+    if not books:
+        parser.error(f"Không có dữ liệu sách: {args.data}")
+    catalog = build_catalog(books, args.catalog_size or max(args.books + 24, len(books)))
+    server = MockFahasaServer(catalog, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                              error_rate=args.error_rate, seed=args.seed).start()
+    print(f"Mock server: {len(catalog)} sản phẩm tại {server.base_url} "
+          f"(trễ {args.latency_ms:g}±{args.jitter_ms:g} ms, lỗi {args.error_rate:.0%})")
+
+    results = []
+    try:
+        for config in configs:
+            for run in range(1, args.repeat + 1):
+                print(f"▶ {config} (lần {run}/{args.repeat}) - {args.books} sách...")
+                results.append(run_config(server, config, args.books, args.keep_logs))
+                if 'error' in results[-1]:
+                    print(results[-1]['log_tail'])
+    finally:
+        server.stop()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    print_report(results, baseline)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'created_at': datetime.now().isoformat(),
+            'settings': {k: v for k, v in vars(args).items() if k not in ('child', 'output', 'baseline')},
+            'results': results,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\nĐã lưu kết quả: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Async Crawler Engine
+Phiên bản asyncio của vòng crawl: trang danh mục và trang sản phẩm được tải
+đồng thời (aiohttp), giới hạn bằng semaphore theo host và token bucket.
+"""
+import asyncio
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+import aiohttp
+
+from html_parser import parse_book_html, parse_listing_html
+from http_fetcher import DEFAULT_HEADERS, LISTING_RETRIES, LISTING_RETRY_DELAY, REQUEST_TIMEOUT
+from page_cache import CacheMiss
+
+
+class TokenBucket:
+    """Token bucket: trung bình `rate` request/giây, cho phép burst tối đa `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncHostThrottle:
+    """
+    Mỗi host có một semaphore (số request đồng thời) và một token bucket.
+    Trang còn hạn trong cache được trả về ngay, không tốn token.
+    """
+
+    def __init__(self, concurrency=8, rate=4.0, burst=None, cache=None):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.cache = cache
+        self._hosts = {}
+
+    def _limits(self, url):
+        host = urlparse(url).netloc.lower()
+        if host not in self._hosts:
+            self._hosts[host] = (asyncio.Semaphore(self.concurrency),
+                                 TokenBucket(self.rate, self.burst))
+        return self._hosts[host]
+
+    async def fetch(self, http, url):
+        cache = self.cache
+        entry = cache.lookup(url) if cache else None
+        if entry and (entry['fresh'] or cache.offline):
+            cache.record('hit')
+            return entry['body']
+        if cache and cache.offline:
+            cache.record('miss')
+            raise CacheMiss(f"không có trong cache: {url}")
+
+        semaphore, bucket = self._limits(url)
+        async with semaphore:
+            await bucket.acquire()
+            headers = cache.conditional_headers(entry) if entry else {}
+            async with http.get(url, headers=headers) as response:
+                if entry and response.status == 304:
+                    cache.revalidated(url)
+                    cache.record('revalidated')
+                    return entry['body']
+                response.raise_for_status()
+                body = await response.text()
+        if cache:
+            cache.store(url, body, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            cache.record('miss')
+        return body
+
+
+async def crawl_async(listing_url, target_books, concurrency=8, rate=4.0, burst=None,
+                      prefetch_pages=2, books_per_page=24, on_result=None, cache=None, archive=None):
+    """
+    Crawl tối đa target_books sách, gọi on_result(book) ngay khi parse xong.
+    listing_url: template có {limit} và {page}
+    cache: PageCache dùng chung (None = luôn tải qua mạng)
+    archive: HtmlArchive lưu HTML trang sản phẩm (None = không lưu)
+    Returns: (collected, failed)
+    """
+    throttle = AsyncHostThrottle(concurrency, rate, burst, cache)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    stats = {'collected': 0, 'failed': 0}
+    seen = set()
+    backlog = deque()
+    pending = set()
+    next_page = 1
+    exhausted = False
+
+    async with aiohttp.ClientSession(headers=DEFAULT_HEADERS, timeout=timeout) as http:
+
+        async def load_listing(page):
+            url = listing_url.format(limit=books_per_page, page=page)
+            for attempt in range(LISTING_RETRIES + 1):
+                try:
+                    return parse_listing_html(await throttle.fetch(http, url), url)
+                except Exception as e:
+                    print(f"Lỗi trang {page} (lần {attempt + 1}): {e}")
+                if attempt < LISTING_RETRIES:
+                    await asyncio.sleep(LISTING_RETRY_DELAY * (attempt + 1))
+            return []
+
+        async def load_detail(url):
+            try:
+                page_html = await throttle.fetch(http, url)
+                if archive:
+                    archive.write(url, page_html)
+                book = parse_book_html(page_html, url)
+            except Exception as e:
+                print(f"    Lỗi {url}: {e}")
+                book = None
+            if book is None:
+                stats['failed'] += 1
+                return
+            if stats['collected'] >= target_books:
+                return
+            stats['collected'] += 1
+            if on_result:
+                on_result(book)
+            print(f"    ✅ {book['title'][:50]} - 📊 {stats['collected']}/{target_books}")
+
+        try:
+            while stats['collected'] < target_books:
+                need = target_books - stats['collected'] - len(pending)
+                while need > 0 and backlog:
+                    pending.add(asyncio.create_task(load_detail(backlog.popleft())))
+                    need -= 1
+
+                if need > 0 and not exhausted:
+                    pages = range(next_page, next_page + prefetch_pages)
+                    next_page += prefetch_pages
+                    print(f"\nTải trang danh mục {pages.start}-{pages.stop - 1}...")
+                    added = 0
+                    for product_urls in await asyncio.gather(*(load_listing(p) for p in pages)):
+                        if not product_urls:
+                            exhausted = True
+                            break
+                        for url in product_urls:
+                            if url not in seen:
+                                seen.add(url)
+                                backlog.append(url)
+                                added += 1
+                    # Trang vượt quá cuối danh mục thường lặp lại trang cuối
+                    if added == 0:
+                        exhausted = True
+                    continue
+
+                if not pending:
+                    break
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    return stats['collected'], stats['failed']
+
+
+def run_async_crawl(listing_url, target_books, **kwargs):
+    return asyncio.run(crawl_async(listing_url, target_books, **kwargs))
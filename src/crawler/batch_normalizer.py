@@ -0,0 +1,146 @@
+"""
+Batch Normalizer
+Chuẩn hoá text thô của cả một lô sách bằng thao tác chuỗi vector hoá của
+pandas / NumPy với regex biên dịch sẵn (dùng chung với html_parser), thay vì gọi
+extract_price_smart / regex cho từng phần tử. Quy tắc giống hệt bản từng phần tử:
+- giá (price_text, original_price_text): chỉ giữ chữ số; < 1000 thì x1000; trống -> 0
+- đã bán (sold_text): 'Đã bán 1,2k+' -> ('1,2k+', 1200), 'Đã bán 1.234' -> ('1.234', 1234)
+- trọng lượng (weight_text): gram > 10 -> kg làm tròn 3 chữ số, còn lại giữ nguyên
+- rating (rating_text, rating_style): 'X/5' -> X, nếu không có thì 'width: N%' -> N / 20
+
+Mỗi cột được factorize trước: regex chỉ chạy trên các giá trị khác nhau, kết quả
+trải lại bằng np.take.
+
+Dùng trong reparse_archive.py: parse_book_html(html, url, raw) ghi text thô của trọng
+lượng / rating / đã bán vào raw, mỗi nhóm trang được chuẩn hoá một lần.
+
+Benchmark: python benchmarks/bench_normalize.py --records 200000
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from html_parser import RATING_RE, RATING_WIDTH_RE, SOLD_RE
+
+RAW_COLUMNS = ('price_text', 'original_price_text', 'sold_text', 'weight_text', 'rating_text', 'rating_style')
+NON_DIGIT_RE = re.compile(r'\D')
+NON_DECIMAL_RE = re.compile(r'[^\d.]')
+
+
+def _factorize(values):
+    """(codes, uniques: Series chuỗi) - None / NaN coi như ''"""
+    series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    codes, uniques = pd.factorize(series.fillna('').astype(str))
+    return codes, pd.Series(uniques, dtype=object)
+
+
+def _per_unique(fn):
+    """
+    Text thô lặp lại rất nhiều trong một lô (cùng giá, '0/5', 'Đã bán 1,2k+'...):
+    chạy fn (thao tác chuỗi vector hoá) trên các giá trị khác nhau rồi trải lại theo mã
+    factorize bằng np.take, thay vì xử lý lại từng dòng.
+    """
+    def normalize(values):
+        codes, uniques = _factorize(values)
+        result = fn(uniques)
+        if isinstance(result, tuple):
+            return tuple(np.take(np.asarray(part), codes) for part in result)
+        return np.take(result, codes)
+    normalize.__doc__ = fn.__doc__
+    return normalize
+
+
+def _numbers(strings):
+    """to_numeric kiểu float64, chuỗi không hợp lệ -> NaN"""
+    return pd.to_numeric(strings.where(strings != ''), errors='coerce').astype('float64').to_numpy()
+
+
+@_per_unique
+def normalize_prices(texts):
+    """Mảng float64 giá theo quy tắc extract_price_smart"""
+    price = _numbers(texts.str.replace(NON_DIGIT_RE, '', regex=True))
+    price = np.where(price < 1000, price * 1000, price)
+    return np.where(price >= 1000, price, 0.0)
+
+
+@_per_unique
+def normalize_sold(texts):
+    """(sold_count: mảng chuỗi, sold_count_numeric: mảng int64)"""
+    parts = texts.str.extract(SOLD_RE)
+    amount, thousands = parts[0], parts[1]
+    matched = amount.notna().to_numpy()
+    is_k = thousands.notna().to_numpy()
+    amount = amount.fillna('')
+
+    sold_count = (amount + thousands.fillna('')).where(matched, '').to_numpy(dtype=object)
+    k_value = np.trunc(_numbers(amount.str.replace(',', '.', regex=False)) * 1000)
+    plain = amount.str.replace('.', '', regex=False).str.replace(',', '', regex=False)
+    plain_value = _numbers(plain.where(plain.str.fullmatch(r'\d+'), ''))
+    numeric = np.where(is_k, k_value, plain_value)
+    return sold_count, np.nan_to_num(numeric, nan=0.0).astype('int64')
+
+
+@_per_unique
+def normalize_weights(texts):
+    """Mảng float64 kg (không đọc được -> 0.0)"""
+    gram = _numbers(texts.str.replace(NON_DECIMAL_RE, '', regex=True))
+    weight = np.where(gram > 10, np.round(gram / 1000, 3), gram)
+    return np.nan_to_num(weight, nan=0.0)
+
+
+@_per_unique
+def _rating_scores(texts):
+    """Điểm từ 'X/5' (NaN nếu không có)"""
+    return _numbers(texts.str.extract(RATING_RE)[0].fillna('').str.replace(',', '.', regex=False))
+
+
+@_per_unique
+def _rating_widths(styles):
+    """Điểm từ 'width: N%' (NaN nếu không có)"""
+    return np.round(_numbers(styles.str.extract(RATING_WIDTH_RE)[0].fillna('')) / 20, 2)
+
+
+def normalize_ratings(texts, styles=None):
+    """Mảng float64 điểm rating /5 (không có -> 0.0)"""
+    score = _rating_scores(texts)
+    if styles is not None:
+        score = np.where(np.isnan(score), _rating_widths(styles), score)
+    return np.nan_to_num(score, nan=0.0)
+
+
+def normalize_batch(raw):
+    """
+    raw: DataFrame hoặc list dict có các cột RAW_COLUMNS (thiếu cột = trống).
+    Trả về DataFrame: discount_price, original_price, sold_count, sold_count_numeric, weight, rating.
+    original_price trống thì bằng discount_price (như crawler khi chỉ thấy một giá).
+    """
+    if isinstance(raw, pd.DataFrame):
+        frame = raw
+        column = lambda name: frame[name] if name in frame else [None] * len(frame)
+    else:
+        # Tách cột trực tiếp từ list dict, nhanh hơn dựng DataFrame đầy đủ
+        rows = list(raw)
+        frame = pd.DataFrame(index=range(len(rows)))
+        column = lambda name: [row.get(name) for row in rows]
+
+    discount_price = normalize_prices(column('price_text'))
+    original_price = normalize_prices(column('original_price_text'))
+    sold_count, sold_count_numeric = normalize_sold(column('sold_text'))
+    return pd.DataFrame({
+        'discount_price': discount_price,
+        'original_price': np.where(original_price > 0, original_price, discount_price),
+        'sold_count': sold_count,
+        'sold_count_numeric': sold_count_numeric,
+        'weight': normalize_weights(column('weight_text')),
+        'rating': normalize_ratings(column('rating_text'), column('rating_style')),
+    }, index=frame.index)
+
+
+def apply_to_records(records, normalized):
+    """Ghi các cột đã chuẩn hoá vào BookRecord / book dict tương ứng (cùng thứ tự)"""
+    columns = list(normalized.columns)
+    for record, values in zip(records, normalized.itertuples(index=False, name=None)):
+        for name, value in zip(columns, values):
+            record[name] = value.item() if isinstance(value, np.generic) else value
+    return records
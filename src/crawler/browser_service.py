@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+"""
+Browser Session Service
+Giữ sẵn một pool Chrome "ấm" (remote debugging port) để crawler gắn vào qua
+chromedriver + debuggerAddress thay vì khởi động Chrome mới mỗi lần chạy.
+- chromedriver được phân giải offline từ cache (không gọi mạng mỗi lần chạy)
+- registry SQLite: mỗi Chrome được cho thuê (lease) cho đúng một worker; lease ngắn
+  được crawler gia hạn định kỳ (heartbeat) kèm số trang đã tải, crawler chết thì
+  Chrome tự rảnh lại sau LEASE_SECONDS
+- Chrome được khởi động lại sau N trang hoặc khi RAM vượt ngưỡng (cần psutil); crawler
+  đang thuê Chrome đó chuyển sang Chrome khác trước lần tải trang kế tiếp
+
+Cách dùng:
+    python src/crawler/browser_service.py --size 2 [--profile lite] [--max-pages 300] [--max-rss-mb 1500]
+    python src/crawler/fahasa_bulk_scraper.py --browser-service ...
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import shutil
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.support.event_firing_webdriver import EventFiringWebDriver
+from selenium.webdriver.support.events import AbstractEventListener
+
+from chrome_profile import BROWSER_PROFILES, block_resources
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
+from state_file import write_json_atomic
+
+STATE_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'data', '.crawl_state')
+DEFAULT_REGISTRY_DB = os.path.join(STATE_DIR, 'browser_service.db')
+DRIVER_PATH_FILE = os.path.join(STATE_DIR, 'chromedriver_path.json')
+
+DEFAULT_BASE_PORT = 9300
+DEFAULT_MAX_PAGES = 300
+DEFAULT_MAX_RSS_MB = 1500
+LEASE_SECONDS = 300
+HEARTBEAT_SECONDS = 60
+# Báo số trang cho service sớm hơn heartbeat khi crawler tải nhanh
+REPORT_EVERY_PAGES = 25
+
+CHROME_CANDIDATES = ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome')
+WINDOWS_CHROME_PATHS = (
+    r'C:\Program Files\Google\Chrome\Application\chrome.exe',
+    r'C:\Program Files (x86)\Google\Chrome\Application\chrome.exe',
+)
+
+
+# ---------------------------------------------------------------------------
+# Phân giải binary (offline)
+# ---------------------------------------------------------------------------
+
+VERSION_RE = re.compile(r'(\d+)\.\d+')
+
+
+def binary_major_version(path):
+    """Major version từ '<binary> --version' (Chrome / chromedriver); None nếu không đọc được"""
+    try:
+        output = subprocess.run([path, '--version'], capture_output=True, text=True, timeout=15).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = VERSION_RE.search(output or '')
+    return int(match.group(1)) if match else None
+
+
+def installed_chrome_major():
+    try:
+        return binary_major_version(resolve_chrome_binary())
+    except FileNotFoundError:
+        return None
+
+
+def _driver_matches(path, chrome_major):
+    """chromedriver dùng được với Chrome đã cài (không biết version thì coi như được)"""
+    if not path or not os.path.exists(path):
+        return False
+    if chrome_major is None:
+        return True
+    driver_major = binary_major_version(path)
+    return driver_major is None or driver_major == chrome_major
+
+
+def resolve_driver_path():
+    """
+    Đường dẫn chromedriver không cần mạng: CHROMEDRIVER_PATH, đường dẫn đã lưu,
+    cache của webdriver_manager (~/.wdm), PATH - chỉ nhận bản cùng major version với
+    Chrome đã cài, để Chrome tự cập nhật không làm hỏng mọi lần khởi động. Chỉ khi
+    không có mới gọi ChromeDriverManager().install() và lưu lại kết quả.
+    """
+    env_path = os.environ.get('CHROMEDRIVER_PATH')
+    if env_path and os.path.exists(env_path):
+        return env_path
+
+    chrome_major = installed_chrome_major()
+    try:
+        with open(DRIVER_PATH_FILE, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved.get('chrome_major') == chrome_major and _driver_matches(saved.get('path'), chrome_major):
+            return saved['path']
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    binary = 'chromedriver.exe' if os.name == 'nt' else 'chromedriver'
+    cached = glob.glob(os.path.join(os.path.expanduser('~'), '.wdm', 'drivers', 'chromedriver', '**', binary),
+                       recursive=True)
+    candidates = sorted(cached, key=os.path.getmtime, reverse=True) + [shutil.which('chromedriver')]
+    path = next((c for c in candidates if _driver_matches(c, chrome_major)), None)
+    if not path:
+        from webdriver_manager.chrome import ChromeDriverManager
+        path = ChromeDriverManager().install()
+
+    write_json_atomic(DRIVER_PATH_FILE, {'path': path, 'chrome_major': chrome_major})
+    return path
+
+
+def forget_driver_path():
+    """Xoá đường dẫn đã lưu (chromedriver không khởi động được) để lần sau phân giải lại"""
+    try:
+        os.remove(DRIVER_PATH_FILE)
+    except OSError:
+        pass
+
+
+def resolve_chrome_binary():
+    env_path = os.environ.get('CHROME_BINARY')
+    if env_path and os.path.exists(env_path):
+        return env_path
+    for name in CHROME_CANDIDATES:
+        path = shutil.which(name)
+        if path:
+            return path
+    for path in WINDOWS_CHROME_PATHS:
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError("Không tìm thấy Chrome (đặt biến môi trường CHROME_BINARY)")
+
+
+# ---------------------------------------------------------------------------
+# Registry dùng chung giữa service và crawler
+# ---------------------------------------------------------------------------
+
+class BrowserRegistry:
+    def __init__(self, path=DEFAULT_REGISTRY_DB):
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS browsers (
+                port INTEGER PRIMARY KEY,
+                pid INTEGER NOT NULL,
+                started_at REAL NOT NULL,
+                pages INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_until REAL,
+                retiring INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.commit()
+
+    def register(self, port, pid):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO browsers (port, pid, started_at) VALUES (?, ?, ?)",
+                (port, pid, time.time())
+            )
+            self.conn.commit()
+
+    def remove(self, port):
+        with self._lock:
+            self.conn.execute("DELETE FROM browsers WHERE port = ?", (port,))
+            self.conn.commit()
+
+    def lease(self, owner, lease_seconds=LEASE_SECONDS):
+        """Thuê một Chrome rảnh; trả về port hoặc None"""
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            row = self.conn.execute("""
+                SELECT port FROM browsers
+                WHERE retiring = 0 AND (lease_owner IS NULL OR lease_until < ?)
+                ORDER BY pages LIMIT 1
+            """, (now,)).fetchone()
+            if row:
+                self.conn.execute(
+                    "UPDATE browsers SET lease_owner = ?, lease_until = ? WHERE port = ?",
+                    (owner, now + lease_seconds, row[0])
+                )
+            self.conn.commit()
+        return row[0] if row else None
+
+    def heartbeat(self, port, owner, pages=0, lease_seconds=LEASE_SECONDS):
+        """Gia hạn lease và cộng số trang mới tải. Trả về (còn giữ lease, retiring)"""
+        with self._lock:
+            self.conn.execute("UPDATE browsers SET pages = pages + ? WHERE port = ?", (pages, port))
+            held = self.conn.execute(
+                "UPDATE browsers SET lease_until = ? WHERE port = ? AND lease_owner = ?",
+                (time.time() + lease_seconds, port, owner)
+            ).rowcount > 0
+            row = self.conn.execute("SELECT retiring FROM browsers WHERE port = ?", (port,)).fetchone()
+            self.conn.commit()
+        return held, bool(row and row[0])
+
+    def release(self, port, pages=0, owner=None):
+        """Trả Chrome kèm số trang chưa báo; owner: chỉ xoá lease nếu vẫn là của owner"""
+        with self._lock:
+            self.conn.execute("UPDATE browsers SET pages = pages + ? WHERE port = ?", (pages, port))
+            if owner is None:
+                self.conn.execute("UPDATE browsers SET lease_owner = NULL, lease_until = NULL WHERE port = ?",
+                                  (port,))
+            else:
+                self.conn.execute(
+                    "UPDATE browsers SET lease_owner = NULL, lease_until = NULL WHERE port = ? AND lease_owner = ?",
+                    (port, owner)
+                )
+            self.conn.commit()
+
+    def mark_retiring(self, port):
+        """Không cho thuê nữa; service khởi động lại khi lease hiện tại kết thúc"""
+        with self._lock:
+            self.conn.execute("UPDATE browsers SET retiring = 1 WHERE port = ?", (port,))
+            self.conn.commit()
+
+    def rows(self):
+        with self._lock:
+            cursor = self.conn.execute(
+                "SELECT port, pid, started_at, pages, lease_owner, lease_until, retiring FROM browsers"
+            )
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Service: khởi động, theo dõi và tái tạo Chrome
+# ---------------------------------------------------------------------------
+
+def _wait_for_devtools(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/version", timeout=2):
+                return True
+        except OSError:
+            time.sleep(0.3)
+    return False
+
+
+def browser_rss_mb(pid):
+    """RAM của Chrome và các process con (None nếu không có psutil)"""
+    if psutil is None:
+        return None
+    try:
+        parent = psutil.Process(pid)
+        processes = [parent] + parent.children(recursive=True)
+        return sum(p.memory_info().rss for p in processes) / 1024 / 1024
+    except psutil.Error:
+        return 0.0
+
+
+class BrowserService:
+    def __init__(self, size=2, base_port=DEFAULT_BASE_PORT, max_pages=DEFAULT_MAX_PAGES,
+                 max_rss_mb=DEFAULT_MAX_RSS_MB, profile='full', registry_path=DEFAULT_REGISTRY_DB):
+        self.size = size
+        self.ports = [base_port + i for i in range(size)]
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.profile = profile
+        self.registry = BrowserRegistry(registry_path)
+        self.chrome_binary = resolve_chrome_binary()
+        self._processes = {}
+        self._profile_dirs = {}
+        self._running = True
+
+    def _chrome_args(self, port):
+        profile_dir = self._profile_dirs.setdefault(port, tempfile.mkdtemp(prefix=f'fahasa-chrome-{port}-'))
+        args = [
+            self.chrome_binary,
+            f'--remote-debugging-port={port}',
+            f'--user-data-dir={profile_dir}',
+            '--no-first-run',
+            '--no-default-browser-check',
+            '--no-sandbox',
+            '--disable-dev-shm-usage',
+            '--disable-blink-features=AutomationControlled',
+        ]
+        if self.profile == 'lite':
+            args += ['--headless=new', '--window-size=1366,900', '--blink-settings=imagesEnabled=false']
+        return args + ['about:blank']
+
+    def launch(self, port):
+        process = subprocess.Popen(self._chrome_args(port), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if not _wait_for_devtools(port):
+            process.kill()
+            raise RuntimeError(f"Chrome trên port {port} không phản hồi DevTools")
+        self._processes[port] = process
+        self.registry.register(port, process.pid)
+        print(f"Chrome sẵn sàng trên port {port} (pid {process.pid})")
+
+    def stop(self, port):
+        process = self._processes.pop(port, None)
+        self.registry.remove(port)
+        if process and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def recycle(self, port, reason):
+        print(f"Tái tạo Chrome port {port}: {reason}")
+        self.stop(port)
+        self.launch(port)
+
+    def check(self):
+        """Một vòng kiểm tra: Chrome chết, quá số trang hoặc quá RAM"""
+        rows = {row['port']: row for row in self.registry.rows()}
+        for port in self.ports:
+            process = self._processes.get(port)
+            row = rows.get(port)
+            if process is None or process.poll() is not None or row is None:
+                self.recycle(port, 'process đã dừng')
+                continue
+
+            reason = None
+            if row['pages'] >= self.max_pages:
+                reason = f"{row['pages']} trang"
+            else:
+                rss = browser_rss_mb(process.pid)
+                if rss is not None and rss > self.max_rss_mb:
+                    reason = f"RAM {rss:.0f} MB"
+            if reason and not row['retiring']:
+                self.registry.mark_retiring(port)
+                row['retiring'] = 1
+            leased = row['lease_owner'] is not None and (row['lease_until'] or 0) > time.time()
+            if row['retiring'] and not leased:
+                self.recycle(port, reason or 'đánh dấu retiring')
+
+    def run(self, poll_seconds=5):
+        for port in self.ports:
+            self.launch(port)
+        print(f"Browser service: {self.size} Chrome ({self.profile}), Ctrl+C để dừng")
+        try:
+            while self._running:
+                time.sleep(poll_seconds)
+                self.check()
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        self._running = False
+        for port in list(self._processes):
+            self.stop(port)
+        for profile_dir in self._profile_dirs.values():
+            shutil.rmtree(profile_dir, ignore_errors=True)
+        self.registry.close()
+
+
+# ---------------------------------------------------------------------------
+# Phía crawler: gắn vào Chrome đang chạy
+# ---------------------------------------------------------------------------
+
+def _connect_chrome(port, profile='full'):
+    options = Options()
+    options.debugger_address = f"127.0.0.1:{port}"
+    if profile == 'lite':
+        options.page_load_strategy = 'eager'
+    raw_driver = webdriver.Chrome(service=Service(resolve_driver_path()), options=options)
+    if profile == 'lite':
+        block_resources(raw_driver)
+    raw_driver.set_page_load_timeout(30)
+    return raw_driver
+
+
+class ServiceLease(AbstractEventListener):
+    """
+    Lease Chrome của một driver: đếm trang đã tải; luồng nền gia hạn lease và báo số trang
+    mỗi HEARTBEAT_SECONDS (hoặc sau REPORT_EVERY_PAGES trang). Khi service đánh dấu Chrome
+    là retiring hoặc lease đã mất, ServiceDriver gắn sang Chrome rảnh khác ngay trước lần
+    tải trang kế tiếp (dựng EventFiringWebDriver mới quanh driver mới).
+    """
+
+    def __init__(self, registry, owner, port, profile='full'):
+        self.registry = registry
+        self.owner = owner
+        self.port = port
+        self.profile = profile
+        # EventFiringWebDriver bọc Chrome (listener chỉ nhận driver bên trong)
+        self.driver = None
+        self.pages = 0
+        self._unreported = 0
+        self._lock = threading.Lock()
+        self._rotate = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._heartbeat_loop, name=f"browser-lease-{port}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _take_unreported(self):
+        with self._lock:
+            pages, self._unreported = self._unreported, 0
+            return self.port, pages
+
+    def heartbeat(self):
+        port, pages = self._take_unreported()
+        held, retiring = self.registry.heartbeat(port, self.owner, pages)
+        if (retiring or not held) and port == self.port:
+            self._rotate.set()
+
+    def _heartbeat_loop(self):
+        while not self._stopped.wait(HEARTBEAT_SECONDS):
+            try:
+                self.heartbeat()
+            except sqlite3.Error as e:
+                print(f"Heartbeat browser service lỗi: {e}")
+
+    def rotate_if_needed(self):
+        if self._rotate.is_set() and self.driver is not None:
+            self._switch()
+
+    def after_navigate_to(self, url, driver):
+        with self._lock:
+            self.pages += 1
+            self._unreported += 1
+            report = self._unreported >= REPORT_EVERY_PAGES
+        if report:
+            self.heartbeat()
+
+    def _switch(self):
+        port = self.registry.lease(self.owner)
+        if port is None:
+            return  # Chưa có Chrome rảnh: dùng tiếp, thử lại sau heartbeat kế tiếp
+        try:
+            raw_driver = _connect_chrome(port, self.profile)
+        except Exception as e:
+            print(f"Không gắn được Chrome port {port}: {str(e)[:100]}")
+            self.registry.release(port, owner=self.owner)
+            return
+        old_driver = self.driver.wrapped_driver
+        self.driver = EventFiringWebDriver(raw_driver, self)
+        old_port, pages = self._take_unreported()
+        with self._lock:
+            self.port = port
+        self._rotate.clear()
+        try:
+            old_driver.quit()
+        except Exception:
+            pass
+        self.registry.release(old_port, pages, self.owner)
+        print(f"Chuyển từ Chrome port {old_port} sang port {port} (service tái tạo Chrome cũ)")
+
+    def release(self):
+        self._stopped.set()
+        try:
+            self.driver.wrapped_driver.quit()
+        except Exception:
+            pass
+        port, pages = self._take_unreported()
+        self.registry.release(port, pages, self.owner)
+        self.registry.close()
+
+
+class ServiceDriver:
+    """
+    Driver trả cho crawler: ủy quyền mọi thao tác cho EventFiringWebDriver hiện tại của
+    lease; get() cho lease chuyển Chrome (nếu cần) trước khi tải trang
+    """
+
+    def __init__(self, lease):
+        self.service_lease = lease
+
+    @property
+    def service_port(self):
+        return self.service_lease.port
+
+    def get(self, url):
+        self.service_lease.rotate_if_needed()
+        return self.service_lease.driver.get(url)
+
+    def __getattr__(self, name):
+        return getattr(self.service_lease.driver, name)
+
+
+def attach_chrome_driver(profile='full', registry_path=DEFAULT_REGISTRY_DB):
+    """
+    Thuê một Chrome của service và gắn chromedriver vào qua debuggerAddress.
+    Trả về driver (lease được gia hạn và báo số trang định kỳ) hoặc None nếu không còn Chrome rảnh.
+    """
+    registry = BrowserRegistry(registry_path)
+    owner = f"{os.getpid()}-{threading.get_ident()}"
+    port = registry.lease(owner)
+    if port is None:
+        registry.close()
+        return None
+
+    try:
+        raw_driver = _connect_chrome(port, profile)
+    except Exception:
+        registry.release(port, owner=owner)
+        registry.close()
+        raise
+
+    lease = ServiceLease(registry, owner, port, profile)
+    lease.driver = EventFiringWebDriver(raw_driver, lease)
+    lease.start()
+    return ServiceDriver(lease)
+
+
+def is_service_driver(driver):
+    return getattr(driver, 'service_port', None) is not None
+
+
+def release_chrome_driver(driver):
+    """Trả Chrome về service (không đóng trình duyệt) kèm số trang chưa báo"""
+    driver.service_lease.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pool Chrome ấm cho crawler')
+    parser.add_argument('--size', type=int, default=2, help='Số Chrome giữ sẵn')
+    parser.add_argument('--base-port', type=int, default=DEFAULT_BASE_PORT, help='Remote debugging port đầu tiên')
+    parser.add_argument('--max-pages', type=int, default=DEFAULT_MAX_PAGES, help='Tái tạo Chrome sau N trang')
+    parser.add_argument('--max-rss-mb', type=float, default=DEFAULT_MAX_RSS_MB,
+                        help='Tái tạo Chrome khi RAM vượt ngưỡng (cần psutil)')
+    parser.add_argument('--profile', choices=BROWSER_PROFILES, default='full', help='Chrome profile')
+    args = parser.parse_args()
+
+    if psutil is None:
+        print("⚠️ psutil chưa cài - chỉ tái tạo Chrome theo số trang")
+    print(f"chromedriver: {resolve_driver_path()}")
+
+    service = BrowserService(args.size, args.base_port, args.max_pages, args.max_rss_mb, args.profile)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        print("\nDừng browser service")
+
+
+if __name__ == "__main__":
+    main()
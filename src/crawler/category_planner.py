@@ -0,0 +1,111 @@
+"""
+Category Planner
+Lấy cây danh mục sách Fahasa (cùng phân cấp với category_1..3) từ trang gốc
+và chia các danh mục lá thành shard cho sharded_crawl.py.
+
+URL danh mục con nằm dưới path của danh mục gốc, ví dụ
+    /sach-trong-nuoc.html                      -> category_1
+    /sach-trong-nuoc/van-hoc-trong-nuoc.html   -> category_2
+    /sach-trong-nuoc/van-hoc-trong-nuoc/tieu-thuyet.html -> category_3
+"""
+from urllib.parse import urljoin, urlsplit
+
+from lxml import html as lxml_html
+
+from html_parser import _text
+
+ROOT_CATEGORY_URL = "https://www.fahasa.com/sach-trong-nuoc.html"
+LISTING_QUERY = "order=num_orders&limit={limit}&p={page}"
+MAX_DEPTH = 2
+
+
+def _category_path(url):
+    path = urlsplit(url).path
+    return path[:-len('.html')] if path.endswith('.html') else path
+
+
+def category_depth(url, root_url=ROOT_CATEGORY_URL):
+    """0 = danh mục gốc, 1 = category_2, 2 = category_3; None nếu không thuộc cây của root_url"""
+    root = _category_path(root_url).rstrip('/')
+    path = _category_path(url).rstrip('/')
+    if path == root:
+        return 0
+    if not path.startswith(root + '/'):
+        return None
+    return path[len(root) + 1:].count('/') + 1
+
+
+def parse_category_links(page_html, base_url, root_url=ROOT_CATEGORY_URL):
+    """{url: tên} các danh mục con (mọi cấp) được liên kết trong trang"""
+    if not page_html:
+        return {}
+    tree = lxml_html.fromstring(page_html)
+    host = urlsplit(root_url).netloc.lower()
+    categories = {}
+    for link in tree.xpath('//a[@href]'):
+        parts = urlsplit(urljoin(base_url, link.get('href')))
+        if parts.netloc.lower() != host or not parts.path.endswith('.html'):
+            continue
+        url = f"https://{host}{parts.path}"
+        depth = category_depth(url, root_url)
+        if depth is None or depth == 0 or depth > MAX_DEPTH:
+            continue
+        name = link.get('title') or _text(link)
+        if name and url not in categories:
+            categories[url] = name
+    return categories
+
+
+def parent_category_url(url, root_url=ROOT_CATEGORY_URL):
+    """Danh mục cha theo path (None với category_2)"""
+    if (category_depth(url, root_url) or 0) <= 1:
+        return None
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}{_category_path(url).rsplit('/', 1)[0]}.html"
+
+
+def discover_categories(fetch_html, root_url=ROOT_CATEGORY_URL, depth=MAX_DEPTH):
+    """
+    Duyệt cây danh mục bằng fetch_html(url) -> HTML, tới độ sâu depth.
+    Trả về list dict {url, name, depth, parent} theo thứ tự tìm thấy.
+    """
+    tree = {}
+    to_visit = [root_url]
+    for level in range(depth):
+        next_visit = []
+        for page_url in to_visit:
+            try:
+                links = parse_category_links(fetch_html(page_url), page_url, root_url)
+            except Exception as e:
+                print(f"Lỗi tải danh mục {page_url}: {e}")
+                continue
+            for url, name in links.items():
+                link_depth = category_depth(url, root_url)
+                if url in tree or link_depth > depth:
+                    continue
+                tree[url] = {'url': url, 'name': name, 'depth': link_depth,
+                             'parent': parent_category_url(url, root_url)}
+                if link_depth == level + 1:
+                    next_visit.append(url)
+        to_visit = next_visit
+    return list(tree.values())
+
+
+def leaf_categories(categories):
+    """Danh mục không có con: crawl lá để không lặp sản phẩm của danh mục cha"""
+    parents = {c['parent'] for c in categories if c['parent']}
+    return [c for c in categories if c['url'] not in parents]
+
+
+def plan_shards(categories, num_shards):
+    """Chia danh mục lá round-robin theo thứ tự URL -> list shard (list URL), kết quả ổn định giữa các lần chạy"""
+    num_shards = max(1, num_shards)
+    shards = [[] for _ in range(num_shards)]
+    for i, category in enumerate(sorted(leaf_categories(categories), key=lambda c: c['url'])):
+        shards[i % num_shards].append(category['url'])
+    return [shard for shard in shards if shard]
+
+
+def category_listing_url(category_url):
+    """Template trang danh mục có {limit} và {page} như LISTING_URL"""
+    return f"{category_url}?{LISTING_QUERY}"
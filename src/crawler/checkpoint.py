@@ -0,0 +1,131 @@
+"""
+Crawl Checkpoint
+Nhật ký append-only (JSONL) của một lần crawl để tiếp tục sau khi bị dừng
+(Ctrl+C, Chrome crash, exception):
+    start   - tham số lần chạy
+    queued  - URL đã đưa vào hàng đợi chi tiết
+    done    - URL đã xử lý xong (book nằm trong file của record sink)
+    failed  - URL đã xử lý nhưng không lấy được dữ liệu
+    page    - trang danh mục tiếp theo cần tải
+    segment - file JSONL/CSV record sink vừa mở
+Mỗi sự kiện được flush ngay; --resume đọc lại nhật ký và bỏ qua mọi URL đã xử lý.
+"""
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
+from product_url import canonicalize_product_url
+
+DEFAULT_CHECKPOINT_PATH = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'data', '.crawl_state', 'checkpoint.jsonl'
+)
+
+
+class CrawlCheckpoint:
+    def __init__(self, path=DEFAULT_CHECKPOINT_PATH):
+        self.path = os.path.abspath(path)
+        self.collected = 0
+        self.segments = []
+        self.page = 1
+        self.processed = set()
+        self.queued = []
+        self._lock = threading.Lock()
+        self._file = None
+
+    def exists(self):
+        return os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+    @property
+    def pending(self):
+        """URL đã vào hàng đợi nhưng chưa xử lý (theo thứ tự)"""
+        return [url for url in self.queued if url not in self.processed]
+
+    def load(self):
+        """Đọc lại nhật ký; dòng cuối ghi dở (khi crash) được bỏ qua"""
+        seen_queued = set()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                kind = event.get('type')
+                if kind == 'queued':
+                    if event['url'] not in seen_queued:
+                        seen_queued.add(event['url'])
+                        self.queued.append(event['url'])
+                elif kind == 'done':
+                    if event['url'] not in self.processed:
+                        self.collected += 1
+                    self.processed.add(event['url'])
+                elif kind == 'failed':
+                    self.processed.add(event['url'])
+                elif kind == 'page':
+                    self.page = event['page']
+                elif kind == 'segment':
+                    self.segments.append((event['jsonl'], event['csv']))
+        self._open('a')
+        # Dòng ghi dở không có newline: bắt đầu dòng mới để sự kiện tiếp theo không bị dính vào
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                self._file.write('\n')
+        return self
+
+    def start(self, **params):
+        """Bắt đầu nhật ký mới (ghi đè checkpoint cũ)"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._open('w')
+        self._write({'type': 'start', 'started_at': datetime.now().isoformat(), **params})
+        return self
+
+    def _open(self, mode):
+        self._file = open(self.path, mode, encoding='utf-8')
+
+    def _write(self, event):
+        with self._lock:
+            self._file.write(json.dumps(event, ensure_ascii=False) + '\n')
+            self._file.flush()
+
+    def record_queued(self, urls):
+        for url in urls:
+            url = canonicalize_product_url(url)
+            self.queued.append(url)
+            self._write({'type': 'queued', 'url': url})
+
+    def record_done(self, book):
+        url = canonicalize_product_url(book['url'])
+        self.processed.add(url)
+        self.collected += 1
+        self._write({'type': 'done', 'url': url})
+
+    def record_failed(self, url):
+        url = canonicalize_product_url(url)
+        self.processed.add(url)
+        self._write({'type': 'failed', 'url': url})
+
+    def record_segment(self, jsonl_path, csv_path):
+        self.segments.append((jsonl_path, csv_path))
+        self._write({'type': 'segment', 'jsonl': jsonl_path, 'csv': csv_path})
+
+    def record_page(self, page):
+        self.page = page
+        self._write({'type': 'page', 'page': page})
+
+    def is_processed(self, url):
+        return canonicalize_product_url(url) in self.processed
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def clear(self):
+        """Crawl đã lưu xong: xoá checkpoint"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,46 @@
+"""
+Chrome Crawl Profile
+Profile 'lite' cho Selenium: headless, page load strategy 'eager' (không chờ
+ảnh / iframe tải xong) và chặn qua CDP Network.setBlockedURLs các tài nguyên
+extractor không đọc: ảnh, font, tracker / quảng cáo.
+URL ảnh vẫn lấy được từ thuộc tính src / data-src vì DOM không thay đổi.
+"""
+
+BROWSER_PROFILES = ('full', 'lite')
+
+BLOCKED_IMAGE_PATTERNS = [
+    '*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp', '*.svg', '*.ico', '*.bmp',
+]
+BLOCKED_FONT_PATTERNS = [
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+]
+BLOCKED_TRACKER_PATTERNS = [
+    '*google-analytics.com*', '*googletagmanager.com*', '*googleadservices.com*',
+    '*doubleclick.net*', '*googlesyndication.com*', '*connect.facebook.net*',
+    '*facebook.com/tr*', '*analytics.tiktok.com*', '*hotjar.com*', '*criteo.*',
+    '*clarity.ms*', '*zalo.me/sdk*', '*sp.zalo.me*', '*useinsider.com*',
+]
+BLOCKED_URL_PATTERNS = BLOCKED_IMAGE_PATTERNS + BLOCKED_FONT_PATTERNS + BLOCKED_TRACKER_PATTERNS
+
+
+def apply_lite_options(chrome_options):
+    """Headless + eager + tắt ảnh ở mức content settings (phòng khi CDP không khả dụng)"""
+    chrome_options.add_argument('--headless=new')
+    chrome_options.add_argument('--window-size=1366,900')
+    chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+    chrome_options.add_experimental_option('prefs', {
+        'profile.managed_default_content_settings.images': 2,
+    })
+    chrome_options.page_load_strategy = 'eager'
+    return chrome_options
+
+
+def block_resources(driver, patterns=BLOCKED_URL_PATTERNS):
+    """Chặn request theo pattern qua Chrome DevTools Protocol (trả về False nếu không hỗ trợ)"""
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(patterns)})
+        return True
+    except Exception as e:
+        print(f"Không bật được chặn tài nguyên qua CDP: {str(e)[:100]}")
+        return False
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+So sánh thời gian trích xuất giữa các extract mode của get_book_details
+(webdriver từng trường / snapshot page_source / js một lần execute_script)
+trên cùng một trang đã tải.
+
+Cách dùng:
+    python src/crawler/compare_extractors.py URL [URL ...] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from fahasa_bulk_scraper import EXTRACTORS, create_chrome_driver
+
+BASELINE_MODE = 'webdriver'
+
+
+def time_extractors(driver, url, repeat=3):
+    """Trả về {mode: (ms trung bình, book)} cho trang url"""
+    driver.get(url)
+    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "h1")))
+
+    results = {}
+    for mode, extractor in EXTRACTORS.items():
+        elapsed = []
+        book = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            book = extractor(driver, url)
+            elapsed.append((time.perf_counter() - started) * 1000)
+        results[mode] = (sum(elapsed) / len(elapsed), book)
+    return results
+
+
+def field_mismatches(book, baseline):
+    if not book or not baseline:
+        return ['<không có dữ liệu>'] if book is not baseline else []
+    return [k for k in baseline if k != 'time_collect' and book.get(k) != baseline.get(k)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='So sánh tốc độ các extract mode')
+    parser.add_argument('urls', nargs='+', help='URL trang sản phẩm Fahasa')
+    parser.add_argument('--repeat', type=int, default=3, help='Số lần lặp mỗi mode')
+    args = parser.parse_args()
+
+    driver = create_chrome_driver()
+    totals = {mode: 0.0 for mode in EXTRACTORS}
+    try:
+        for url in args.urls:
+            print(f"\n{url}")
+            results = time_extractors(driver, url, args.repeat)
+            baseline = results[BASELINE_MODE][1]
+            for mode, (ms, book) in results.items():
+                totals[mode] += ms
+                diff = field_mismatches(book, baseline) if mode != BASELINE_MODE else []
+                note = f"  khác: {', '.join(diff)}" if diff else ''
+                print(f"   {mode:<10} {ms:>9.1f} ms{note}")
+    finally:
+        driver.quit()
+
+    print("\nTỔNG KẾT (trung bình mỗi trang)")
+    base_ms = totals[BASELINE_MODE] / len(args.urls)
+    for mode, total in totals.items():
+        avg = total / len(args.urls)
+        speedup = base_ms / avg if avg else 0
+        print(f"   {mode:<10} {avg:>9.1f} ms   x{speedup:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Distributed Crawl
+Crawl trên nhiều node qua hàng đợi work_queue:
+    seed    - tải trang danh mục (hoặc đọc file URL) và đưa URL sản phẩm vào hàng đợi
+    worker  - thuê task, crawl trang chi tiết, đẩy kết quả + ack (chạy trên mỗi node)
+    collect - lấy kết quả ra JSONL/CSV và load staging
+    stats   - số task theo trạng thái
+
+Cách dùng (broker SQLite cục bộ, nhiều worker trên cùng máy):
+    python src/crawler/distributed_crawl.py seed --pages 20
+    python src/crawler/distributed_crawl.py worker --engine http &
+    python src/crawler/distributed_crawl.py worker --engine http &
+    python src/crawler/distributed_crawl.py collect
+"""
+import argparse
+import os
+import socket
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fahasa_bulk_scraper import LISTING_URL, build_engine, finish_crawl_results, logger
+from frontier import Frontier
+from http_fetcher import HttpCrawlSession, get_listing_items_http
+from listing_harvest import listing_fingerprint
+from politeness import AdaptiveDelay
+from record_sink import RotatingFileSink
+from selector_order import selector_registry
+from work_queue import DEFAULT_QUEUE_DB, VISIBILITY_TIMEOUT, SharedPoliteness, SQLiteBroker
+
+
+def seed_queue(queue, pages=10, books_per_page=24, fresh_hours=24, url_file=None, requeue=False):
+    """Đưa URL sản phẩm vào hàng đợi (bỏ qua sách vừa crawl trong fresh_hours). Trả về số task mới"""
+    if url_file:
+        with open(url_file, 'r', encoding='utf-8') as f:
+            urls = [line.strip() for line in f if line.strip()]
+        return queue.put(urls, requeue=requeue)
+
+    frontier = Frontier()
+    politeness = AdaptiveDelay()
+    session = HttpCrawlSession(politeness=politeness)
+    added = 0
+    try:
+        for page in range(1, pages + 1):
+            items = get_listing_items_http(session, LISTING_URL.format(limit=books_per_page, page=page))
+            if not items:
+                break
+            urls = [item['url'] for item in items
+                    if frontier.needs_fetch(item['url'], fresh_hours, listing_fingerprint(item))]
+            # Trang đầu (bán chạy nhất) được ưu tiên hơn trang sau
+            added += queue.put(urls, priority=pages - page, requeue=requeue)
+            print(f"Trang {page}: {len(items)} sản phẩm, thêm {len(urls)} URL vào hàng đợi")
+            politeness.wait('listing')
+    finally:
+        session.close()
+        frontier.close()
+        politeness.save()
+    return added
+
+
+def run_worker(queue, engine='http', extract_mode='webdriver', browser_profile='full', batch=4,
+               visibility_timeout=VISIBILITY_TIMEOUT, idle_exit=60, max_books=0):
+    """Vòng lặp lease -> crawl -> complete/nack; dừng khi hàng đợi rỗng quá idle_exit giây"""
+    owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    delay = AdaptiveDelay()
+    politeness = SharedPoliteness(queue, delay)
+    session_factory, close_session, _, fetch_detail = build_engine(engine, extract_mode,
+                                                                    browser_profile=browser_profile,
+                                                                    politeness=politeness)
+    frontier = Frontier()
+    session = session_factory()
+    done = failed = 0
+    idle_since = time.monotonic()
+    print(f"Worker {owner} bắt đầu")
+    try:
+        while not max_books or done < max_books:
+            tasks = queue.lease(owner, batch, visibility_timeout)
+            if not tasks:
+                if time.monotonic() - idle_since >= idle_exit:
+                    break
+                time.sleep(2)
+                continue
+            idle_since = time.monotonic()
+
+            for i, task in enumerate(tasks):
+                politeness.wait('detail')
+                try:
+                    book = fetch_detail(session, task['url'])
+                except Exception as e:
+                    book = None
+                    print(f"    Lỗi: {e}")
+                if book and queue.complete(task['id'], owner, book):
+                    frontier.mark_fetched(book)
+                    done += 1
+                    print(f"[{owner}] ✅ {done}: {book.get('title', '')[:50]}")
+                elif book:
+                    print(f"[{owner}] lease hết hạn, bỏ kết quả: {task['url']}")
+                else:
+                    queue.nack(task['id'], owner, error='extract failed')
+                    failed += 1
+                # Gia hạn các task còn lại của batch trong khi trang này đang xử lý lâu
+                for pending in tasks[i + 1:]:
+                    queue.extend(pending['id'], owner, visibility_timeout)
+    except KeyboardInterrupt:
+        print("\nWorker dừng - task đang thuê sẽ quay lại hàng đợi khi hết lease")
+    finally:
+        close_session(session)
+        frontier.close()
+        delay.save()
+        selector_registry.save()
+        print(f"Worker {owner}: {done} sách, {failed} lỗi - {delay.summary()}")
+    return done, failed
+
+
+def collect_results(queue, target_books=0):
+    """Lấy kết quả từ hàng đợi ra file JSONL/CSV rồi load staging"""
+    crawl_log_id = logger.log_crawl_start(target_books) if logger else None
+    file_sink = RotatingFileSink()
+    try:
+        collected = queue.drain_results(file_sink.write)
+    finally:
+        file_sink.close()
+    print(f"Lấy {collected} kết quả từ hàng đợi")
+    if not collected:
+        return None
+    return finish_crawl_results(file_sink, collected, target_books or collected, crawl_log_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl Fahasa phân tán qua hàng đợi lease/ack')
+    parser.add_argument('--db', default=DEFAULT_QUEUE_DB, help='File SQLite của broker cục bộ')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    seed = sub.add_parser('seed', help='Đưa URL sản phẩm vào hàng đợi')
+    seed.add_argument('--pages', type=int, default=10, help='Số trang danh mục')
+    seed.add_argument('--fresh-hours', type=float, default=24, help='Bỏ qua sách đã crawl trong N giờ qua')
+    seed.add_argument('--urls', help='File danh sách URL (mỗi dòng một URL) thay cho trang danh mục')
+    seed.add_argument('--requeue', action='store_true', help='Đưa lại cả task đã xong/dead')
+
+    worker = sub.add_parser('worker', help='Chạy một worker')
+    worker.add_argument('--engine', choices=['selenium', 'http'], default='http')
+    worker.add_argument('--extract', default='webdriver', help='Selenium extract mode')
+    worker.add_argument('--browser-profile', choices=['full', 'lite'], default='lite')
+    worker.add_argument('--batch', type=int, default=4, help='Số task thuê mỗi lần')
+    worker.add_argument('--visibility', type=int, default=VISIBILITY_TIMEOUT,
+                        help='Visibility timeout (giây) của mỗi lease')
+    worker.add_argument('--idle-exit', type=int, default=60, help='Dừng sau N giây không có task')
+    worker.add_argument('--max-books', type=int, default=0, help='Dừng sau N sách (0 = không giới hạn)')
+
+    collect = sub.add_parser('collect', help='Lấy kết quả ra file và staging')
+    collect.add_argument('--books', type=int, default=0, help='Số sách mục tiêu (cho log)')
+
+    sub.add_parser('stats', help='Thống kê hàng đợi')
+    args = parser.parse_args()
+
+    queue = SQLiteBroker(args.db)
+    try:
+        if args.command == 'seed':
+            added = seed_queue(queue, args.pages, fresh_hours=args.fresh_hours,
+                               url_file=args.urls, requeue=args.requeue)
+            print(f"Đã thêm {added} task")
+        elif args.command == 'worker':
+            run_worker(queue, args.engine, args.extract, args.browser_profile, args.batch,
+                       args.visibility, args.idle_exit, args.max_books)
+        elif args.command == 'collect':
+            collect_results(queue, args.books)
+        print(f"Hàng đợi: {queue.stats()}")
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
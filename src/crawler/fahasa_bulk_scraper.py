@@ -2,22 +2,44 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import time
-import random
-import json
 import pandas as pd
-from datetime import datetime
-import json
 import re
 import os
+from functools import partial
 # Remove MySQL import - we only create files now
 # Import CSV loader for auto-loading after crawl
 import sys
+import argparse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'etl'))
 from load_csv_to_staging import load_csv_to_staging
+from worker_pool import DetailWorkerPool, CrawlProgress, HostLimiter
+from html_parser import RATING_COUNT_RE, extract_price_smart, empty_book, parse_book_html
+from js_extractor import extract_book_js
+from http_fetcher import (
+    LISTING_RETRIES, LISTING_RETRY_DELAY, HttpCrawlSession, get_listing_items_http, get_book_details_http
+)
+from listing_harvest import harvest_listing_selenium, listing_fingerprint
+from frontier import Frontier
+from revisit_scheduler import plan_revisits
+from sitemap_discovery import discover_changed_products
+from page_cache import PageCache
+from html_archive import HtmlArchive
+from field_metrics import DEFAULT_METRICS_PATH, NULL_PAGE, FieldMetricsRecorder
+from selector_order import selector_registry
+from politeness import AdaptiveDelay
+from checkpoint import CrawlCheckpoint
+from record_sink import FanoutSink, RotatingFileSink, StagingBatchSink
+from chrome_profile import BROWSER_PROFILES, apply_lite_options, block_resources
+from browser_service import (
+    attach_chrome_driver, forget_driver_path, is_service_driver, release_chrome_driver, resolve_driver_path
+)
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+from product_url import canonicalize_product_url
 
 # Import control logger
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'utils'))
@@ -27,341 +49,347 @@ except ImportError:
     print("⚠️ Control logger not available - running without logging")
     logger = None
 
-def extract_price_smart(price_text):
-    
-    try:
-        if not price_text:
-            return 0.0
-        
-        clean_text = re.sub(r'[^\d,.]', '', str(price_text))
-        clean_text = clean_text.replace(',', '').replace('.', '')
-        
-        if clean_text and clean_text.isdigit():
-            price = float(clean_text)
-            if price < 1000:
-                price *= 1000
-            return price if price >= 1000 else 0.0
-        return 0.0
-    except:
-        return 0.0
+LISTING_URL = "https://www.fahasa.com/sach-trong-nuoc.html?order=num_orders&limit={limit}&p={page}"
 
-def get_book_details(driver, url):
-    
+def get_book_details(driver, url, extract_mode='webdriver', metrics=None, archive=None, politeness=None):
+    """
+    extract_mode:
+        'webdriver' - từng trường qua find_element (mỗi lần một round trip)
+        'snapshot'  - lấy driver.page_source một lần rồi parse bằng lxml
+        'js'        - một lần execute_script trả về toàn bộ trường
+    metrics: FieldMetricsRecorder - đo thời gian từng trường (chỉ với 'webdriver')
+    archive: HtmlArchive - lưu page_source (DOM đã render) để parse lại offline
+    politeness: AdaptiveDelay - chỉ đo thời gian tải trang (driver.get), không đo trích xuất
+    """
     try:
-        driver.get(url)
+        if politeness:
+            politeness.timed(driver.get, url)
+        else:
+            driver.get(url)
         WebDriverWait(driver, 10).until(
             EC.presence_of_element_located((By.TAG_NAME, "h1"))
         )
+        if archive:
+            page_html = driver.page_source
+            archive.write(url, page_html)
+            if extract_mode == 'snapshot':
+                return parse_book_html(page_html, url)
+        if metrics and extract_mode == 'webdriver':
+            return extract_book_webdriver(driver, url, metrics)
+        return EXTRACTORS[extract_mode](driver, url)
+    except Exception as e:
+        print(f"    Lỗi khi lấy chi tiết: {e}")
+        return None
+
+WEBDRIVER_PRICE_SCAN = "//*[contains(text(), 'đ')]"
+# Thứ tự cố định như html_parser.PRICE_SELECTORS (selector khác nhau có thể cho giá khác nhau)
+WEBDRIVER_PRICE_SELECTORS = [
+    WEBDRIVER_PRICE_SCAN,
+    '.price-original .price',
+    '.price .current-price',
+    '.product-price .price',
+    '[data-price]',
+    '.price-box .price',
+]
+WEBDRIVER_REVIEW_LINKS = '.rating-links a, .review-position a, a[onclick*="review"]'
+WEBDRIVER_RATING_COUNT_CHAIN = selector_registry.chain('webdriver.rating_count', [
+    "//td[@class='review-position']//a[contains(text(), 'đánh giá')]",
+    "//p[@class='rating-links']//a[contains(text(), 'đánh giá')]",
+    "//a[contains(text(), 'đánh giá')]",
+    "//*[contains(text(), 'đánh giá') and not(name()='script')]",
+    WEBDRIVER_REVIEW_LINKS,
+])
+
+def _webdriver_price_at(driver, selector):
+    """Giá (> 0) theo một selector của WEBDRIVER_PRICE_SELECTORS, None nếu không có"""
+    if selector == WEBDRIVER_PRICE_SCAN:
+        for elem in driver.find_elements(By.XPATH, selector):
+            text = elem.text.strip()
+            if re.search(r'\d{2,}', text):  # Có ít nhất 2 chữ số
+                price = extract_price_smart(text)
+                if price > 0:
+                    return price
+        return None
+    elem = driver.find_element(By.CSS_SELECTOR, selector)
+    price = extract_price_smart(elem.text.strip() or elem.get_attribute('data-price') or '')
+    return price if price > 0 else None
+
+def _webdriver_rating_count_at(driver, selector):
+    if selector == WEBDRIVER_REVIEW_LINKS:
+        texts = [link.text.strip() for link in driver.find_elements(By.CSS_SELECTOR, selector)]
+    else:
+        texts = [driver.find_element(By.XPATH, selector).text.strip()]
+    for text in texts:
+        # Extract số từ text như "(2 đánh giá)" hoặc "2 đánh giá"
+        count_match = RATING_COUNT_RE.search(text)
+        if count_match:
+            return int(count_match.group(1))
+    return None
+
+def extract_book_webdriver(driver, url, metrics=None):
+    """Trích xuất từng trường bằng find_element trên trang đã tải (metrics: FieldMetricsRecorder tùy chọn)"""
+    page = metrics.page(url) if metrics else NULL_PAGE
+    book = None
+    try:
+        book = _extract_book_webdriver(driver, url, page)
+        return book
+    finally:
+        page.finish(book is not None)
+
+def _extract_book_webdriver(driver, url, page):
+    try:
+        book = empty_book(url)
         
-        book = {
-            'title': '',
-            'author': '',
-            'publisher': '',
-            'supplier': '',
-            'category_1': 'Sách trong nước',
-            'category_2': '',
-            'category_3': '',
-            'original_price': 0.0,
-            'discount_price': 0.0,
-            'discount_percent': 0.0,
-            'rating': 0.0,
-            'rating_count': 0,
-            'sold_count': '',
-            'sold_count_numeric': 0,
-            'publish_year': 0,
-            'language': 'Tiếng Việt',
-            'page_count': 0,
-            'weight': 0.0,
-            'dimensions': '',
-            'url': url,
-            'url_img': '',
-            'time_collect': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
-        
-        try:
-            year_elem = driver.find_element(By.XPATH, "//th[contains(text(), 'Năm XB')]/following-sibling::td")
-            divs = year_elem.find_elements(By.TAG_NAME, 'div')
-            year_text = ''
-            if divs and divs[0].text.strip():
-                year_text = divs[0].text.strip()
-            elif year_elem.text.strip():
-                year_text = year_elem.text.strip()
-            if year_text.isdigit():
-                book['publish_year'] = int(year_text)
-        except:
-            pass
+        with page.field('publish_year', book):
+            try:
+                year_elem = driver.find_element(By.XPATH, "//th[contains(text(), 'Năm XB')]/following-sibling::td")
+                divs = year_elem.find_elements(By.TAG_NAME, 'div')
+                year_text = ''
+                if divs and divs[0].text.strip():
+                    year_text = divs[0].text.strip()
+                elif year_elem.text.strip():
+                    year_text = year_elem.text.strip()
+                if year_text.isdigit():
+                    book['publish_year'] = int(year_text)
+            except:
+                pass
         
-        try:
-            weight_elem = driver.find_element(By.XPATH, "//th[contains(text(), 'Trọng lượng')]/following-sibling::td")
-            divs = weight_elem.find_elements(By.TAG_NAME, 'div')
-            weight_text = ''
-            if divs and divs[0].text.strip():
-                weight_text = divs[0].text.strip()
-            elif weight_elem.text.strip():
-                weight_text = weight_elem.text.strip()
-            weight_val = re.sub(r'[^\d.]', '', weight_text)
-            if weight_val:
-                weight_gram = float(weight_val)
-                if weight_gram > 10:
-                    book['weight'] = round(weight_gram / 1000, 3)
-                else:
-                    book['weight'] = weight_gram
-        except:
-            pass
+        with page.field('weight', book):
+            try:
+                weight_elem = driver.find_element(By.XPATH, "//th[contains(text(), 'Trọng lượng')]/following-sibling::td")
+                divs = weight_elem.find_elements(By.TAG_NAME, 'div')
+                weight_text = ''
+                if divs and divs[0].text.strip():
+                    weight_text = divs[0].text.strip()
+                elif weight_elem.text.strip():
+                    weight_text = weight_elem.text.strip()
+                weight_val = re.sub(r'[^\d.]', '', weight_text)
+                if weight_val:
+                    weight_gram = float(weight_val)
+                    if weight_gram > 10:
+                        book['weight'] = round(weight_gram / 1000, 3)
+                    else:
+                        book['weight'] = weight_gram
+            except:
+                pass
         
-        try:
-            dim_elem = driver.find_element(By.XPATH, "//th[contains(text(), 'Kích Thước Bao Bì')]/following-sibling::td")
-            divs = dim_elem.find_elements(By.TAG_NAME, 'div')
-            if divs and divs[0].text.strip():
-                book['dimensions'] = divs[0].text.strip()
-            elif dim_elem.text.strip():
-                book['dimensions'] = dim_elem.text.strip()
-        except:
-            pass
+        with page.field('dimensions', book):
+            try:
+                dim_elem = driver.find_element(By.XPATH, "//th[contains(text(), 'Kích Thước Bao Bì')]/following-sibling::td")
+                divs = dim_elem.find_elements(By.TAG_NAME, 'div')
+                if divs and divs[0].text.strip():
+                    book['dimensions'] = divs[0].text.strip()
+                elif dim_elem.text.strip():
+                    book['dimensions'] = dim_elem.text.strip()
+            except:
+                pass
         
-        try:
-            page_count_elem = driver.find_element(By.XPATH, "//th[contains(text(), 'Số trang')]/following-sibling::td")
-            divs = page_count_elem.find_elements(By.TAG_NAME, 'div')
-            if divs and divs[0].text.strip().isdigit():
-                book['page_count'] = int(divs[0].text.strip())
-            elif page_count_elem.text.strip().isdigit():
-                book['page_count'] = int(page_count_elem.text.strip())
-        except:
-            pass
+        with page.field('page_count', book):
+            try:
+                page_count_elem = driver.find_element(By.XPATH, "//th[contains(text(), 'Số trang')]/following-sibling::td")
+                divs = page_count_elem.find_elements(By.TAG_NAME, 'div')
+                if divs and divs[0].text.strip().isdigit():
+                    book['page_count'] = int(divs[0].text.strip())
+                elif page_count_elem.text.strip().isdigit():
+                    book['page_count'] = int(page_count_elem.text.strip())
+            except:
+                pass
         
         
-        try:
-            breadcrumbs = driver.find_elements(By.CSS_SELECTOR, '.breadcrumb li a')
-            if len(breadcrumbs) >= 2:
-                book['category_2'] = breadcrumbs[1].text.strip() if len(breadcrumbs) > 1 else ''
-                if len(breadcrumbs) == 4:
-                    # Ghép mục 3 và 4
-                    book['category_3'] = f"{breadcrumbs[2].text.strip()} - {breadcrumbs[3].text.strip()}"
-                elif len(breadcrumbs) > 2:
-                    book['category_3'] = breadcrumbs[2].text.strip()
-        except:
-            pass
+        with page.field('category', book, 'category_2', 'category_3'):
+            try:
+                breadcrumbs = driver.find_elements(By.CSS_SELECTOR, '.breadcrumb li a')
+                if len(breadcrumbs) >= 2:
+                    book['category_2'] = breadcrumbs[1].text.strip() if len(breadcrumbs) > 1 else ''
+                    if len(breadcrumbs) == 4:
+                        # Ghép mục 3 và 4
+                        book['category_3'] = f"{breadcrumbs[2].text.strip()} - {breadcrumbs[3].text.strip()}"
+                    elif len(breadcrumbs) > 2:
+                        book['category_3'] = breadcrumbs[2].text.strip()
+            except:
+                pass
         
         
-        try:
-            title_elem = driver.find_element(By.TAG_NAME, 'h1')
-            book['title'] = title_elem.text.strip()
-        except:
-            return None
+        with page.field('title', book):
+            try:
+                title_elem = driver.find_element(By.TAG_NAME, 'h1')
+                book['title'] = title_elem.text.strip()
+            except:
+                return None
         
         
         price_found = False
         
         
-        try:
-            price_elements = driver.find_elements(By.XPATH, "//*[contains(text(), 'đ')]")
-            for elem in price_elements:
-                text = elem.text.strip()
-                if re.search(r'\d{2,}', text):  # Có ít nhất 2 chữ số
-                    price = extract_price_smart(text)
-                    if price > 0:
-                        book['discount_price'] = price
-                        book['original_price'] = price
-                        price_found = True
-                        break
-        except:
-            pass
-        
-        
-        if not price_found:
-            selectors = [
-                '.price-original .price',
-                '.price .current-price', 
-                '.product-price .price',
-                '[data-price]',
-                '.price-box .price'
-            ]
-            
-            for selector in selectors:
+        with page.field('price', book, 'discount_price', 'original_price') as probe:
+            for selector in WEBDRIVER_PRICE_SELECTORS:
+                probe.attempt(selector)
                 try:
-                    elem = driver.find_element(By.CSS_SELECTOR, selector)
-                    text = elem.text.strip() or elem.get_attribute('data-price') or ''
-                    price = extract_price_smart(text)
-                    if price > 0:
-                        book['discount_price'] = price
-                        book['original_price'] = price
-                        price_found = True
-                        break
+                    price = _webdriver_price_at(driver, selector)
                 except:
                     continue
+                if price:
+                    book['discount_price'] = price
+                    book['original_price'] = price
+                    price_found = True
+                    break
         
         
-        try:
-            # Giá hiện tại
-            price_elem = driver.find_element(By.CSS_SELECTOR, 'span.price[id^="product-price-"]')
-            price_text = price_elem.text.strip()
-            price_val = re.sub(r'[^\d.]', '', price_text)
-            if price_val:
-                book['discount_price'] = float(price_val.replace('.', ''))
-        except:
-            pass
-        try:
-            # Giá gốc
-            old_price_elem = driver.find_element(By.CSS_SELECTOR, 'span.price[id^="old-price-"]')
-            old_price_text = old_price_elem.text.strip()
-            old_price_val = re.sub(r'[^\d.]', '', old_price_text)
-            if old_price_val:
-                book['original_price'] = float(old_price_val.replace('.', ''))
-        except:
-            pass
-        try:
-            # Phần trăm giảm giá
-            percent_elem = driver.find_element(By.CSS_SELECTOR, 'span.discount-percent')
-            percent_text = percent_elem.text.strip()
-            percent_val = re.sub(r'[^\d-]', '', percent_text)
-            if percent_val:
-                book['discount_percent'] = float(percent_val)
-        except:
-            pass
+        with page.field('price_current', book, 'discount_price') as probe:
+            try:
+                # Giá hiện tại
+                price_elem = driver.find_element(By.CSS_SELECTOR, 'span.price[id^="product-price-"]')
+                price_text = price_elem.text.strip()
+                price_val = re.sub(r'[^\d.]', '', price_text)
+                if price_val:
+                    book['discount_price'] = float(price_val.replace('.', ''))
+                    probe.hit = True
+            except:
+                pass
+        with page.field('price_old', book, 'original_price') as probe:
+            try:
+                # Giá gốc
+                old_price_elem = driver.find_element(By.CSS_SELECTOR, 'span.price[id^="old-price-"]')
+                old_price_text = old_price_elem.text.strip()
+                old_price_val = re.sub(r'[^\d.]', '', old_price_text)
+                if old_price_val:
+                    book['original_price'] = float(old_price_val.replace('.', ''))
+                    probe.hit = True
+            except:
+                pass
+        with page.field('discount_percent', book) as probe:
+            try:
+                # Phần trăm giảm giá
+                percent_elem = driver.find_element(By.CSS_SELECTOR, 'span.discount-percent')
+                percent_text = percent_elem.text.strip()
+                percent_val = re.sub(r'[^\d-]', '', percent_text)
+                if percent_val:
+                    book['discount_percent'] = float(percent_val)
+                    probe.hit = True
+            except:
+                pass
 
         
-        try:
+        with page.field('author', book):
+            try:
             
-            author_elem = driver.find_element(By.XPATH, "//th[contains(text(), 'Tác giả')]/following-sibling::td")
-            book['author'] = author_elem.text.strip()
-        except:
-            pass
+                author_elem = driver.find_element(By.XPATH, "//th[contains(text(), 'Tác giả')]/following-sibling::td")
+                book['author'] = author_elem.text.strip()
+            except:
+                pass
 
             
-        try:
-            pub_elem = driver.find_element(By.XPATH, "//th[contains(text(), 'Nhà xuất bản')]/following-sibling::td")
-            book['publisher'] = pub_elem.text.strip()
-        except:
+        with page.field('publisher', book) as probe:
             try:
-                pub_div = driver.find_element(By.CSS_SELECTOR, 'div.product-view-sa-supplier')
-                spans = pub_div.find_elements(By.TAG_NAME, 'span')
-                if len(spans) >= 2 and 'Nhà xuất bản' in spans[0].text:
-                    book['publisher'] = spans[1].text.strip()
+                probe.attempt("//th[contains(text(), 'Nhà xuất bản')]/following-sibling::td")
+                pub_elem = driver.find_element(By.XPATH, "//th[contains(text(), 'Nhà xuất bản')]/following-sibling::td")
+                book['publisher'] = pub_elem.text.strip()
             except:
-                pass
+                try:
+                    probe.attempt('div.product-view-sa-supplier')
+                    pub_div = driver.find_element(By.CSS_SELECTOR, 'div.product-view-sa-supplier')
+                    spans = pub_div.find_elements(By.TAG_NAME, 'span')
+                    if len(spans) >= 2 and 'Nhà xuất bản' in spans[0].text:
+                        book['publisher'] = spans[1].text.strip()
+                except:
+                    pass
 
             
-        try:
-            sup_div = driver.find_element(By.CSS_SELECTOR, 'div.product-view-sa-supplier')
-            # Ưu tiên lấy supplier từ thẻ <a>
-            a_tags = sup_div.find_elements(By.TAG_NAME, 'a')
-            if a_tags:
-                supplier_text = a_tags[0].text.strip()
-                book['supplier'] = supplier_text
-            else:
-                # Nếu không có thẻ <a>, lấy text sau span
-                spans = sup_div.find_elements(By.TAG_NAME, 'span')
-                if len(spans) >= 2 and 'Nhà cung cấp' in spans[0].text:
-                    book['supplier'] = spans[1].text.strip()
+        with page.field('supplier', book):
+            try:
+                sup_div = driver.find_element(By.CSS_SELECTOR, 'div.product-view-sa-supplier')
+                # Ưu tiên lấy supplier từ thẻ <a>
+                a_tags = sup_div.find_elements(By.TAG_NAME, 'a')
+                if a_tags:
+                    supplier_text = a_tags[0].text.strip()
+                    book['supplier'] = supplier_text
                 else:
-                    # fallback: lấy toàn bộ text trừ label
-                    text = sup_div.text.replace('Nhà cung cấp:', '').strip()
-                    book['supplier'] = text
-        except:
-            pass
+                    # Nếu không có thẻ <a>, lấy text sau span
+                    spans = sup_div.find_elements(By.TAG_NAME, 'span')
+                    if len(spans) >= 2 and 'Nhà cung cấp' in spans[0].text:
+                        book['supplier'] = spans[1].text.strip()
+                    else:
+                        # fallback: lấy toàn bộ text trừ label
+                        text = sup_div.text.replace('Nhà cung cấp:', '').strip()
+                        book['supplier'] = text
+            except:
+                pass
         
         
-        try:
-            sup_divs = driver.find_elements(By.CSS_SELECTOR, 'div.product-view-sa-supplier')
-            for div in sup_divs:
-                spans = div.find_elements(By.TAG_NAME, 'span')
-                if len(spans) >= 2:
-                    label = spans[0].text.strip().lower()
-                    value = spans[1].text.strip()
-                    if 'nhà cung cấp' in label:
-                        book['supplier'] = value
-                    elif 'nhà xuất bản' in label:
-                        book['publisher'] = value
-        except:
-            pass
+        with page.field('supplier_spans', book, 'supplier', 'publisher'):
+            try:
+                sup_divs = driver.find_elements(By.CSS_SELECTOR, 'div.product-view-sa-supplier')
+                for div in sup_divs:
+                    spans = div.find_elements(By.TAG_NAME, 'span')
+                    if len(spans) >= 2:
+                        label = spans[0].text.strip().lower()
+                        value = spans[1].text.strip()
+                        if 'nhà cung cấp' in label:
+                            book['supplier'] = value
+                        elif 'nhà xuất bản' in label:
+                            book['publisher'] = value
+            except:
+                pass
 
         
-        try:
-            img_elem = driver.find_element(By.CSS_SELECTOR, 'img.fhs-p-img')
-            img_url = img_elem.get_attribute('src')
-            if not img_url or 'placeholder' in img_url:
-                img_url = img_elem.get_attribute('data-src')
-            book['url_img'] = img_url
-        except:
-            pass
+        with page.field('url_img', book):
+            try:
+                img_elem = driver.find_element(By.CSS_SELECTOR, 'img.fhs-p-img')
+                img_url = img_elem.get_attribute('src')
+                if not img_url or 'placeholder' in img_url:
+                    img_url = img_elem.get_attribute('data-src')
+                book['url_img'] = img_url
+            except:
+                pass
         
         
-        try:
-            
-            rating_elem = driver.find_element(By.XPATH, "//div[./span[contains(text(), '/5')]]")
-            rating_text = rating_elem.text.strip()
-            match = re.search(r'(\d+(?:[.,]\d+)?)(?=\s*/\s*5)', rating_text)
-            if match:
-                book['rating'] = float(match.group(1).replace(',', '.'))
-            else:
-                # Nếu không có text, thử lấy width style trong .rating
-                rating_box = driver.find_element(By.CSS_SELECTOR, '.rating-box .rating')
-                style = rating_box.get_attribute('style')
-                width_match = re.search(r'width:\s*(\d+)%', style)
-                if width_match:
-                    percent = int(width_match.group(1))
-                    book['rating'] = round(percent / 20, 2)  # 100% = 5.0
-        except:
-            pass
-        
-        # Thu thập rating_count từ "(X đánh giá)"
-        try:
-            # Tìm rating count từ các selector khác nhau
-            rating_count_selectors = [
-                "//td[@class='review-position']//a[contains(text(), 'đánh giá')]",
-                "//p[@class='rating-links']//a[contains(text(), 'đánh giá')]", 
-                "//a[contains(text(), 'đánh giá')]",
-                "//*[contains(text(), 'đánh giá') and not(name()='script')]"
-            ]
-            
-            for selector in rating_count_selectors:
-                try:
-                    rating_count_elem = driver.find_element(By.XPATH, selector)
-                    rating_count_text = rating_count_elem.text.strip()
-                    # Extract số từ text như "(2 đánh giá)" hoặc "2 đánh giá"
-                    count_match = re.search(r'\(?\s*(\d+)\s*đánh\s*giá\s*\)?', rating_count_text, re.IGNORECASE)
-                    if count_match:
-                        book['rating_count'] = int(count_match.group(1))
-                        print(f"    Found rating_count: {book['rating_count']} từ text: '{rating_count_text}'")
-                        break
-                except:
-                    continue
-                    
-            # Nếu không tìm thấy, thử tìm theo CSS selector
-            if book['rating_count'] == 0:
-                try:
-                    review_links = driver.find_elements(By.CSS_SELECTOR, '.rating-links a, .review-position a, a[onclick*="review"]')
-                    for link in review_links:
-                        text = link.text.strip()
-                        count_match = re.search(r'\(?\s*(\d+)\s*đánh\s*giá\s*\)?', text, re.IGNORECASE)
-                        if count_match:
-                            book['rating_count'] = int(count_match.group(1))
-                            print(f"    Found rating_count (CSS): {book['rating_count']} từ text: '{text}'")
-                            break
-                except:
-                    pass
-        except:
-            pass
+        with page.field('rating', book) as probe:
+            try:
+                probe.attempt("//div[./span[contains(text(), '/5')]]")
+                rating_elem = driver.find_element(By.XPATH, "//div[./span[contains(text(), '/5')]]")
+                rating_text = rating_elem.text.strip()
+                match = re.search(r'(\d+(?:[.,]\d+)?)(?=\s*/\s*5)', rating_text)
+                if match:
+                    book['rating'] = float(match.group(1).replace(',', '.'))
+                else:
+                    # Nếu không có text, thử lấy width style trong .rating
+                    probe.attempt('.rating-box .rating')
+                    rating_box = driver.find_element(By.CSS_SELECTOR, '.rating-box .rating')
+                    style = rating_box.get_attribute('style')
+                    width_match = re.search(r'width:\s*(\d+)%', style)
+                    if width_match:
+                        percent = int(width_match.group(1))
+                        book['rating'] = round(percent / 20, 2)  # 100% = 5.0
+            except:
+                pass
         
+        with page.field('rating_count', book) as probe:
+            # Thu thập rating_count từ "(X đánh giá)"
+            count = WEBDRIVER_RATING_COUNT_CHAIN.first(partial(_webdriver_rating_count_at, driver), probe)
+            if count is not None:
+                book['rating_count'] = count
+                print(f"    Found rating_count: {count} (selector: {probe.selector})")
         
-        try:
-            sold_elem = driver.find_element(By.CSS_SELECTOR, 'div.product-view-qty-num')
-            sold_text = sold_elem.text.strip()
+        
+        with page.field('sold_count', book, 'sold_count', 'sold_count_numeric'):
+            try:
+                sold_elem = driver.find_element(By.CSS_SELECTOR, 'div.product-view-qty-num')
+                sold_text = sold_elem.text.strip()
             
-            match = re.search(r'Đã bán\s*([\d.,]+)(k\+)?', sold_text, re.IGNORECASE)
-            if match:
-                book['sold_count'] = match.group(1) + (match.group(2) if match.group(2) else '')
+                match = re.search(r'Đã bán\s*([\d.,]+)(k\+)?', sold_text, re.IGNORECASE)
+                if match:
+                    book['sold_count'] = match.group(1) + (match.group(2) if match.group(2) else '')
                 
-                if match.group(2):
+                    if match.group(2):
                     
-                    num = float(match.group(1).replace(',', '.')) * 1000
-                    book['sold_count_numeric'] = int(num)
-                else:
-                    num = match.group(1).replace('.', '').replace(',', '')
-                    if num.isdigit():
+                        num = float(match.group(1).replace(',', '.')) * 1000
                         book['sold_count_numeric'] = int(num)
-        except:
-            pass
+                    else:
+                        num = match.group(1).replace('.', '').replace(',', '')
+                        if num.isdigit():
+                            book['sold_count_numeric'] = int(num)
+            except:
+                pass
 
         
         if price_found:
@@ -373,12 +401,338 @@ def get_book_details(driver, url):
         print(f"    Lỗi khi lấy chi tiết: {e}")
         return None
 
-def scrape_fahasa_bulk(target_books=100):
+def extract_book_snapshot(driver, url):
+    """Lấy page_source một lần và parse toàn bộ trường bằng lxml"""
+    return parse_book_html(driver.page_source, url)
+
+EXTRACTORS = {
+    'webdriver': extract_book_webdriver,
+    'snapshot': extract_book_snapshot,
+    'js': extract_book_js,
+}
+
+def create_chrome_driver(profile='full'):
+    """
+    Khởi tạo Chrome driver (raise Exception nếu không được)
+    profile='lite': headless, eager, chặn ảnh / font / tracker (xem chrome_profile.py)
+    """
+    chrome_options = Options()
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    if profile == 'lite':
+        apply_lite_options(chrome_options)
+    
+    try:
+        # chromedriver đã cache trên máy, chỉ tải về ở lần đầu
+        service = Service(resolve_driver_path())
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    except Exception as e1:
+        print(f"Method 1 failed: {str(e1)[:100]}...")
+        # Đường dẫn đã lưu có thể là chromedriver cũ (Chrome vừa cập nhật): phân giải lại lần sau
+        forget_driver_path()
+        
+        
+        try:
+            driver = webdriver.Chrome(options=chrome_options)
+        except Exception as e2:
+            print(f"Method 2 failed: {str(e2)[:100]}...")
+            raise Exception("Không thể khởi tạo ChromeDriver")
+    
+    if profile == 'lite':
+        block_resources(driver)
+    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    driver.set_page_load_timeout(30)
+    return driver
+
+def create_service_driver(profile='full'):
+    """Gắn vào Chrome ấm của browser_service.py; khởi động Chrome mới nếu service không có Chrome rảnh"""
+    try:
+        driver = attach_chrome_driver(profile)
+    except Exception as e:
+        print(f"Không gắn được vào browser service: {str(e)[:100]}")
+        driver = None
+    if driver is None:
+        print("Browser service không có Chrome rảnh - khởi động Chrome mới")
+        return create_chrome_driver(profile)
+    return driver
+
+def close_chrome_driver(driver):
+    """Trả Chrome về browser service hoặc đóng hẳn nếu là Chrome riêng"""
+    if is_service_driver(driver):
+        release_chrome_driver(driver)
+    else:
+        driver.quit()
+
+def open_record_sink(stage_batch=0, on_rotate=None, previous_segments=None):
+    """File JSONL/CSV xoay vòng trong data/YYYY/MM/DD, kèm micro-batch staging nếu stage_batch > 0"""
+    file_sink = RotatingFileSink(on_rotate=on_rotate, previous_segments=previous_segments)
+    staging_sink = StagingBatchSink(stage_batch) if stage_batch > 0 else None
+    return file_sink, FanoutSink(file_sink, staging_sink)
+
+def finish_crawl_results(file_sink, collected, target_books, crawl_log_id=None, staging=None, load_staging=True):
+    """
+    Đóng sink, load các file CSV vào staging (nếu chưa micro-batch và load_staging) và ghi log.
+    staging: StagingBatchSink đã insert trong lúc crawl - record lỗi được nạp lại từ CSV.
+    Trả về đường dẫn CSV cuối
+    """
+    file_sink.close()
+    if not file_sink.segments:
+        return None
+    jsonl_paths = [jsonl_path for jsonl_path, _ in file_sink.segments]
+    csv_paths = file_sink.csv_paths
+
+    print(f"\n🎉 HOÀN TẤT CRAWL!")
+    print(f"Thu thập được: {collected}/{target_books} sách ({collected/target_books*100:.1f}%)")
+    for jsonl_path, csv_path in file_sink.segments:
+        print(f"Đã lưu: {jsonl_path} | {csv_path}")
+    
+    if staging is not None:
+        if not staging.errors:
+            print(f"✅ ĐÃ LOAD {staging.loaded} SÁCH VÀO STAGING THEO MICRO-BATCH!")
+            if logger and crawl_log_id:
+                logger.log_crawl_success(crawl_log_id, collected, ', '.join(csv_paths), ', '.join(jsonl_paths))
+            return csv_paths[-1]
+        
+        # Micro-batch lỗi (staging mất kết nối...): nạp lại đúng các dòng đó từ CSV
+        print(f"⚠️ {staging.errors} sách không insert được theo micro-batch - nạp lại từ CSV...")
+        reload_success = all([load_csv_to_staging(csv_path, only_keys=staging.failed_keys)
+                              for csv_path in csv_paths])
+        if reload_success:
+            print(f"✅ ĐÃ LOAD {collected} SÁCH VÀO STAGING (micro-batch + nạp lại CSV)")
+            if logger and crawl_log_id:
+                logger.log_crawl_success(crawl_log_id, collected, ', '.join(csv_paths), ', '.join(jsonl_paths))
+        else:
+            message = (f"Staging micro-batch: {staging.errors}/{staging.count} books failed "
+                       f"and could not be reloaded from CSV")
+            print(f"❌ {message}")
+            for csv_path in csv_paths:
+                print(f"💡 Có thể chạy thủ công: python src/etl/load_csv_to_staging.py {csv_path}")
+            if logger and crawl_log_id:
+                logger.log_crawl_error(crawl_log_id, f"{message}. Files: {', '.join(csv_paths)}")
+        return csv_paths[-1]
+    
+    if not load_staging:
+        if logger and crawl_log_id:
+            logger.log_crawl_success(crawl_log_id, collected, ', '.join(csv_paths), ', '.join(jsonl_paths))
+        return csv_paths[-1]
+    
+    # Auto-load to staging
+    print(f"\n🚀 TỰ ĐỘNG LOAD CSV VÀO STAGING...")
+    load_success = all([load_csv_to_staging(csv_path) for csv_path in csv_paths])
+    
+    if load_success:
+        print(f"✅ ĐÃ LOAD {collected} SÁCH VÀO STAGING!")
+        print(f"🔄 WORKFLOW HOÀN TẤT: Crawl {target_books} → File → Staging")
+        
+        # Log crawl success
+        if logger and crawl_log_id:
+            logger.log_crawl_success(crawl_log_id, collected, ', '.join(csv_paths), ', '.join(jsonl_paths))
+    else:
+        print(f"❌ Lỗi load CSV vào staging")
+        for csv_path in csv_paths:
+            print(f"💡 Có thể chạy thủ công: python src/etl/load_csv_to_staging.py {csv_path}")
+        
+        # Log crawl with warning
+        if logger and crawl_log_id:
+            logger.log_crawl_success(crawl_log_id, collected, ', '.join(csv_paths), ', '.join(jsonl_paths))
+            logger.log_operation(
+                operation_type="STAGING_LOAD_ERROR",
+                status=LogStatus.FAILED,
+                log_level=LogLevel.WARN,
+                error_message="Failed to auto-load CSV to staging",
+                location="fahasa_bulk_scraper.py"
+            )
+    
+    return csv_paths[-1]  # Return CSV path for chaining
+
+def get_listing_items_selenium(driver, url, politeness=None):
+    """Sản phẩm trên trang danh mục kèm dữ liệu listing (None nếu không có sản phẩm)"""
+    if politeness:
+        politeness.timed(driver.get, url)
+    else:
+        driver.get(url)
+    
+    # Find products (chờ tường minh; khoảng nghỉ lịch sự do AdaptiveDelay quyết định)
+    try:
+        products = WebDriverWait(driver, 15).until(
+            EC.presence_of_all_elements_located((By.CSS_SELECTOR, '.item-inner'))
+        )
+        print(f"Tìm thấy {len(products)} sản phẩm trong trang")
+    except:
+        return None
+    
+    # Một execute_script cho cả trang thay vì find_element + get_attribute từng sản phẩm
+    items = harvest_listing_selenium(driver)
+    for item in items:
+        item['url'] = canonicalize_product_url(item['url'])
+    return items
+
+def merge_priority_urls(*sources, skip=None):
+    """
+    Gộp các danh sách URL ưu tiên (checkpoint, revisit, sitemap) theo thứ tự: chuẩn hoá URL,
+    bỏ URL trùng và URL mà skip(url) trả về True (vd. checkpoint.is_processed)
+    """
+    merged = []
+    seen = set()
+    for urls in sources:
+        for url in urls:
+            url = canonicalize_product_url(url)
+            if not url or url in seen or (skip and skip(url)):
+                continue
+            seen.add(url)
+            merged.append(url)
+    return merged
+
+def fetch_listing(get_listing_items, session, url, politeness=None, retries=LISTING_RETRIES):
+    """
+    get_listing_items có thử lại: None (lỗi tải / sản phẩm chưa hiện) được tải lại tối đa
+    retries lần, để một response 503 không bị hiểu là đã hết danh mục
+    """
+    for attempt in range(retries + 1):
+        items = get_listing_items(session, url)
+        if items is not None or attempt == retries:
+            return items
+        print(f"    Thử lại trang danh mục ({attempt + 1}/{retries})...")
+        if politeness:
+            politeness.wait('listing')
+        else:
+            time.sleep(LISTING_RETRY_DELAY * (attempt + 1))
+
+def build_engine(engine, extract_mode='webdriver', cache=None, browser_profile='full', browser_service=False,
+                 field_metrics=None, archive=None, politeness=None):
+    """
+    Trả về (session_factory, close_fn, listing_fn, detail_fn) cho engine đồng bộ.
+    politeness (AdaptiveDelay / SharedPoliteness) được báo thời gian của từng lần tải trang
+    """
+    fetch_selenium = partial(get_book_details, extract_mode=extract_mode, metrics=field_metrics, archive=archive,
+                             politeness=politeness)
+    listing_selenium = partial(get_listing_items_selenium, politeness=politeness)
+    driver_factory = partial(create_chrome_driver, profile=browser_profile)
+    if engine == 'selenium':
+        if browser_service:
+            return (partial(create_service_driver, profile=browser_profile), close_chrome_driver,
+                    listing_selenium, fetch_selenium)
+        return driver_factory, lambda d: d.quit(), listing_selenium, fetch_selenium
+    if engine == 'http':
+        # Selenium chỉ dùng làm fallback cho trang cần JavaScript
+        session_factory = partial(
+            HttpCrawlSession,
+            fallback_driver_factory=driver_factory,
+            fallback_fetch=fetch_selenium,
+            cache=cache,
+            archive=archive,
+            politeness=politeness
+        )
+        return session_factory, lambda s: s.close(), get_listing_items_http, get_book_details_http
+    raise ValueError(f"Engine không hợp lệ: {engine}")
+
+def async_unsupported_options(workers=1, skip_unchanged=False, pipeline=False, revisit_budget=0,
+                              browser_service=False, resume=False, sitemaps=None, field_metrics=None):
+    """
+    Tuỳ chọn mà engine async chưa hỗ trợ (nó chỉ crawl listing -> chi tiết qua cache / archive
+    vào cùng sink): không checkpoint, frontier, revisit, sitemap hay field metrics
+    """
+    used = (
+        ('--workers', workers > 1),
+        ('--skip-unchanged', skip_unchanged),
+        ('--pipeline', pipeline),
+        ('--revisit-budget', revisit_budget > 0),
+        ('--browser-service', browser_service),
+        ('--resume', resume),
+        ('--sitemap', bool(sitemaps)),
+        ('--field-metrics', bool(field_metrics)),
+    )
+    return [flag for flag, on in used if on]
+
+def scrape_fahasa_async(target_books, crawl_log_id=None, concurrency=8, rate=4.0, cache=None, stage_batch=0,
+                        listing_url=LISTING_URL, load_staging=True, archive=None):
+    """Crawl bằng asyncio engine (aiohttp), kết quả đi vào cùng bước lưu file/staging"""
+    from async_crawler import run_async_crawl
+    
+    file_sink, sink = open_record_sink(stage_batch)
+    try:
+        collected, failed = run_async_crawl(
+            listing_url, target_books,
+            concurrency=concurrency, rate=rate,
+            on_result=sink.write, cache=cache, archive=archive
+        )
+        print(f"\nAsync crawl: {collected} thành công, {failed} lỗi")
+    except KeyboardInterrupt:
+        print(f"\nNgười dùng dừng chương trình - Đã thu thập {sink.count} sách")
+        if logger and crawl_log_id:
+            logger.log_crawl_error(crawl_log_id, f"Crawl interrupted by user. Collected {sink.count} books")
+        return None
+    except Exception as e:
+        print(f"\nLỗi: {e}")
+        if logger and crawl_log_id:
+            logger.log_crawl_error(crawl_log_id, str(e))
+        return None
+    finally:
+        sink.close()
+    
+    return finish_crawl_results(file_sink, sink.count, target_books, crawl_log_id,
+                                staging=sink.sink_of(StagingBatchSink), load_staging=load_staging)
+
+def scrape_fahasa_bulk(target_books=100, workers=1, max_per_host=2, engine='selenium',
+                       concurrency=8, rate=4.0, extract_mode='webdriver', skip_unchanged=False,
+                       pipeline=False, prefetch=48, fresh_hours=24, revisit_budget=0,
+                       use_cache=False, cache_ttl=24, cache_only=False, browser_profile='full',
+                       browser_service=False, resume=False, stage_batch=0, sitemaps=None,
+                       listing_url=LISTING_URL, polite=True, load_staging=True, field_metrics=None,
+                       archive_html=False):
     """
     Crawl exact number of books specified
     Args:
         target_books: Number of books to crawl (default: 100)
+        workers: Number of parallel workers for detail pages (default: 1)
+        max_per_host: Max concurrent requests per host when workers > 1
+        engine: 'selenium' (Chrome), 'http' (plain HTTP + lxml, Selenium fallback)
+                or 'async' (asyncio + aiohttp)
+        concurrency: Async engine - max in-flight requests per host
+        rate: Async engine - token-bucket requests/second per host
+        extract_mode: Selenium extraction - 'webdriver' (per field), 'snapshot' (page_source + lxml)
+                      or 'js' (single execute_script)
+        skip_unchanged: Skip detail pages whose listing data (title, price, discount,
+                        sold badge) is unchanged since the last run, regardless of age
+        pipeline: Keep paginating listing pages while detail workers drain a
+                  bounded queue, instead of finishing each page before the next
+        prefetch: Pipeline queue size (product URLs buffered ahead of workers)
+        fresh_hours: Products fetched less than this many hours ago (per the local
+                     frontier) are skipped unless their listing data changed
+        revisit_budget: Detail pages (out of target_books) spent first on refetching
+                        known products most likely to have changed, per staging history
+        use_cache: HTTP / async engines read and write the on-disk page cache
+        cache_ttl: Hours a cached page is served without revalidation
+        cache_only: Replay from the page cache only, no network (implies use_cache,
+                    runs on the http engine when selenium is requested)
+        browser_profile: 'full' (normal Chrome) or 'lite' (headless, eager page load,
+                         images / fonts / trackers blocked)
+        browser_service: Selenium engine attaches to warm Chrome instances leased from
+                         browser_service.py instead of cold-starting Chrome
+        resume: Continue the run recorded in the crawl checkpoint (output files, processed
+                URLs, queued URLs, next listing page) instead of starting over
+        stage_batch: Also insert records into staging_books every N books while crawling
+                     (0 = load the CSV files into staging once the crawl ends)
+        sitemaps: Sitemap URLs / local files; products that are new or whose lastmod is
+                  newer than the last fetch are crawled before the listing pages
+        listing_url: Listing page template with {limit} and {page} (e.g. a local mock server)
+        polite: False skips the adaptive delay between requests - only for local servers
+        load_staging: False keeps the results in the JSONL/CSV files without loading staging
+        field_metrics: JSONL path - time every field of the 'webdriver' extractor (selector
+                       hit / miss, fallback depth) and print the slowest fields at the end
+        archive_html: Store the raw HTML of every product page in data/.html_archive
+                      (rolling .warc.gz + offset index) for offline re-parsing with
+                      reparse_archive.py
     """
+    if engine == 'async':
+        unsupported = async_unsupported_options(workers, skip_unchanged, pipeline, revisit_budget,
+                                                browser_service, resume, sitemaps, field_metrics)
+        if unsupported:
+            raise ValueError(f"Engine async không hỗ trợ {', '.join(unsupported)} - dùng engine http")
+    
     print("FAHASA BULK SCRAPER - THU THẬP THEO SỐ SÁCH")
     print("=" * 60)
     print(f"Mục tiêu: {target_books} sách")
@@ -389,35 +743,44 @@ def scrape_fahasa_bulk(target_books=100):
     if logger:
         crawl_log_id = logger.log_crawl_start(target_books)
     
-    chrome_options = Options()
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--disable-dev-shm-usage')
-    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_experimental_option('useAutomationExtension', False)
+    cache = None
+    if use_cache or cache_only:
+        if cache_only and engine == 'selenium':
+            print("Cache-only: dùng engine http để đọc HTML từ cache")
+            engine = 'http'
+        cache = PageCache(ttl_hours=cache_ttl, offline=cache_only)
+    # Chạy lại hoàn toàn từ cache thì không cần chờ giữa các request
+    politeness = AdaptiveDelay() if polite and not cache_only else None
+    archive = HtmlArchive() if archive_html else None
+    
+    if engine == 'async':
+        try:
+            return scrape_fahasa_async(target_books, crawl_log_id, concurrency, rate, cache, stage_batch,
+                                       listing_url, load_staging, archive)
+        finally:
+            selector_registry.save()
+            if archive:
+                print(archive.summary())
+                archive.close()
+            if cache:
+                print(cache.summary())
+                cache.close()
+    
+    metrics = None
+    if field_metrics:
+        if extract_mode == 'webdriver':
+            metrics = FieldMetricsRecorder(field_metrics)
+        else:
+            print(f"⚠️ Field metrics chỉ đo extract mode 'webdriver' (đang dùng '{extract_mode}')")
     
+    session_factory, close_session, get_listing_items, fetch_detail = build_engine(
+        engine, extract_mode, cache, browser_profile, browser_service, metrics, archive, politeness)
     
-    driver = None
+    session = None
     try:
-        print("Đang setup ChromeDriver...")
-        
-        
-        try:
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-        except Exception as e1:
-            print(f"Method 1 failed: {str(e1)[:100]}...")
-            
-            
-            try:
-                driver = webdriver.Chrome(options=chrome_options)
-            except Exception as e2:
-                print(f"Method 2 failed: {str(e2)[:100]}...")
-                raise Exception("Không thể khởi tạo ChromeDriver")
-        
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        driver.set_page_load_timeout(30)
-        print("ChromeDriver setup thành công!")
+        print(f"Đang setup session (engine: {engine})...")
+        session = session_factory()
+        print("Session setup thành công!")
         
     except Exception as e:
         print(f"Lỗi ChromeDriver: {e}")
@@ -426,83 +789,184 @@ def scrape_fahasa_bulk(target_books=100):
         print("   2. Restart máy tính và thử lại")
         print("   3. Cập nhật Chrome browser")
         print("   4. Kiểm tra antivirus không block chromedriver")
+        if cache:
+            cache.close()
+        if metrics:
+            metrics.close()
+        if archive:
+            archive.close()
         return
     
-    books_data = []
-    collected_count = 0
-    page = 1
+    # Checkpoint: mọi sách / URL đã xử lý được ghi ngay để --resume tiếp tục khi bị dừng
+    checkpoint = CrawlCheckpoint()
+    if resume and checkpoint.exists():
+        checkpoint.load()
+        print(f"Resume: {checkpoint.collected} sách, {len(checkpoint.processed)} URL đã xử lý, "
+              f"{len(checkpoint.pending)} URL chờ, tiếp tục từ trang {checkpoint.page}")
+    else:
+        if resume:
+            print("Không có checkpoint để resume - bắt đầu lần crawl mới")
+        elif checkpoint.exists():
+            print("Bỏ qua checkpoint của lần chạy trước (dùng --resume để tiếp tục)")
+        checkpoint.start(target_books=target_books, engine=engine)
+    
+    # Mỗi sách được ghi ra file (và staging nếu stage_batch) ngay khi trích xuất xong
+    file_sink, sink = open_record_sink(stage_batch, checkpoint.record_segment, checkpoint.segments)
+    collected_count = checkpoint.collected
+    page = checkpoint.page
     books_per_page = 24  # Fahasa default items per page
     
+    frontier = Frontier()
+    listing_items = {}
+    
+    def record_book(book):
+        sink.write(book)
+        checkpoint.record_done(book)
+        item = listing_items.get(book['url'])
+        frontier.mark_fetched(book, listing_fingerprint(item) if item else None)
+    
+    pool = None
+    submitted = 0
+    crawl_progress = CrawlProgress(target_books, collected=collected_count)
+    if workers > 1 or pipeline:
+        print(f"Khởi tạo {workers} worker song song (tối đa {max_per_host} request/host)...")
+        pool = DetailWorkerPool(
+            num_workers=workers,
+            session_factory=session_factory,
+            fetch_fn=fetch_detail,
+            progress=crawl_progress,
+            host_limiter=HostLimiter(max_per_host),
+            close_fn=close_session,
+            on_result=record_book,
+            on_failure=checkpoint.record_failed,
+            delay_range=None,
+            wait=politeness.wait if politeness else None,
+            queue_size=prefetch if pipeline else 0
+        ).start()
+    
+    # Ưu tiên: URL còn chờ từ checkpoint, rồi sách có xác suất đã thay đổi cao nhất,
+    # sách mới / thay đổi theo sitemap, phần còn lại theo listing
+    # Cùng một sách thường có cả trong revisit lẫn sitemap: gộp bỏ trùng để không tải / ghi hai lần
+    priority_urls = merge_priority_urls(checkpoint.pending, skip=checkpoint.is_processed)
+    if not resume:
+        revisit_urls = [item['url'] for item in plan_revisits(min(revisit_budget, target_books))]
+        if revisit_urls:
+            print(f"Revisit: {len(revisit_urls)} sách được ưu tiên crawl lại theo tần suất thay đổi")
+        priority_urls = merge_priority_urls(priority_urls, revisit_urls, skip=checkpoint.is_processed)
+        if sitemaps and len(priority_urls) < target_books:
+            # limit=target_books: đủ bù cho các URL trùng với danh sách ưu tiên hiện có
+            sitemap_urls = discover_changed_products(sitemaps, frontier, fresh_hours=fresh_hours,
+                                                     limit=target_books)
+            queued = set(priority_urls)
+            extra = merge_priority_urls(
+                sitemap_urls, skip=lambda url: url in queued or checkpoint.is_processed(url))
+            priority_urls += extra[:target_books - len(priority_urls)]
+    
     try:
         while collected_count < target_books:
             remaining = target_books - collected_count
-            print(f"\nTRANG {page} - CẦN THÊM {remaining} SÁCH")
-            print("-" * 50)
-            
-            # Build URL with appropriate limit
-            url = f"https://www.fahasa.com/sach-trong-nuoc.html?order=num_orders&limit={books_per_page}&p={page}"
-            print(f"Truy cập: {url}")
-            
-            driver.get(url)
-            time.sleep(random.uniform(3, 5))
-            
-            # Find products
-            try:
-                products = WebDriverWait(driver, 15).until(
-                    EC.presence_of_all_elements_located((By.CSS_SELECTOR, '.item-inner'))
-                )
-                print(f"Tìm thấy {len(products)} sản phẩm trong trang")
-            except:
-                print("Không tìm thấy sản phẩm, có thể hết dữ liệu")
-                break
-            
-            # Get product URLs
-            product_urls = []
-            for product in products:
-                try:
-                    link = product.find_element(By.TAG_NAME, 'a')
-                    url_product = link.get_attribute('href')
-                    if url_product and 'flashsale' not in url_product.lower():
-                        product_urls.append(url_product)
-                except:
-                    continue
-            
-            if not product_urls:
-                print("Không tìm thấy URL sản phẩm hợp lệ")
-                break
+            prioritized = bool(priority_urls)
+            skipped = 0
+            if prioritized:
+                print(f"\nƯU TIÊN (resume / revisit / sitemap) - CẦN THÊM {remaining} SÁCH")
+                print("-" * 50)
+                product_urls, priority_urls = priority_urls, []
+            else:
+                print(f"\nTRANG {page} - CẦN THÊM {remaining} SÁCH")
+                print("-" * 50)
+                
+                # Build URL with appropriate limit
+                url = listing_url.format(limit=books_per_page, page=page)
+                print(f"Truy cập: {url}")
+                
+                items = fetch_listing(get_listing_items, session, url, politeness)
+                if politeness:
+                    politeness.wait('listing')
+                if items is None:
+                    print("Không tìm thấy sản phẩm, có thể hết dữ liệu")
+                    break
+                
+                if not items:
+                    print("Không tìm thấy URL sản phẩm hợp lệ")
+                    break
+                
+                product_urls = []
+                for item in items:
+                    if checkpoint.is_processed(item['url']) or not frontier.needs_fetch(
+                            item['url'], fresh_hours, listing_fingerprint(item), skip_unchanged):
+                        skipped += 1
+                        continue
+                    listing_items[item['url']] = item
+                    product_urls.append(item['url'])
+                if skipped:
+                    print(f"Bỏ qua {skipped} sách đã crawl gần đây / không đổi")
             
             # Limit products to collect based on remaining target
             max_to_collect = min(len(product_urls), remaining)
             product_urls = product_urls[:max_to_collect]
             
-            print(f"Sẽ thu thập tối đa {max_to_collect} sách từ trang {page}")
+            checkpoint.record_queued(product_urls)
+            print(f"Sẽ thu thập tối đa {max_to_collect} sách từ {'danh sách ưu tiên' if prioritized else f'trang {page}'}")
             
             # Collect book details
             page_success = 0
-            for i, book_url in enumerate(product_urls, 1):
-                if collected_count >= target_books:
-                    print(f"✅ ĐẠT MỤC TIÊU {target_books} SÁCH - DỪNG CRAWL")
-                    break
+            if pipeline:
+                # Producer: đẩy URL vào hàng đợi giới hạn rồi sang trang kế tiếp ngay,
+                # chỉ chờ worker khi số URL đã gửi đủ bù cho mục tiêu
+                for book_url in product_urls:
+                    pool.submit(book_url)
+                submitted += len(product_urls)
+                if submitted - crawl_progress.failed >= target_books:
+                    pool.wait()
+                page_success = crawl_progress.collected - collected_count
+                if page_success == 0 and product_urls:
+                    # Chưa có kết quả mới: chờ worker xử lý xong để biết trang có thu được gì không
+                    pool.wait()
+                    page_success = crawl_progress.collected - collected_count
+                collected_count = crawl_progress.collected
+                print(f"    Đã đưa {len(product_urls)} URL vào hàng đợi - 📊 {crawl_progress.summary()}")
+            elif pool:
+                for book_url in product_urls:
+                    pool.submit(book_url)
+                pool.wait()
+                page_success = crawl_progress.collected - collected_count
+                collected_count = crawl_progress.collected
+                print(f"    📊 Tiến độ: {crawl_progress.summary()}")
+            else:
+                for i, book_url in enumerate(product_urls, 1):
+                    if collected_count >= target_books:
+                        print(f"✅ ĐẠT MỤC TIÊU {target_books} SÁCH - DỪNG CRAWL")
+                        break
                 
-                print(f"\nSách {collected_count + 1}/{target_books}:")
+                    print(f"\nSách {collected_count + 1}/{target_books}:")
                 
-                book_data = get_book_details(driver, book_url)
-                if book_data:
-                    print(f"    {book_data['title'][:50]}...")
-                    print(f"    Giá: {book_data['discount_price']:,.0f} VNĐ")
-                    print("    ✅ Collected")
-                    books_data.append(book_data)
-                    collected_count += 1
-                    page_success += 1
-                    time.sleep(random.uniform(2, 4))
-                else:
-                    print(f"    Không lấy được dữ liệu hoặc không có giá")
+                    try:
+                        book_data = fetch_detail(session, book_url)
+                    except Exception as e:
+                        # Lỗi của một trang (như worker pool) không được dừng cả lần crawl
+                        print(f"    Lỗi xử lý trang: {e}")
+                        book_data = None
+                    if book_data:
+                        print(f"    {book_data['title'][:50]}...")
+                        print(f"    Giá: {book_data['discount_price']:,.0f} VNĐ")
+                        print("    ✅ Collected")
+                        record_book(book_data)
+                        collected_count += 1
+                        page_success += 1
+                    else:
+                        print("    Không lấy được dữ liệu hoặc không có giá")
+                        checkpoint.record_failed(book_url)
+                    if politeness:
+                        politeness.wait('detail')
                 
-                # Progress indicator
-                progress = (collected_count / target_books) * 100
-                print(f"    📊 Tiến độ: {collected_count}/{target_books} ({progress:.1f}%)")
+                    # Progress indicator
+                    progress = (collected_count / target_books) * 100
+                    print(f"    📊 Tiến độ: {collected_count}/{target_books} ({progress:.1f}%)")
             
-            print(f"\nKẾT QUẢ TRANG {page}: +{page_success} sách")
+            if pool and not pool.alive:
+                raise RuntimeError("Không worker nào khởi tạo được session (Chrome / HTTP)")
+            if not pipeline:
+                print(f"\nKẾT QUẢ {'ƯU TIÊN' if prioritized else f'TRANG {page}'}: +{page_success} sách")
             print(f"TỔNG ĐÃ THU THẬP: {collected_count}/{target_books} sách")
             
             # Check if we reached target or no more books
@@ -510,85 +974,67 @@ def scrape_fahasa_bulk(target_books=100):
                 print(f"🎯 HOÀN THÀNH MỤC TIÊU: {collected_count} sách!")
                 break
             
-            if page_success == 0:
+            if prioritized:
+                continue
+            
+            if page_success == 0 and not skipped:
                 print("Không thu thập được sách nào, có thể hết dữ liệu")
                 break
             
             # Next page
             page += 1
-            delay = random.uniform(5, 8)
-            print(f"Chờ {delay:.1f}s trước trang tiếp theo...")
-            time.sleep(delay)
+            checkpoint.record_page(page)
+            if politeness:
+                print(f"Chờ trước trang tiếp theo ({politeness.summary()})...")
+                politeness.wait('page')
         
-        if books_data:
-            # Save data with backup by date only
-            from datetime import datetime
-            
-            # Create backup directory by date
-            now = datetime.now()
-            data_dir = os.path.join(os.path.dirname(__file__), '../../data')
-            backup_dir = os.path.join(data_dir, str(now.year), f"{now.month:02d}", f"{now.day:02d}")
-            os.makedirs(backup_dir, exist_ok=True)
-            
-            # Backup files with timestamp (only new books for this crawl)
-            timestamp = now.strftime("%Y%m%d_%H%M%S")
-            backup_file_json = os.path.join(backup_dir, f'fahasa_books_{timestamp}.json')
-            backup_file_csv = os.path.join(backup_dir, f'fahasa_books_{timestamp}.csv')
-
-            # Save backup files (only new books from this crawl session)
-            with open(backup_file_json, 'w', encoding='utf-8') as f:
-                json.dump(books_data, f, ensure_ascii=False, indent=2)
-            
-            # Save CSV backup
-            import pandas as pd
-            df_new = pd.DataFrame(books_data)
-            df_new.to_csv(backup_file_csv, index=False, encoding='utf-8')
-
-            print(f"\n🎉 HOÀN TẤT CRAWL!")
-            print(f"Thu thập được: {len(books_data)}/{target_books} sách ({len(books_data)/target_books*100:.1f}%)")
-            print(f"Đã lưu JSON: {backup_file_json}")
-            print(f"Đã lưu CSV: {backup_file_csv}")
-            
-            # Auto-load to staging
-            print(f"\n🚀 TỰ ĐỘNG LOAD CSV VÀO STAGING...")
-            load_success = load_csv_to_staging(backup_file_csv)
-            
-            if load_success:
-                print(f"✅ ĐÃ LOAD {len(books_data)} SÁCH VÀO STAGING!")
-                print(f"🔄 WORKFLOW HOÀN TẤT: Crawl {target_books} → File → Staging")
-                
-                # Log crawl success
-                if logger and crawl_log_id:
-                    logger.log_crawl_success(crawl_log_id, len(books_data), backup_file_csv, backup_file_json)
-            else:
-                print(f"❌ Lỗi load CSV vào staging")
-                print(f"💡 Có thể chạy thủ công: python src/etl/load_csv_to_staging.py {backup_file_csv}")
-                
-                # Log crawl with warning
-                if logger and crawl_log_id:
-                    logger.log_crawl_success(crawl_log_id, len(books_data), backup_file_csv, backup_file_json)
-                    logger.log_operation(
-                        operation_type="STAGING_LOAD_ERROR",
-                        status=LogStatus.FAILED,
-                        log_level=LogLevel.WARN,
-                        error_message="Failed to auto-load CSV to staging",
-                        location="fahasa_bulk_scraper.py"
-                    )
-            
-            return backup_file_csv  # Return CSV path for chaining
+        if pipeline:
+            pool.wait()
+            collected_count = crawl_progress.collected
+        
+        sink.close()
+        csv_path = finish_crawl_results(file_sink, collected_count, target_books, crawl_log_id,
+                                        staging=sink.sink_of(StagingBatchSink), load_staging=load_staging)
+        checkpoint.clear()
+        return csv_path
         
     except KeyboardInterrupt:
         print(f"\nNgười dùng dừng chương trình - Đã thu thập {collected_count} sách")
+        print("💾 Checkpoint đã lưu - chạy lại với --resume để tiếp tục")
         # Log interrupted crawl
         if logger and crawl_log_id:
             logger.log_crawl_error(crawl_log_id, f"Crawl interrupted by user. Collected {collected_count} books")
     except Exception as e:
         print(f"\nLỗi: {e}")
+        print("💾 Checkpoint đã lưu - chạy lại với --resume để tiếp tục")
         # Log crawl error
         if logger and crawl_log_id:
             logger.log_crawl_error(crawl_log_id, str(e))
     finally:
-        driver.quit()
+        if pool:
+            pool.close(cancel=True)
+        sink.close()
+        checkpoint.close()
+        close_session(session)
+        frontier.close()
+        selector_registry.save()
+        print(selector_registry.summary())
+        if cache:
+            print(cache.summary())
+            cache.close()
+        if archive:
+            print(archive.summary())
+            archive.close()
+        if politeness:
+            politeness.save()
+            print(politeness.summary())
+            if logger:
+                logger.log_crawl_rate(politeness.rate, politeness.delay)
+        if metrics:
+            print(metrics.summary(limit=10))
+            if logger and metrics.stats.pages:
+                logger.log_field_metrics(metrics.stats.pages, metrics.slowest(), metrics.path)
+            metrics.close()
         print("Đóng trình duyệt")
 
 
@@ -596,19 +1042,87 @@ if __name__ == "__main__":
     # SIMPLE CONFIGURATION - Just set number of books!
     TARGET_BOOKS = 10  # ← CHỈNH SỐ SÁCH Ở ĐÂY
     
+    parser = argparse.ArgumentParser(description='Fahasa Bulk Scraper')
+    parser.add_argument('mode', nargs='?', default='',
+                        help="'quick' để chạy không cần xác nhận")
+    parser.add_argument('--quick', '-q', action='store_true',
+                        help='Chạy ngay không cần xác nhận')
+    parser.add_argument('--books', type=int, default=TARGET_BOOKS,
+                        help=f'Số sách cần crawl (mặc định: {TARGET_BOOKS})')
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help='Số Chrome worker song song cho trang chi tiết')
+    parser.add_argument('--max-per-host', type=int, default=2,
+                        help='Số request đồng thời tối đa tới mỗi host')
+    parser.add_argument('--engine', choices=['selenium', 'http', 'async'], default='selenium',
+                        help='selenium: Chrome | http: HTTP + lxml (fallback Selenium) | async: asyncio + aiohttp')
+    parser.add_argument('--extract', choices=sorted(EXTRACTORS), default='webdriver',
+                        help='Selenium: webdriver (từng trường) | snapshot (page_source một lần) | js (một lần execute_script)')
+    parser.add_argument('--browser-profile', choices=BROWSER_PROFILES, default='full',
+                        help='lite: Chrome headless, eager, chặn ảnh/font/tracker')
+    parser.add_argument('--browser-service', action='store_true',
+                        help='Gắn vào Chrome ấm của browser_service.py thay vì mở Chrome mới')
+    parser.add_argument('--skip-unchanged', action='store_true',
+                        help='Bỏ qua trang chi tiết nếu dữ liệu listing không đổi từ lần trước')
+    parser.add_argument('--fresh-hours', type=float, default=24,
+                        help='Selenium / http: bỏ qua sách đã crawl trong N giờ qua (0 = luôn crawl lại)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Tiếp tục lần crawl bị dừng từ checkpoint (không tải lại URL đã xử lý)')
+    parser.add_argument('--stage-batch', type=int, default=0,
+                        help='Insert vào staging mỗi N sách trong lúc crawl (0 = load CSV khi kết thúc)')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='Tải trước trang danh mục trong khi worker xử lý trang chi tiết')
+    parser.add_argument('--prefetch', type=int, default=48,
+                        help='Pipeline: số URL tối đa trong hàng đợi')
+    parser.add_argument('--revisit-budget', type=int, default=0,
+                        help='Số sách (trong --books) dành cho crawl lại sản phẩm hay thay đổi nhất')
+    parser.add_argument('--sitemap', action='append', dest='sitemaps',
+                        help='URL / file sitemap: ưu tiên sản phẩm mới hoặc có lastmod mới (lặp lại được)')
+    parser.add_argument('--field-metrics', nargs='?', const=DEFAULT_METRICS_PATH,
+                        help='Đo thời gian từng trường của extract webdriver, ghi JSONL (mặc định data/.crawl_state/field_metrics.jsonl)')
+    parser.add_argument('--archive-html', action='store_true',
+                        help='Lưu HTML trang sản phẩm vào data/.html_archive để parse lại offline (reparse_archive.py)')
+    parser.add_argument('--cache', action='store_true',
+                        help='HTTP/async: lưu và dùng lại HTML trong data/.page_cache')
+    parser.add_argument('--cache-ttl', type=float, default=24,
+                        help='Số giờ trang trong cache được dùng không cần kiểm tra lại')
+    parser.add_argument('--cache-only', action='store_true',
+                        help='Chạy lại hoàn toàn offline từ cache (không truy cập mạng)')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Async engine: số request đồng thời tối đa mỗi host')
+    parser.add_argument('--rate', type=float, default=4.0,
+                        help='Async engine: số request/giây mỗi host (token bucket)')
+    args = parser.parse_args()
+    if args.engine == 'async':
+        unsupported = async_unsupported_options(args.workers, args.skip_unchanged, args.pipeline,
+                                                args.revisit_budget, args.browser_service, args.resume,
+                                                args.sitemaps, args.field_metrics)
+        if unsupported:
+            parser.error(f"--engine async không hỗ trợ {', '.join(unsupported)} (dùng --engine http)")
+    
     # Check for quick run argument
-    quick_run = len(sys.argv) > 1 and sys.argv[1] in ['--quick', '-q', 'quick']
+    quick_run = args.quick or args.mode == 'quick'
     
     print("CẤU HÌNH:")
-    print(f"   Số sách cần crawl: {TARGET_BOOKS}")
+    print(f"   Số sách cần crawl: {args.books}")
+    print(f"   Số worker: {args.workers}")
+    print(f"   Engine: {args.engine}")
     print()
     
+    crawl_kwargs = dict(workers=args.workers, max_per_host=args.max_per_host, engine=args.engine,
+                        concurrency=args.concurrency, rate=args.rate, extract_mode=args.extract,
+                        skip_unchanged=args.skip_unchanged, pipeline=args.pipeline,
+                        prefetch=args.prefetch, fresh_hours=args.fresh_hours,
+                        revisit_budget=args.revisit_budget, use_cache=args.cache,
+                        cache_ttl=args.cache_ttl, cache_only=args.cache_only,
+                        browser_profile=args.browser_profile, browser_service=args.browser_service,
+                        resume=args.resume, stage_batch=args.stage_batch, sitemaps=args.sitemaps,
+                        field_metrics=args.field_metrics, archive_html=args.archive_html)
     if quick_run:
-        print(f"🚀 QUICK MODE - Crawl {TARGET_BOOKS} sách!")
-        scrape_fahasa_bulk(TARGET_BOOKS)
+        print(f"🚀 QUICK MODE - Crawl {args.books} sách!")
+        scrape_fahasa_bulk(args.books, **crawl_kwargs)
     else:
-        choice = input(f"Bắt đầu crawl {TARGET_BOOKS} sách? (y/n): ").lower()
+        choice = input(f"Bắt đầu crawl {args.books} sách? (y/n): ").lower()
         if choice == 'y':
-            scrape_fahasa_bulk(TARGET_BOOKS)
+            scrape_fahasa_bulk(args.books, **crawl_kwargs)
         else:
-            print("Hủy bỏ")
\ No newline at end of file
+            print("Hủy bỏ")
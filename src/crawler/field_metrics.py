@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Field Metrics
+Đo (tùy chọn) từng trường trong extract_book_webdriver trên mỗi trang:
+thời gian, có lấy được giá trị không (hit / miss), selector nào trúng và phải
+thử tới fallback thứ mấy. Mỗi trang là một dòng JSONL; cuối lần chạy in bảng
+tổng hợp theo tổng thời gian để biết selector nào cần sửa trước.
+
+Cách dùng:
+    python src/crawler/fahasa_bulk_scraper.py --field-metrics
+    python src/crawler/field_metrics.py [data/.crawl_state/field_metrics.jsonl]
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+DEFAULT_METRICS_PATH = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'data', '.crawl_state', 'field_metrics.jsonl'
+)
+
+
+class FieldProbe:
+    """Extractor gọi attempt(selector) trước mỗi selector / fallback của trường"""
+    __slots__ = ('depth', 'selector', 'hit')
+
+    def __init__(self):
+        self.depth = 0
+        self.selector = None
+        # Trường có giá trị mặc định hợp lệ (vd. giá 0) tự đặt hit = True khi đọc được
+        self.hit = None
+
+    def attempt(self, selector):
+        self.depth += 1
+        self.selector = selector
+
+
+class PageMetrics:
+    def __init__(self, recorder, url):
+        self.recorder = recorder
+        self.url = url
+        self.fields = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def field(self, name, book, *keys):
+        """
+        Đo một khối trích xuất. keys: các trường của book mà khối này ghi
+        (mặc định chính name); hit = ít nhất một trường thay đổi so với mặc định.
+        """
+        keys = keys or (name,)
+        before = [book.get(k) for k in keys]
+        probe = FieldProbe()
+        started = time.perf_counter()
+        try:
+            yield probe
+        finally:
+            hit = probe.hit if probe.hit is not None else \
+                any(book.get(k) != v for k, v in zip(keys, before))
+            self.fields[name] = {
+                'ms': round((time.perf_counter() - started) * 1000, 3),
+                'hit': hit,
+                'depth': probe.depth or 1,
+                'selector': probe.selector if hit else None,
+            }
+
+    def finish(self, ok):
+        self.recorder.record({
+            'url': self.url,
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'ok': bool(ok),
+            'total_ms': round((time.perf_counter() - self._started) * 1000, 3),
+            'fields': self.fields,
+        })
+
+
+class _NullPage:
+    """Khi không bật metrics: không đo gì"""
+
+    @contextmanager
+    def field(self, name, book, *keys):
+        yield FieldProbe()
+
+    def finish(self, ok):
+        pass
+
+
+NULL_PAGE = _NullPage()
+
+
+class FieldStats:
+    """Tổng hợp theo trường từ các bản ghi trang"""
+
+    def __init__(self):
+        self.pages = 0
+        self.fields = {}
+
+    def add(self, record):
+        self.pages += 1
+        for name, m in record['fields'].items():
+            s = self.fields.setdefault(name, {'count': 0, 'hits': 0, 'ms': 0.0, 'max_ms': 0.0,
+                                              'depth': 0, 'selectors': Counter()})
+            s['count'] += 1
+            s['hits'] += m['hit']
+            s['ms'] += m['ms']
+            s['max_ms'] = max(s['max_ms'], m['ms'])
+            s['depth'] += m['depth']
+            if m['selector']:
+                s['selectors'][m['selector']] += 1
+
+    def rows(self):
+        """Các trường theo tổng thời gian giảm dần"""
+        rows = []
+        for name, s in self.fields.items():
+            top = s['selectors'].most_common(1)
+            rows.append({
+                'field': name,
+                'count': s['count'],
+                'hit_rate': s['hits'] / s['count'],
+                'avg_ms': s['ms'] / s['count'],
+                'max_ms': s['max_ms'],
+                'total_ms': s['ms'],
+                'avg_depth': s['depth'] / s['count'],
+                'top_selector': top[0][0] if top else None,
+            })
+        return sorted(rows, key=lambda r: r['total_ms'], reverse=True)
+
+    def summary(self, limit=None):
+        lines = [f"Field metrics: {self.pages} trang",
+                 f"{'Trường':<22}{'hit':>7}{'TB ms':>9}{'max ms':>9}{'tổng ms':>10}{'fallback':>10}  selector trúng nhiều nhất"]
+        for r in self.rows()[:limit]:
+            lines.append(f"{r['field']:<22}{r['hit_rate']:>7.0%}{r['avg_ms']:>9.1f}{r['max_ms']:>9.1f}"
+                         f"{r['total_ms']:>10.0f}{r['avg_depth']:>10.2f}  {r['top_selector'] or '-'}")
+        return '\n'.join(lines)
+
+
+class FieldMetricsRecorder:
+    def __init__(self, path=DEFAULT_METRICS_PATH):
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.stats = FieldStats()
+        self._lock = threading.Lock()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def page(self, url):
+        return PageMetrics(self, url)
+
+    def record(self, page_record):
+        with self._lock:
+            self._file.write(json.dumps(page_record, ensure_ascii=False) + '\n')
+            self._file.flush()
+            self.stats.add(page_record)
+
+    def summary(self, limit=None):
+        with self._lock:
+            return self.stats.summary(limit)
+
+    def slowest(self, limit=3):
+        """Chuỗi ngắn các trường tốn thời gian nhất (cho control log)"""
+        with self._lock:
+            rows = self.stats.rows()[:limit]
+        return ', '.join(f"{r['field']} {r['avg_ms']:.0f}ms (hit {r['hit_rate']:.0%}, fallback {r['avg_depth']:.1f})"
+                         for r in rows)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def load_stats(path=DEFAULT_METRICS_PATH):
+    stats = FieldStats()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                stats.add(json.loads(line))
+            except (ValueError, KeyError):
+                continue
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tổng hợp field metrics của extract_book_webdriver')
+    parser.add_argument('path', nargs='?', default=DEFAULT_METRICS_PATH, help='File JSONL metrics')
+    parser.add_argument('--top', type=int, default=None, help='Chỉ in N trường chậm nhất')
+    args = parser.parse_args()
+    print(load_stats(args.path).summary(args.top))
+
+
+if __name__ == "__main__":
+    main()
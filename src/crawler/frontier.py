@@ -0,0 +1,137 @@
+"""
+URL Frontier
+Lưu trữ cục bộ (SQLite) các sản phẩm đã gặp, khoá theo product_key của URL chuẩn hoá:
+thời điểm tải gần nhất, fingerprint nội dung và fingerprint listing.
+Giúp mỗi lần chạy chỉ dùng ngân sách target_books cho sách mới hoặc đã cũ.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
+from product_url import canonicalize_product_url, product_key
+
+DEFAULT_FRONTIER_DB = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'data', '.crawl_state', 'frontier.db'
+)
+
+# Các trường thay đổi theo thời điểm crawl, không tính vào fingerprint nội dung
+VOLATILE_FIELDS = ('time_collect', 'url')
+
+
+def content_fingerprint(book):
+    payload = {k: v for k, v in book.items() if k not in VOLATILE_FIELDS}
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class Frontier:
+    def __init__(self, path=DEFAULT_FRONTIER_DB):
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                url_key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_fetched REAL,
+                fingerprint TEXT,
+                listing_fingerprint TEXT,
+                fetch_count INTEGER NOT NULL DEFAULT 0,
+                change_count INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, url):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT last_fetched, fingerprint, listing_fingerprint FROM frontier WHERE url_key = ?",
+                (product_key(url),)
+            ).fetchone()
+        if not row:
+            return None
+        return {'last_fetched': row[0], 'fingerprint': row[1], 'listing_fingerprint': row[2]}
+
+    def needs_fetch(self, url, fresh_hours=24, listing_fingerprint=None, skip_unchanged=False):
+        """
+        True nếu sản phẩm mới, chưa từng tải, đã quá fresh_hours,
+        hoặc dữ liệu listing thay đổi so với lần trước.
+        skip_unchanged=True: listing không đổi thì bỏ qua bất kể tuổi.
+        """
+        entry = self.get(url)
+        if entry is None or entry['last_fetched'] is None:
+            return True
+        listing_changed = (listing_fingerprint is not None
+                           and listing_fingerprint != entry['listing_fingerprint'])
+        if listing_changed:
+            return True
+        if skip_unchanged and listing_fingerprint is not None:
+            return False
+        return (time.time() - entry['last_fetched']) > fresh_hours * 3600
+
+    def add(self, url):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO frontier (url_key, url, first_seen) VALUES (?, ?, ?)",
+                (product_key(url), canonicalize_product_url(url), time.time())
+            )
+            self.conn.commit()
+
+    def changed_since(self, url, lastmod, fresh_hours=24):
+        """
+        True nếu sản phẩm chưa từng tải hoặc lastmod (epoch giây, ví dụ từ sitemap)
+        sau lần tải gần nhất; lastmod None thì xét theo fresh_hours.
+        """
+        entry = self.get(url)
+        if entry is None or entry['last_fetched'] is None:
+            return True
+        if lastmod is None:
+            return (time.time() - entry['last_fetched']) > fresh_hours * 3600
+        return lastmod > entry['last_fetched']
+
+    def add_many(self, urls):
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO frontier (url_key, url, first_seen) VALUES (?, ?, ?)",
+                [(product_key(url), canonicalize_product_url(url), time.time()) for url in urls]
+            )
+            self.conn.commit()
+
+    def mark_fetched(self, book, listing_fingerprint=None):
+        url = canonicalize_product_url(book['url'])
+        fingerprint = content_fingerprint(book)
+        now = time.time()
+        with self._lock:
+            self.conn.execute("""
+                INSERT INTO frontier (url_key, url, first_seen, last_fetched, fingerprint,
+                                      listing_fingerprint, fetch_count, change_count)
+                VALUES (?, ?, ?, ?, ?, ?, 1, 0)
+                ON CONFLICT(url_key) DO UPDATE SET
+                    url = excluded.url,
+                    last_fetched = excluded.last_fetched,
+                    change_count = change_count + (
+                        CASE WHEN frontier.fingerprint IS NOT NULL
+                              AND frontier.fingerprint != excluded.fingerprint THEN 1 ELSE 0 END),
+                    fingerprint = excluded.fingerprint,
+                    listing_fingerprint = COALESCE(excluded.listing_fingerprint, frontier.listing_fingerprint),
+                    fetch_count = fetch_count + 1
+            """, (product_key(url), url, now, now, fingerprint, listing_fingerprint))
+            self.conn.commit()
+
+    def stats(self):
+        with self._lock:
+            total, fetched = self.conn.execute(
+                "SELECT COUNT(*), COUNT(last_fetched) FROM frontier"
+            ).fetchone()
+        return {'total': total, 'fetched': fetched}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
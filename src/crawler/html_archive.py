@@ -0,0 +1,187 @@
+"""
+HTML Archive
+Lưu HTML gốc của mỗi trang sản phẩm đã tải để trích xuất lại offline khi logic
+parse thay đổi (xem reparse_archive.py), thay vì phải crawl lại:
+- file .warc.gz xoay vòng theo dung lượng và theo ngày trong data/.html_archive/YYYY/MM/DD,
+  mỗi bản ghi là một WARC/1.0 'resource' nén thành một gzip member riêng nên
+  đọc được từng bản ghi bằng (offset, length) mà không giải nén cả file
+- index SQLite (index.db) ánh xạ URL chuẩn hoá -> file, offset, length, thời điểm tải
+- trang không đổi nội dung (cùng sha1) so với bản mới nhất đã lưu thì không ghi lại
+"""
+import base64
+import gzip
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
+from product_url import canonicalize_product_url, product_key
+
+DEFAULT_ARCHIVE_DIR = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'data', '.html_archive'
+)
+DEFAULT_MAX_MB = 128
+
+
+def _warc_record(url, html, fetched_at):
+    body = html.encode('utf-8')
+    digest = base64.b32encode(hashlib.sha1(body).digest()).decode('ascii')
+    headers = [
+        'WARC/1.0',
+        'WARC-Type: resource',
+        f'WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>',
+        f"WARC-Date: {datetime.fromtimestamp(fetched_at, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}",
+        f'WARC-Target-URI: {url}',
+        f'WARC-Payload-Digest: sha1:{digest}',
+        'Content-Type: text/html; charset=utf-8',
+        f'Content-Length: {len(body)}',
+    ]
+    return ('\r\n'.join(headers) + '\r\n\r\n').encode('utf-8') + body + b'\r\n\r\n', digest
+
+
+def parse_warc_record(data):
+    """Bytes (đã giải nén) của một bản ghi -> (headers dict, html)"""
+    head, _, rest = data.partition(b'\r\n\r\n')
+    headers = {}
+    for line in head.decode('utf-8').split('\r\n')[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip()] = value.strip()
+    length = int(headers.get('Content-Length', len(rest)))
+    return headers, rest[:length].decode('utf-8', errors='replace')
+
+
+def read_record(f, offset, length):
+    """Đọc một bản ghi từ file archive đã mở (rb) theo offset trong index"""
+    f.seek(offset)
+    return parse_warc_record(gzip.decompress(f.read(length)))
+
+
+def iter_warc_file(path):
+    """Duyệt tuần tự (offset, length, headers, html) của một file .warc.gz (không cần index)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    offset = 0
+    while offset < len(data):
+        decompressor = zlib.decompressobj(wbits=31)
+        record = decompressor.decompress(data[offset:])
+        length = len(data) - offset - len(decompressor.unused_data)
+        headers, html = parse_warc_record(record)
+        yield offset, length, headers, html
+        offset += length
+
+
+class HtmlArchive:
+    def __init__(self, path=DEFAULT_ARCHIVE_DIR, max_mb=DEFAULT_MAX_MB):
+        self.path = os.path.abspath(path)
+        os.makedirs(self.path, exist_ok=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.written = 0
+        self.unchanged = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._file_rel = None
+        self._file_date = None
+        self.conn = sqlite3.connect(os.path.join(self.path, 'index.db'), timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url_key TEXT NOT NULL,
+                url TEXT NOT NULL,
+                file TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_records_url_key ON records (url_key, fetched_at)")
+        self.conn.commit()
+
+    def _open_file(self):
+        """File mới theo ngày; tên có pid để nhiều process (sharded crawl) không ghi chung file"""
+        if self._file:
+            self._file.close()
+        now = datetime.now()
+        directory = os.path.join(self.path, str(now.year), f"{now.month:02d}", f"{now.day:02d}")
+        os.makedirs(directory, exist_ok=True)
+        base = f"fahasa_html_{now.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        suffix = 1
+        name = f"{base}.warc.gz"
+        while os.path.exists(os.path.join(directory, name)):
+            suffix += 1
+            name = f"{base}_{suffix}.warc.gz"
+        self._file = open(os.path.join(directory, name), 'ab')
+        self._file_rel = os.path.relpath(os.path.join(directory, name), self.path)
+        self._file_date = now.date()
+
+    def write(self, url, html, fetched_at=None):
+        """Lưu HTML của một trang; trả về False nếu giống bản mới nhất đã lưu"""
+        if not html:
+            return False
+        url = canonicalize_product_url(url)
+        key = product_key(url) or url
+        fetched_at = fetched_at or time.time()
+        record, digest = _warc_record(url, html, fetched_at)
+        member = gzip.compress(record)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT digest FROM records WHERE url_key = ? ORDER BY fetched_at DESC LIMIT 1", (key,)
+            ).fetchone()
+            if row and row[0] == digest:
+                self.unchanged += 1
+                return False
+            # Sang ngày mới thì mở file mới trong thư mục của ngày đó (crawl chạy qua nửa đêm)
+            if (self._file is None or self._file.tell() >= self.max_bytes
+                    or self._file_date != datetime.now().date()):
+                self._open_file()
+            offset = self._file.tell()
+            self._file.write(member)
+            self._file.flush()
+            self.conn.execute(
+                "INSERT INTO records (url_key, url, file, offset, length, digest, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, self._file_rel, offset, len(member), digest, fetched_at)
+            )
+            self.conn.commit()
+            self.written += 1
+        return True
+
+    def summary(self):
+        return f"HTML archive: {self.written} trang mới, {self.unchanged} không đổi ({self.path})"
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+            self.conn.close()
+
+
+def archived_entries(path=DEFAULT_ARCHIVE_DIR, since=None, all_versions=False):
+    """
+    Các bản ghi trong index, sắp theo (file, offset) để đọc tuần tự.
+    Mặc định chỉ bản mới nhất của mỗi sản phẩm; since: epoch giây
+    """
+    conn = sqlite3.connect(os.path.join(os.path.abspath(path), 'index.db'))
+    try:
+        where, params = ("WHERE fetched_at >= ?", [since]) if since else ("", [])
+        if all_versions:
+            query = f"SELECT url, file, offset, length, fetched_at FROM records {where}"
+        else:
+            query = f"""
+                SELECT r.url, r.file, r.offset, r.length, r.fetched_at FROM records r
+                JOIN (SELECT url_key, MAX(id) AS id FROM records {where} GROUP BY url_key) latest
+                  ON latest.id = r.id
+            """
+        rows = conn.execute(query + " ORDER BY file, offset", params).fetchall()
+    finally:
+        conn.close()
+    return [{'url': url, 'file': file, 'offset': offset, 'length': length, 'fetched_at': fetched_at}
+            for url, file, offset, length, fetched_at in rows]
@@ -0,0 +1,360 @@
+"""
+HTML Parser cho trang Fahasa
+Trích xuất các trường của book dict từ HTML tĩnh (không cần Selenium).
+Dùng cho HTTP engine và có thể test với file HTML lưu sẵn.
+"""
+import os
+import re
+import sys
+from urllib.parse import urljoin
+
+from lxml import html as lxml_html
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
+from book_record import BookRecord
+from product_url import canonicalize_product_url
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from selector_order import selector_registry
+
+PRICE_DIGITS_RE = re.compile(r'\d{2,}')
+RATING_RE = re.compile(r'(\d+(?:[.,]\d+)?)(?=\s*/\s*5)')
+RATING_WIDTH_RE = re.compile(r'width:\s*(\d+)%')
+RATING_COUNT_RE = re.compile(r'\(?\s*(\d+)\s*đánh\s*giá\s*\)?', re.IGNORECASE)
+SOLD_RE = re.compile(r'Đã bán\s*([\d.,]+)(k\+)?', re.IGNORECASE)
+
+
+def extract_price_smart(price_text):
+
+    try:
+        if not price_text:
+            return 0.0
+
+        clean_text = re.sub(r'[^\d,.]', '', str(price_text))
+        clean_text = clean_text.replace(',', '').replace('.', '')
+
+        if clean_text and clean_text.isdigit():
+            price = float(clean_text)
+            if price < 1000:
+                price *= 1000
+            return price if price >= 1000 else 0.0
+        return 0.0
+    except:
+        return 0.0
+
+
+def empty_book(url):
+    """BookRecord với giá trị mặc định (22 trường)"""
+    return BookRecord(url)
+
+
+def _has_class(cls):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+
+def _text(elem):
+    """Text đã chuẩn hoá khoảng trắng, tương tự WebElement.text"""
+    if elem is None:
+        return ''
+    return ' '.join(elem.text_content().split())
+
+
+def _first(tree, xpath):
+    found = tree.xpath(xpath)
+    return found[0] if found else None
+
+
+def _spec_value(tree, label, prefer_div=True):
+    td = _first(tree, f"//th[contains(text(), '{label}')]/following-sibling::td")
+    if td is None:
+        return None
+    if prefer_div:
+        divs = td.xpath('.//div')
+        if divs and _text(divs[0]):
+            return _text(divs[0])
+    return _text(td)
+
+
+def _parse_specs(tree, book, raw=None):
+    year_text = _spec_value(tree, 'Năm XB')
+    if year_text and year_text.isdigit():
+        book['publish_year'] = int(year_text)
+
+    weight_text = _spec_value(tree, 'Trọng lượng')
+    if raw is not None:
+        raw['weight_text'] = weight_text
+    elif weight_text:
+        weight_val = re.sub(r'[^\d.]', '', weight_text)
+        try:
+            weight_gram = float(weight_val)
+            book['weight'] = round(weight_gram / 1000, 3) if weight_gram > 10 else weight_gram
+        except ValueError:
+            pass
+
+    dimensions = _spec_value(tree, 'Kích Thước Bao Bì')
+    if dimensions:
+        book['dimensions'] = dimensions
+
+    page_text = _spec_value(tree, 'Số trang')
+    if page_text and page_text.isdigit():
+        book['page_count'] = int(page_text)
+
+    author = _spec_value(tree, 'Tác giả', prefer_div=False)
+    if author is not None:
+        book['author'] = author
+
+    publisher = _spec_value(tree, 'Nhà xuất bản', prefer_div=False)
+    if publisher is not None:
+        book['publisher'] = publisher
+
+
+def _parse_breadcrumbs(tree, book):
+    crumbs = [_text(a) for a in tree.xpath(f"//*[{_has_class('breadcrumb')}]//li//a")]
+    if len(crumbs) >= 2:
+        book['category_2'] = crumbs[1]
+        if len(crumbs) == 4:
+            # Ghép mục 3 và 4
+            book['category_3'] = f"{crumbs[2]} - {crumbs[3]}"
+        elif len(crumbs) > 2:
+            book['category_3'] = crumbs[2]
+
+
+PRICE_SCAN_XPATH = "//*[contains(text(), 'đ')][not(self::script) and not(self::style)]"
+# Thứ tự cố định (không học như RATING_COUNT_CHAIN): các selector có thể trả về giá khác nhau
+# (giá bìa / giá bán), đổi thứ tự là đổi giá của sách
+PRICE_SELECTORS = [
+    PRICE_SCAN_XPATH,
+    f"//*[{_has_class('price-original')}]//*[{_has_class('price')}]",
+    f"//*[{_has_class('price')}]//*[{_has_class('current-price')}]",
+    f"//*[{_has_class('product-price')}]//*[{_has_class('price')}]",
+    "//*[@data-price]",
+    f"//*[{_has_class('price-box')}]//*[{_has_class('price')}]",
+]
+
+
+def _price_at(tree, selector):
+    """Giá (> 0) theo một selector của PRICE_SELECTORS, None nếu không có"""
+    if selector == PRICE_SCAN_XPATH:
+        for elem in tree.xpath(selector):
+            text = _text(elem)
+            if PRICE_DIGITS_RE.search(text):
+                price = extract_price_smart(text)
+                if price > 0:
+                    return price
+        return None
+    elem = _first(tree, selector)
+    if elem is None:
+        return None
+    price = extract_price_smart(_text(elem) or elem.get('data-price') or '')
+    return price if price > 0 else None
+
+
+def _parse_prices(tree, book):
+    """Trả về True nếu tìm được giá"""
+    price_found = False
+
+    for selector in PRICE_SELECTORS:
+        price = _price_at(tree, selector)
+        if price:
+            book['discount_price'] = price
+            book['original_price'] = price
+            price_found = True
+            break
+
+    # Giá hiện tại
+    elem = _first(tree, f"//span[{_has_class('price')}][starts-with(@id, 'product-price-')]")
+    price_val = re.sub(r'[^\d.]', '', _text(elem))
+    if price_val.replace('.', ''):
+        book['discount_price'] = float(price_val.replace('.', ''))
+
+    # Giá gốc
+    elem = _first(tree, f"//span[{_has_class('price')}][starts-with(@id, 'old-price-')]")
+    old_price_val = re.sub(r'[^\d.]', '', _text(elem))
+    if old_price_val.replace('.', ''):
+        book['original_price'] = float(old_price_val.replace('.', ''))
+
+    # Phần trăm giảm giá
+    elem = _first(tree, f"//span[{_has_class('discount-percent')}]")
+    percent_val = re.sub(r'[^\d-]', '', _text(elem))
+    try:
+        book['discount_percent'] = float(percent_val)
+    except ValueError:
+        pass
+
+    return price_found
+
+
+def _parse_supplier(tree, book):
+    sup_divs = tree.xpath(f"//div[{_has_class('product-view-sa-supplier')}]")
+    if not sup_divs:
+        return
+
+    first = sup_divs[0]
+    if not book['publisher']:
+        spans = first.xpath('.//span')
+        if len(spans) >= 2 and 'Nhà xuất bản' in _text(spans[0]):
+            book['publisher'] = _text(spans[1])
+
+    # Ưu tiên lấy supplier từ thẻ <a>
+    a_tags = first.xpath('.//a')
+    if a_tags:
+        book['supplier'] = _text(a_tags[0])
+    else:
+        spans = first.xpath('.//span')
+        if len(spans) >= 2 and 'Nhà cung cấp' in _text(spans[0]):
+            book['supplier'] = _text(spans[1])
+        else:
+            book['supplier'] = _text(first).replace('Nhà cung cấp:', '').strip()
+
+    for div in sup_divs:
+        spans = div.xpath('.//span')
+        if len(spans) >= 2:
+            label = _text(spans[0]).lower()
+            value = _text(spans[1])
+            if 'nhà cung cấp' in label:
+                book['supplier'] = value
+            elif 'nhà xuất bản' in label:
+                book['publisher'] = value
+
+
+def _parse_image(tree, book):
+    img = _first(tree, f"//img[{_has_class('fhs-p-img')}]")
+    if img is None:
+        return
+    img_url = img.get('src')
+    if not img_url or 'placeholder' in img_url:
+        img_url = img.get('data-src')
+    book['url_img'] = img_url or ''
+
+
+def _parse_rating(tree, book, raw=None):
+    rating_elem = _first(tree, "//div[./span[contains(text(), '/5')]]")
+    if raw is not None:
+        rating_box = _first(tree, f"//*[{_has_class('rating-box')}]//*[{_has_class('rating')}]")
+        raw['rating_text'] = _text(rating_elem)
+        raw['rating_style'] = rating_box.get('style') if rating_box is not None else None
+        return
+    if rating_elem is not None:
+        match = RATING_RE.search(_text(rating_elem))
+        if match:
+            book['rating'] = float(match.group(1).replace(',', '.'))
+            return
+    rating_box = _first(tree, f"//*[{_has_class('rating-box')}]//*[{_has_class('rating')}]")
+    if rating_box is not None:
+        width_match = RATING_WIDTH_RE.search(rating_box.get('style') or '')
+        if width_match:
+            book['rating'] = round(int(width_match.group(1)) / 20, 2)  # 100% = 5.0
+
+
+REVIEW_LINKS_XPATH = (f"//*[{_has_class('rating-links')}]//a | //*[{_has_class('review-position')}]//a"
+                      " | //a[contains(@onclick, 'review')]")
+RATING_COUNT_CHAIN = selector_registry.chain('html.rating_count', [
+    "//td[@class='review-position']//a[contains(text(), 'đánh giá')]",
+    "//p[@class='rating-links']//a[contains(text(), 'đánh giá')]",
+    "//a[contains(text(), 'đánh giá')]",
+    "//*[contains(text(), 'đánh giá') and not(name()='script')]",
+    REVIEW_LINKS_XPATH,
+])
+
+
+def _rating_count_at(tree, selector):
+    # Fallback theo link review xét mọi link, các selector còn lại chỉ xét phần tử đầu tiên
+    elems = tree.xpath(selector) if selector == REVIEW_LINKS_XPATH else [_first(tree, selector)]
+    for elem in elems:
+        count_match = RATING_COUNT_RE.search(_text(elem))
+        if count_match:
+            return int(count_match.group(1))
+    return None
+
+
+def _parse_rating_count(tree, book):
+    count = RATING_COUNT_CHAIN.first(lambda selector: _rating_count_at(tree, selector))
+    if count is not None:
+        book['rating_count'] = count
+
+
+def _parse_sold(tree, book, raw=None):
+    sold_elem = _first(tree, f"//div[{_has_class('product-view-qty-num')}]")
+    if raw is not None:
+        raw['sold_text'] = _text(sold_elem)
+        return
+    match = SOLD_RE.search(_text(sold_elem))
+    if not match:
+        return
+    book['sold_count'] = match.group(1) + (match.group(2) or '')
+    if match.group(2):
+        book['sold_count_numeric'] = int(float(match.group(1).replace(',', '.')) * 1000)
+    else:
+        num = match.group(1).replace('.', '').replace(',', '')
+        if num.isdigit():
+            book['sold_count_numeric'] = int(num)
+
+
+def parse_book_html(page_html, url, raw=None):
+    """
+    Parse HTML trang sản phẩm thành book dict
+    raw: dict tuỳ chọn - text thô của trọng lượng / rating / đã bán được ghi vào đó (khoá
+    theo batch_normalizer.RAW_COLUMNS) thay vì chuẩn hoá ngay, để chuẩn hoá cả lô một lần
+    (xem reparse_archive.py); các trường đó giữ giá trị mặc định
+    Returns: dict hoặc None nếu không có tiêu đề / không có giá
+    """
+    if not page_html:
+        return None
+    tree = lxml_html.fromstring(page_html)
+
+    book = empty_book(url)
+    title_elem = _first(tree, '//h1')
+    if title_elem is None:
+        return None
+    book['title'] = _text(title_elem)
+
+    _parse_specs(tree, book, raw)
+    _parse_breadcrumbs(tree, book)
+    price_found = _parse_prices(tree, book)
+    _parse_supplier(tree, book)
+    _parse_image(tree, book)
+    _parse_rating(tree, book, raw)
+    _parse_rating_count(tree, book)
+    _parse_sold(tree, book, raw)
+
+    return book if price_found else None
+
+
+def _listing_item(item, base_url):
+    links = item.xpath('.//a[@href]')
+    if not links:
+        return None
+    title_link = next((a for a in links if a.get('title')), links[0])
+    price = _first(item, f".//*[{_has_class('special-price')}]//*[{_has_class('price')}]")
+    if price is None:
+        price = _first(item, f".//*[{_has_class('price')}]")
+    discount = _first(item, ".//*[contains(@class, 'discount')]")
+    sold = _first(item, ".//*[contains(text(), 'Đã bán')]")
+    return {
+        'url': canonicalize_product_url(urljoin(base_url, links[0].get('href'))),
+        'title': title_link.get('title') or _text(title_link),
+        'price_text': _text(price),
+        'discount_text': _text(discount),
+        'sold_text': _text(sold),
+    }
+
+
+def parse_listing_items(page_html, base_url):
+    """
+    Dữ liệu hiển thị sẵn trên trang danh mục cho từng sản phẩm:
+    url, title, price_text, discount_text, sold_text
+    """
+    if not page_html:
+        return []
+    tree = lxml_html.fromstring(page_html)
+    items = []
+    for elem in tree.xpath(f"//*[{_has_class('item-inner')}]"):
+        item = _listing_item(elem, base_url)
+        if item and 'flashsale' not in item['url'].lower():
+            items.append(item)
+    return items
+
+
+def parse_listing_html(page_html, base_url):
+    """Lấy danh sách URL sản phẩm từ HTML trang danh mục"""
+    return [item['url'] for item in parse_listing_items(page_html, base_url)]
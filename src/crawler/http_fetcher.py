@@ -0,0 +1,164 @@
+"""
+HTTP Fetcher
+Tải HTML trang danh mục / sản phẩm bằng HTTP client thường (không cần Chrome).
+Trang nào cần JavaScript sẽ fallback sang Selenium.
+Có thể đi qua PageCache (xem page_cache.py) để chạy lại không tốn request,
+và lưu HTML trang sản phẩm vào HtmlArchive (xem html_archive.py) để parse lại offline.
+"""
+import time
+
+import requests
+
+from html_parser import parse_book_html, parse_listing_items
+from page_cache import CacheMiss
+from politeness import server_ok
+
+DEFAULT_HEADERS = {
+    'User-Agent': ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                   '(KHTML, like Gecko) Chrome/124.0 Safari/537.36'),
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'vi-VN,vi;q=0.9,en;q=0.8',
+}
+
+REQUEST_TIMEOUT = 20
+# Trang danh mục lỗi (503, timeout) được tải lại trước khi coi là hết dữ liệu
+LISTING_RETRIES = 2
+LISTING_RETRY_DELAY = 2.0
+# Trang sản phẩm bị 5xx / 429 / timeout được tải lại (chờ theo AdaptiveDelay đã lùi)
+DETAIL_RETRIES = 2
+DETAIL_RETRY_DELAY = 2.0
+
+
+def create_http_session():
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+def transient_error(error):
+    """Lỗi do server quá tải / mạng chập chờn (đáng thử lại), không phải 404 hay trang hỏng"""
+    if isinstance(error, (requests.Timeout, requests.ConnectionError)):
+        return True
+    response = getattr(error, 'response', None)
+    return isinstance(error, requests.HTTPError) and response is not None and not server_ok(response)
+
+
+def fetch_html(session, url, timeout=REQUEST_TIMEOUT, cache=None, politeness=None):
+    """
+    GET url và trả về HTML (raise nếu HTTP lỗi, CacheMiss nếu cache offline không có trang).
+    politeness: AdaptiveDelay - ghi nhận thời gian / HTTP status của request (không gồm cache hit)
+    """
+    entry = cache.lookup(url) if cache else None
+    if entry and (entry['fresh'] or cache.offline):
+        cache.record('hit')
+        return entry['body']
+    if cache and cache.offline:
+        cache.record('miss')
+        raise CacheMiss(f"không có trong cache: {url}")
+
+    headers = cache.conditional_headers(entry) if entry else {}
+    if politeness:
+        response = politeness.timed(session.get, url, timeout=timeout, headers=headers, ok=server_ok)
+    else:
+        response = session.get(url, timeout=timeout, headers=headers)
+    if entry and response.status_code == 304:
+        cache.revalidated(url)
+        cache.record('revalidated')
+        return entry['body']
+    response.raise_for_status()
+    # requests mặc định ISO-8859-1 cho text/* không khai báo charset: tiếng Việt sẽ bị lỗi font
+    if 'charset=' not in response.headers.get('Content-Type', '').lower():
+        response.encoding = 'utf-8'
+    if cache:
+        cache.store(url, response.text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        cache.record('miss')
+    return response.text
+
+
+class HttpCrawlSession:
+    """
+    Session cho HTTP engine của một worker.
+    Chrome driver fallback chỉ được tạo khi thật sự cần (không dùng khi cache offline).
+    """
+
+    def __init__(self, fallback_driver_factory=None, fallback_fetch=None, cache=None, archive=None,
+                 politeness=None):
+        self.http = create_http_session()
+        self.fallback_driver_factory = fallback_driver_factory
+        self.fallback_fetch = fallback_fetch
+        self.cache = cache
+        self.archive = archive
+        self.politeness = politeness
+        self._driver = None
+
+    @property
+    def can_fallback(self):
+        if self.cache is not None and self.cache.offline:
+            return False
+        return self.fallback_driver_factory is not None and self.fallback_fetch is not None
+
+    def fetch_html(self, url, retries=0, kind='detail'):
+        """HTML của url; lỗi tạm thời (transient_error) được tải lại tối đa retries lần"""
+        for attempt in range(retries + 1):
+            try:
+                return fetch_html(self.http, url, cache=self.cache, politeness=self.politeness)
+            except requests.RequestException as e:
+                if attempt == retries or not transient_error(e):
+                    raise
+                print(f"    Lỗi server ({e}) - thử lại ({attempt + 1}/{retries})...")
+                if self.politeness:
+                    self.politeness.wait(kind)
+                else:
+                    time.sleep(DETAIL_RETRY_DELAY * (attempt + 1))
+
+    def fallback(self, url):
+        if not self.can_fallback:
+            return None
+        if self._driver is None:
+            print("    Khởi tạo Chrome fallback cho trang cần JavaScript...")
+            try:
+                self._driver = self.fallback_driver_factory()
+            except Exception:
+                # Không thử khởi tạo Chrome lại cho từng trang của session này
+                self.fallback_driver_factory = None
+                raise
+        return self.fallback_fetch(self._driver, url)
+
+    def close(self):
+        self.http.close()
+        if self._driver is not None:
+            self._driver.quit()
+            self._driver = None
+
+
+def get_listing_items_http(session, url):
+    """Sản phẩm trên trang danh mục kèm dữ liệu listing (None nếu lỗi tải trang)"""
+    try:
+        return parse_listing_items(session.fetch_html(url), url)
+    except Exception as e:
+        print(f"    Lỗi tải trang danh mục: {e}")
+        return None
+
+
+def get_book_details_http(session, url):
+    """
+    Giống get_book_details nhưng qua HTTP. 5xx / 429 / timeout được tải lại; fallback
+    Selenium chỉ khi trang tải được nhưng HTML tĩnh thiếu dữ liệu. None nếu thất bại
+    """
+    try:
+        page_html = session.fetch_html(url, retries=DETAIL_RETRIES)
+        if session.archive:
+            session.archive.write(url, page_html)
+        book = parse_book_html(page_html, url)
+    except Exception as e:
+        print(f"    Lỗi HTTP: {e}")
+        return None
+
+    if book is None and session.can_fallback:
+        print("    HTML tĩnh thiếu dữ liệu - dùng Selenium fallback")
+        try:
+            book = session.fallback(url)
+        except Exception as e:
+            print(f"    Selenium fallback lỗi: {str(e)[:100]}")
+            book = None
+    return book
@@ -1,5 +1,9 @@
 import mysql.connector
-from datetime import datetime
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+from book_record import BookRecord
 
 # MySQL Configuration
 MYSQL_CONFIG = {
@@ -15,7 +19,7 @@ def get_mysql_connection():
     return mysql.connector.connect(**config)
 
 def insert_book_staging(book_data):
-    """Insert book data into MySQL staging_books table"""
+    """Insert book data (BookRecord hoặc dict) into MySQL staging_books table"""
     try:
         conn = get_mysql_connection()
         cursor = conn.cursor()
@@ -27,41 +31,19 @@ def insert_book_staging(book_data):
                 original_price, discount_price, discount_percent,
                 rating, rating_count, sold_count, sold_count_numeric,
                 publish_year, language, page_count, weight, dimensions,
-                url, url_img, time_collect
+                url, product_key, url_img, time_collect
             ) VALUES (
                 %s, %s, %s, %s,
                 %s, %s, %s,
                 %s, %s, %s,
                 %s, %s, %s, %s,
                 %s, %s, %s, %s, %s,
-                %s, %s, %s
+                %s, %s, %s, %s
             )
         '''
         
-        cursor.execute(insert_sql, (
-            book_data.get('title', ''),
-            book_data.get('author', ''),
-            book_data.get('publisher', ''),
-            book_data.get('supplier', ''),
-            book_data.get('category_1', ''),
-            book_data.get('category_2', ''),
-            book_data.get('category_3', ''),
-            book_data.get('original_price', 0),
-            book_data.get('discount_price', 0),
-            book_data.get('discount_percent', 0),
-            book_data.get('rating', 0),
-            book_data.get('rating_count', 0),
-            book_data.get('sold_count', ''),
-            book_data.get('sold_count_numeric', 0),
-            book_data.get('publish_year', None),
-            book_data.get('language', ''),
-            book_data.get('page_count', None),
-            book_data.get('weight', None),
-            book_data.get('dimensions', ''),
-            book_data.get('url', ''),
-            book_data.get('url_img', ''),
-            datetime.now()
-        ))
+        # time_collect của record (thời điểm crawl), không phải thời điểm insert
+        cursor.execute(insert_sql, BookRecord.from_mapping(book_data).staging_values())
         
         conn.commit()
         cursor.close()
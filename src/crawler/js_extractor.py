@@ -0,0 +1,207 @@
+"""
+JavaScript Extractor
+Một lần driver.execute_script duyệt DOM trang sản phẩm ngay trong trình duyệt
+và trả về toàn bộ trường của book dict dưới dạng một object JSON.
+"""
+from html_parser import (
+    RATING_COUNT_RE, RATING_RE, RATING_WIDTH_RE, SOLD_RE,
+    empty_book, extract_price_smart
+)
+
+EXTRACT_BOOK_JS = r"""
+const text = (el) => (el ? (el.innerText || el.textContent || '') : '').replace(/\s+/g, ' ').trim();
+const first = (xpath) => document.evaluate(
+    xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+
+function spec(label, preferDiv) {
+    const td = first("//th[contains(text(), '" + label + "')]/following-sibling::td");
+    if (!td) return null;
+    if (preferDiv) {
+        const div = td.querySelector('div');
+        if (div && text(div)) return text(div);
+    }
+    return text(td);
+}
+
+const out = {};
+const h1 = document.querySelector('h1');
+out.title = text(h1);
+out.publish_year = spec('Năm XB', true);
+out.weight = spec('Trọng lượng', true);
+out.dimensions = spec('Kích Thước Bao Bì', true);
+out.page_count = spec('Số trang', true);
+out.author = spec('Tác giả', false);
+out.publisher = spec('Nhà xuất bản', false);
+out.breadcrumbs = Array.from(document.querySelectorAll('.breadcrumb li a')).map(text);
+
+// Giá: quét phần tử có 'đ' như đường Python, sau đó các selector dự phòng
+out.price_text = null;
+const walker = document.evaluate("//*[contains(text(), 'đ')]", document, null,
+    XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (let i = 0; i < walker.snapshotLength; i++) {
+    const el = walker.snapshotItem(i);
+    if (el.tagName === 'SCRIPT' || el.tagName === 'STYLE') continue;
+    const t = text(el);
+    if (/\d{2,}/.test(t)) { out.price_text = t; break; }
+}
+out.fallback_price_texts = ['.price-original .price', '.price .current-price',
+    '.product-price .price', '[data-price]', '.price-box .price'].map((sel) => {
+    const el = document.querySelector(sel);
+    return el ? (text(el) || el.getAttribute('data-price') || '') : null;
+});
+out.current_price = text(document.querySelector('span.price[id^="product-price-"]'));
+out.old_price = text(document.querySelector('span.price[id^="old-price-"]'));
+out.discount_percent = text(document.querySelector('span.discount-percent'));
+
+out.supplier_blocks = Array.from(document.querySelectorAll('div.product-view-sa-supplier')).map((div) => ({
+    text: text(div),
+    links: Array.from(div.querySelectorAll('a')).map(text),
+    spans: Array.from(div.querySelectorAll('span')).map(text),
+}));
+
+const img = document.querySelector('img.fhs-p-img');
+out.img_src = img ? img.getAttribute('src') : null;
+out.img_data_src = img ? img.getAttribute('data-src') : null;
+
+const ratingDiv = first("//div[./span[contains(text(), '/5')]]");
+out.rating_text = text(ratingDiv);
+const ratingBox = document.querySelector('.rating-box .rating');
+out.rating_style = ratingBox ? (ratingBox.getAttribute('style') || '') : '';
+
+out.rating_count_texts = [
+    "//td[@class='review-position']//a[contains(text(), 'đánh giá')]",
+    "//p[@class='rating-links']//a[contains(text(), 'đánh giá')]",
+    "//a[contains(text(), 'đánh giá')]",
+    "//*[contains(text(), 'đánh giá') and not(name()='script')]",
+].map((xp) => text(first(xp)));
+out.review_link_texts = Array.from(document.querySelectorAll(
+    '.rating-links a, .review-position a, a[onclick*="review"]')).map(text);
+
+out.sold_text = text(document.querySelector('div.product-view-qty-num'));
+return out;
+"""
+
+
+def _digits_only(value, keep='.'):
+    return ''.join(ch for ch in (value or '') if ch.isdigit() or ch in keep)
+
+
+def _apply_prices(raw, book):
+    candidates = [raw.get('price_text')] + (raw.get('fallback_price_texts') or [])
+    price_found = False
+    for candidate in candidates:
+        price = extract_price_smart(candidate)
+        if price > 0:
+            book['discount_price'] = price
+            book['original_price'] = price
+            price_found = True
+            break
+
+    current = _digits_only(raw.get('current_price')).replace('.', '')
+    if current:
+        book['discount_price'] = float(current)
+    old = _digits_only(raw.get('old_price')).replace('.', '')
+    if old:
+        book['original_price'] = float(old)
+    try:
+        book['discount_percent'] = float(_digits_only(raw.get('discount_percent'), keep='-'))
+    except ValueError:
+        pass
+    return price_found
+
+
+def build_book_from_js(raw, url):
+    """Chuyển object trả về từ EXTRACT_BOOK_JS thành book dict (cùng quy tắc với html_parser)"""
+    if not raw or not raw.get('title'):
+        return None
+    book = empty_book(url)
+    book['title'] = raw['title']
+
+    year = raw.get('publish_year') or ''
+    if year.isdigit():
+        book['publish_year'] = int(year)
+    weight = _digits_only(raw.get('weight'))
+    try:
+        weight_gram = float(weight)
+        book['weight'] = round(weight_gram / 1000, 3) if weight_gram > 10 else weight_gram
+    except ValueError:
+        pass
+    if raw.get('dimensions'):
+        book['dimensions'] = raw['dimensions']
+    pages = raw.get('page_count') or ''
+    if pages.isdigit():
+        book['page_count'] = int(pages)
+    if raw.get('author') is not None:
+        book['author'] = raw['author']
+    if raw.get('publisher') is not None:
+        book['publisher'] = raw['publisher']
+
+    crumbs = raw.get('breadcrumbs') or []
+    if len(crumbs) >= 2:
+        book['category_2'] = crumbs[1]
+        if len(crumbs) == 4:
+            book['category_3'] = f"{crumbs[2]} - {crumbs[3]}"
+        elif len(crumbs) > 2:
+            book['category_3'] = crumbs[2]
+
+    price_found = _apply_prices(raw, book)
+
+    blocks = raw.get('supplier_blocks') or []
+    if blocks:
+        block = blocks[0]
+        spans = block['spans']
+        if not book['publisher'] and len(spans) >= 2 and 'Nhà xuất bản' in spans[0]:
+            book['publisher'] = spans[1]
+        if block['links']:
+            book['supplier'] = block['links'][0]
+        elif len(spans) >= 2 and 'Nhà cung cấp' in spans[0]:
+            book['supplier'] = spans[1]
+        else:
+            book['supplier'] = block['text'].replace('Nhà cung cấp:', '').strip()
+    for block in blocks:
+        spans = block['spans']
+        if len(spans) >= 2:
+            label = spans[0].lower()
+            if 'nhà cung cấp' in label:
+                book['supplier'] = spans[1]
+            elif 'nhà xuất bản' in label:
+                book['publisher'] = spans[1]
+
+    img_url = raw.get('img_src')
+    if not img_url or 'placeholder' in img_url:
+        img_url = raw.get('img_data_src')
+    book['url_img'] = img_url or ''
+
+    match = RATING_RE.search(raw.get('rating_text') or '')
+    if match:
+        book['rating'] = float(match.group(1).replace(',', '.'))
+    else:
+        width_match = RATING_WIDTH_RE.search(raw.get('rating_style') or '')
+        if width_match:
+            book['rating'] = round(int(width_match.group(1)) / 20, 2)
+
+    # Thứ tự cố định: script đã đọc mọi selector trong một lần gọi nên không cần học thứ tự
+    # như RATING_COUNT_CHAIN (các selector cho cùng một số đánh giá); giá cũng theo thứ tự
+    # cố định giống html_parser.PRICE_SELECTORS
+    for count_text in (raw.get('rating_count_texts') or []) + (raw.get('review_link_texts') or []):
+        count_match = RATING_COUNT_RE.search(count_text or '')
+        if count_match:
+            book['rating_count'] = int(count_match.group(1))
+            break
+
+    sold_match = SOLD_RE.search(raw.get('sold_text') or '')
+    if sold_match:
+        book['sold_count'] = sold_match.group(1) + (sold_match.group(2) or '')
+        if sold_match.group(2):
+            book['sold_count_numeric'] = int(float(sold_match.group(1).replace(',', '.')) * 1000)
+        else:
+            num = sold_match.group(1).replace('.', '').replace(',', '')
+            if num.isdigit():
+                book['sold_count_numeric'] = int(num)
+
+    return book if price_found else None
+
+
+def extract_book_js(driver, url):
+    """Một round trip WebDriver cho toàn bộ trường của trang đã tải"""
+    return build_book_from_js(driver.execute_script(EXTRACT_BOOK_JS), url)
@@ -0,0 +1,38 @@
+"""
+Listing Harvest
+Lấy toàn bộ sản phẩm của trang danh mục trong một lần execute_script
+(url, title, giá, giảm giá, đã bán). Fingerprint listing được lưu trong frontier
+để bỏ qua trang chi tiết của sản phẩm không thay đổi.
+"""
+import hashlib
+
+HARVEST_LISTING_JS = r"""
+const text = (el) => (el ? (el.innerText || el.textContent || '') : '').replace(/\s+/g, ' ').trim();
+return Array.from(document.querySelectorAll('.item-inner')).map((item) => {
+    const links = Array.from(item.querySelectorAll('a[href]'));
+    if (!links.length) return null;
+    const titleLink = links.find((a) => a.getAttribute('title')) || links[0];
+    const price = item.querySelector('.special-price .price') || item.querySelector('.price');
+    const discount = item.querySelector('[class*="discount"]');
+    const sold = Array.from(item.querySelectorAll('*')).find(
+        (el) => Array.from(el.childNodes).some((n) => n.nodeType === 3 && n.textContent.includes('Đã bán')));
+    return {
+        url: links[0].href,
+        title: titleLink.getAttribute('title') || text(titleLink),
+        price_text: text(price),
+        discount_text: text(discount),
+        sold_text: text(sold),
+    };
+}).filter((item) => item && !item.url.toLowerCase().includes('flashsale'));
+"""
+
+
+def harvest_listing_selenium(driver):
+    """Một round trip cho toàn bộ sản phẩm của trang danh mục đã tải"""
+    return driver.execute_script(HARVEST_LISTING_JS) or []
+
+
+def listing_fingerprint(item):
+    """Fingerprint của dữ liệu hiển thị trên trang danh mục"""
+    key = '|'.join(item.get(k) or '' for k in ('title', 'price_text', 'discount_text', 'sold_text'))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
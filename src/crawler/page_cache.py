@@ -0,0 +1,191 @@
+"""
+Page Cache
+Cache HTML trên đĩa cho tầng fetch HTTP / async:
+- nội dung lưu theo địa chỉ (sha256 của HTML, nén gzip) trong objects/,
+  index SQLite ánh xạ URL chuẩn hoá -> nội dung, ETag, Last-Modified
+- TTL: trang còn hạn được trả về không cần request
+- hết hạn: gửi If-None-Match / If-Modified-Since, 304 thì dùng lại bản cũ
+- giới hạn dung lượng, xoá trang ít dùng nhất (LRU)
+- offline (cache-only): chỉ đọc cache, không truy cập mạng
+"""
+import gzip
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
+from product_url import canonicalize_product_url
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'data', '.page_cache'
+)
+DEFAULT_TTL_HOURS = 24
+DEFAULT_MAX_MB = 512
+
+
+class CacheMiss(Exception):
+    """Trang không có trong cache khi chạy offline"""
+
+
+def cache_key(url):
+    return hashlib.sha1(canonicalize_product_url(url).encode('utf-8')).hexdigest()
+
+
+class PageCache:
+    def __init__(self, path=DEFAULT_CACHE_DIR, ttl_hours=DEFAULT_TTL_HOURS,
+                 max_mb=DEFAULT_MAX_MB, offline=False):
+        self.path = os.path.abspath(path)
+        self.objects_dir = os.path.join(self.path, 'objects')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.ttl = ttl_hours * 3600
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.offline = offline
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(self.path, 'index.db'), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url_key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_last_access ON pages (last_access)")
+        self.conn.commit()
+
+    def _object_path(self, content_hash):
+        return os.path.join(self.objects_dir, content_hash[:2], content_hash + '.html.gz')
+
+    def lookup(self, url):
+        """Bản cache của url: {'body', 'etag', 'last_modified', 'fresh'} hoặc None"""
+        key = cache_key(url)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT content_hash, etag, last_modified, fetched_at FROM pages WHERE url_key = ?",
+                (key,)
+            ).fetchone()
+            if row:
+                self.conn.execute("UPDATE pages SET last_access = ? WHERE url_key = ?", (time.time(), key))
+                self.conn.commit()
+        if not row:
+            return None
+        content_hash, etag, last_modified, fetched_at = row
+        try:
+            with gzip.open(self._object_path(content_hash), 'rt', encoding='utf-8') as f:
+                body = f.read()
+        except OSError:
+            return None
+        return {
+            'body': body,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fresh': time.time() - fetched_at <= self.ttl,
+        }
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, body, etag=None, last_modified=None):
+        data = body.encode('utf-8')
+        content_hash = hashlib.sha256(data).hexdigest()
+        object_path = self._object_path(content_hash)
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            tmp_path = f"{object_path}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, object_path)
+
+        now = time.time()
+        with self._lock:
+            old = self.conn.execute(
+                "SELECT content_hash FROM pages WHERE url_key = ?", (cache_key(url),)
+            ).fetchone()
+            self.conn.execute("""
+                INSERT OR REPLACE INTO pages
+                    (url_key, url, content_hash, size, etag, last_modified, fetched_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (cache_key(url), canonicalize_product_url(url), content_hash,
+                  os.path.getsize(object_path), etag, last_modified, now, now))
+            if old and old[0] != content_hash:
+                self._drop_orphan(old[0])
+            self._evict()
+            self.conn.commit()
+
+    def revalidated(self, url):
+        """Server trả 304: bản cache vẫn đúng, gia hạn TTL"""
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "UPDATE pages SET fetched_at = ?, last_access = ? WHERE url_key = ?",
+                (now, now, cache_key(url))
+            )
+            self.conn.commit()
+
+    def _total_bytes(self):
+        return self.conn.execute("""
+            SELECT COALESCE(SUM(size), 0) FROM (
+                SELECT MAX(size) AS size FROM pages GROUP BY content_hash
+            )
+        """).fetchone()[0]
+
+    def _drop_orphan(self, content_hash):
+        in_use = self.conn.execute(
+            "SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1", (content_hash,)
+        ).fetchone()
+        if not in_use:
+            try:
+                os.remove(self._object_path(content_hash))
+            except OSError:
+                pass
+
+    def _evict(self):
+        """Xoá trang truy cập lâu nhất cho tới khi dưới giới hạn dung lượng"""
+        total = self._total_bytes()
+        while total > self.max_bytes:
+            row = self.conn.execute(
+                "SELECT url_key, content_hash FROM pages ORDER BY last_access LIMIT 1"
+            ).fetchone()
+            if not row:
+                break
+            self.conn.execute("DELETE FROM pages WHERE url_key = ?", (row[0],))
+            self._drop_orphan(row[1])
+            total = self._total_bytes()
+
+    def record(self, outcome):
+        """Đếm hit / revalidated / miss để in tổng kết"""
+        with self._lock:
+            if outcome == 'hit':
+                self.hits += 1
+            elif outcome == 'revalidated':
+                self.revalidations += 1
+            else:
+                self.misses += 1
+
+    def summary(self):
+        with self._lock:
+            pages = self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            total = self._total_bytes()
+        return (f"cache: {self.hits} hit, {self.revalidations} 304, {self.misses} miss "
+                f"- {pages} trang, {total / 1024 / 1024:.1f} MB")
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,114 @@
+"""
+Adaptive Politeness
+Bộ điều khiển khoảng chờ giữa các request theo kiểu AIMD thay cho các
+time.sleep(random.uniform(...)) cố định:
+- response nhanh và hợp lệ: giảm khoảng chờ một bước cố định (tăng tốc cộng)
+- response chậm, timeout hoặc HTTP 5xx / 429: nhân khoảng chờ (lùi nhân)
+Chỉ thời gian tải trang được tính (fetch layer gọi timed), không tính thời gian trích xuất.
+Trạng thái được lưu ra data/.crawl_state/politeness.json để lần chạy sau
+bắt đầu từ tốc độ đã học được.
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
+from state_file import write_json_atomic
+
+DEFAULT_STATE_PATH = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'data', '.crawl_state', 'politeness.json'
+)
+
+# Hệ số khoảng chờ theo loại request so với khoảng chờ cơ bản (trang chi tiết)
+WAIT_FACTORS = {
+    'detail': 1.0,
+    'listing': 1.3,
+    'page': 2.0,
+}
+
+
+def server_ok(response):
+    """Chỉ 5xx / 429 mới là dấu hiệu server quá tải; 404 hay trang thiếu giá thì không"""
+    return response.status_code < 500 and response.status_code != 429
+
+
+class AdaptiveDelay:
+    def __init__(self, state_path=DEFAULT_STATE_PATH, initial_delay=3.0, min_delay=0.5,
+                 max_delay=30.0, step=0.25, backoff=2.0, slow_seconds=5.0, jitter=0.2):
+        self.state_path = os.path.abspath(state_path) if state_path else None
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.step = step
+        self.backoff = backoff
+        self.slow_seconds = slow_seconds
+        self.jitter = jitter
+        self.delay = initial_delay
+        self.successes = 0
+        self.backoffs = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.delay = self._clamp(float(state['delay']))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Không đọc được trạng thái politeness, dùng mặc định: {e}")
+
+    def save(self):
+        if not self.state_path:
+            return
+        with self._lock:
+            state = {'delay': round(self.delay, 3), 'updated_at': time.strftime('%Y-%m-%d %H:%M:%S')}
+        write_json_atomic(self.state_path, state)
+
+    def _clamp(self, delay):
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    @property
+    def rate(self):
+        """Số request/giây tương ứng với khoảng chờ hiện tại"""
+        return 1.0 / self.delay
+
+    def record(self, latency, ok=True):
+        """Cập nhật khoảng chờ theo thời gian phản hồi và kết quả của request vừa xong"""
+        with self._lock:
+            if ok and latency < self.slow_seconds:
+                self.delay = self._clamp(self.delay - self.step)
+                self.successes += 1
+            else:
+                self.delay = self._clamp(self.delay * self.backoff)
+                self.backoffs += 1
+
+    def timed(self, fn, *args, ok=None, **kwargs):
+        """
+        Gọi fn(*args, **kwargs) - chỉ phần tải trang từ server, không gồm trích xuất - và
+        ghi nhận thời gian. Exception (timeout, lỗi kết nối) hoặc ok(result) False là lỗi
+        server; ok=None: mọi response đều hợp lệ
+        """
+        started = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record(time.monotonic() - started, ok=False)
+            raise
+        self.record(time.monotonic() - started, ok=ok(result) if ok else True)
+        return result
+
+    def wait(self, kind='detail'):
+        with self._lock:
+            delay = self.delay * WAIT_FACTORS.get(kind, 1.0)
+        delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        time.sleep(delay)
+        return delay
+
+    def summary(self):
+        with self._lock:
+            return (f"politeness: chờ {self.delay:.2f}s ({self.rate:.2f} req/s), "
+                    f"{self.successes} tăng tốc, {self.backoffs} lùi")
@@ -0,0 +1,166 @@
+"""
+Record Sink
+Ghi từng book dict ngay khi trích xuất xong thay vì giữ cả danh sách trong RAM
+rồi dump JSON/CSV cuối lần chạy:
+- RotatingFileSink: append JSONL + CSV vào data/YYYY/MM/DD, xoay file theo
+  dung lượng hoặc thời gian (mỗi segment là một cặp .jsonl/.csv)
+- StagingBatchSink: gom micro-batch và insert thẳng vào staging_books
+- FanoutSink: chuyển mỗi record tới nhiều sink
+"""
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'etl'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
+from book_record import FIELD_NAMES, BookRecord
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
+RECORD_FIELDS = list(FIELD_NAMES)
+
+DEFAULT_MAX_MB = 32
+DEFAULT_MAX_MINUTES = 60
+DEFAULT_BATCH_SIZE = 50
+
+
+def daily_data_dir(now=None):
+    now = now or datetime.now()
+    return os.path.join(DATA_DIR, str(now.year), f"{now.month:02d}", f"{now.day:02d}")
+
+
+class RotatingFileSink:
+    """
+    Append-only JSONL (+ CSV cùng tên cho load_csv_to_staging).
+    on_rotate(jsonl_path, csv_path) được gọi mỗi khi mở segment mới.
+    directory=None: thư mục theo ngày data/YYYY/MM/DD
+    """
+
+    def __init__(self, prefix='fahasa_books', max_mb=DEFAULT_MAX_MB, max_minutes=DEFAULT_MAX_MINUTES,
+                 on_rotate=None, previous_segments=None, directory=None):
+        self.prefix = prefix
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_seconds = max_minutes * 60
+        self.on_rotate = on_rotate
+        self.segments = [tuple(s) for s in (previous_segments or [])]
+        self.count = 0
+        self._jsonl = None
+        self._csv = None
+        self._writer = None
+        self._opened_at = 0.0
+
+    @property
+    def csv_paths(self):
+        return [csv_path for _, csv_path in self.segments]
+
+    def _open_segment(self):
+        self._close_segment()
+        now = datetime.now()
+        directory = self.directory or daily_data_dir(now)
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{self.prefix}_{now.strftime('%Y%m%d_%H%M%S')}")
+        suffix = 1
+        while os.path.exists(f"{base}.jsonl"):
+            suffix += 1
+            base = os.path.join(directory, f"{self.prefix}_{now.strftime('%Y%m%d_%H%M%S')}_{suffix}")
+        jsonl_path, csv_path = f"{base}.jsonl", f"{base}.csv"
+
+        self._jsonl = open(jsonl_path, 'a', encoding='utf-8')
+        self._csv = open(csv_path, 'a', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._csv)
+        self._writer.writerow(RECORD_FIELDS)
+        self._opened_at = time.monotonic()
+        self.segments.append((jsonl_path, csv_path))
+        if self.on_rotate:
+            self.on_rotate(jsonl_path, csv_path)
+
+    def _should_rotate(self):
+        if self._jsonl is None:
+            return True
+        if self._jsonl.tell() >= self.max_bytes:
+            return True
+        return time.monotonic() - self._opened_at >= self.max_seconds
+
+    def write(self, book):
+        """book: BookRecord hoặc dict (JSONL của shard / kết quả hàng đợi)"""
+        record = BookRecord.from_mapping(book)
+        if self._should_rotate():
+            self._open_segment()
+        self._jsonl.write(json.dumps(record.to_dict(), ensure_ascii=False) + '\n')
+        self._jsonl.flush()
+        self._writer.writerow(record.values())
+        self._csv.flush()
+        self.count += 1
+
+    def _close_segment(self):
+        for f in (self._jsonl, self._csv):
+            if f:
+                f.close()
+        self._jsonl = self._csv = self._writer = None
+
+    def close(self):
+        self._close_segment()
+
+
+class StagingBatchSink:
+    """Gom batch_size record rồi insert vào staging_books (phần còn lại được insert khi close)"""
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        from load_csv_to_staging import load_books_to_staging
+        self._load = load_books_to_staging
+        self.batch_size = max(1, batch_size)
+        self.count = 0
+        self.loaded = 0
+        self.errors = 0
+        # (url, time_collect) của các record không insert được - nạp lại từ CSV khi kết thúc
+        self.failed_keys = set()
+        self._buffer = []
+
+    def write(self, book):
+        self._buffer.append(book)
+        self.count += 1
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        failed = []
+        try:
+            success_count, error_count = self._load(batch, failed)
+        except Exception as e:
+            print(f"    Lỗi insert micro-batch staging ({len(batch)} sách): {e}")
+            success_count, error_count, failed = 0, len(batch), batch
+        self.loaded += success_count
+        self.errors += error_count
+        for record in map(BookRecord.from_mapping, failed):
+            self.failed_keys.add((record.url, record.time_collect))
+        print(f"    Staging micro-batch: +{success_count} sách (tổng {self.loaded})")
+
+    def close(self):
+        self.flush()
+
+
+class FanoutSink:
+    def __init__(self, *sinks):
+        self.sinks = [s for s in sinks if s is not None]
+        self.count = 0
+
+    def sink_of(self, kind):
+        """Sink con đầu tiên thuộc kiểu kind (None nếu không có)"""
+        return next((s for s in self.sinks if isinstance(s, kind)), None)
+
+    def write(self, book):
+        # Parse một lần cho mọi sink
+        record = BookRecord.from_mapping(book)
+        for sink in self.sinks:
+            sink.write(record)
+        self.count += 1
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
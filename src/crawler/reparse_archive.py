@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Reparse Archive
+Chạy lại html_parser trên HTML đã lưu trong html_archive (không truy cập mạng)
+bằng một pool process, ghi kết quả ra JSONL/CSV như một lần crawl rồi load staging.
+Trọng lượng / rating / đã bán được chuẩn hoá theo lô bằng batch_normalizer cho mỗi
+nhóm trang thay vì từng trang; giá vẫn theo từng trang (phụ thuộc selector nào trúng).
+Dùng để điền lại trường sau khi sửa logic trích xuất thay vì crawl lại.
+
+Cách dùng:
+    python src/crawler/reparse_archive.py --workers 8
+    python src/crawler/reparse_archive.py --since 2025-11-01 --no-staging
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from batch_normalizer import apply_to_records, normalize_batch
+from fahasa_bulk_scraper import finish_crawl_results, logger, open_record_sink
+from html_archive import DEFAULT_ARCHIVE_DIR, archived_entries, read_record
+from html_parser import parse_book_html
+from record_sink import StagingBatchSink
+
+CHUNK_SIZE = 200
+# Các cột của normalize_batch lấy từ text thô (parse_book_html(..., raw)); cột giá bỏ qua
+BATCH_FIELDS = ['sold_count', 'sold_count_numeric', 'weight', 'rating']
+
+
+def reparse_chunk(archive_dir, entries):
+    """Parse một nhóm bản ghi (cùng file, theo offset). Trả về (books, failed)"""
+    books = []
+    raws = []
+    failed = 0
+    handles = {}
+    try:
+        for entry in entries:
+            try:
+                f = handles.get(entry['file'])
+                if f is None:
+                    f = handles[entry['file']] = open(os.path.join(archive_dir, entry['file']), 'rb')
+                _, page_html = read_record(f, entry['offset'], entry['length'])
+                raw = {}
+                book = parse_book_html(page_html, entry['url'], raw)
+            except Exception as e:
+                print(f"    Lỗi {entry['url']}: {e}")
+                book = None
+            if book is None:
+                failed += 1
+                continue
+            # Thời điểm thu thập là lúc tải trang, không phải lúc parse lại
+            book['time_collect'] = datetime.fromtimestamp(entry['fetched_at']).strftime('%Y-%m-%d %H:%M:%S')
+            books.append(book)
+            raws.append(raw)
+    finally:
+        for f in handles.values():
+            f.close()
+    if books:
+        apply_to_records(books, normalize_batch(raws)[BATCH_FIELDS])
+    return books, failed
+
+
+def chunk_entries(entries, size=CHUNK_SIZE):
+    """Chia theo file rồi theo size để mỗi process đọc tuần tự một file"""
+    chunks = []
+    for entry in entries:
+        if not chunks or len(chunks[-1]) >= size or chunks[-1][-1]['file'] != entry['file']:
+            chunks.append([])
+        chunks[-1].append(entry)
+    return chunks
+
+
+def reparse_archive(archive_dir=DEFAULT_ARCHIVE_DIR, workers=None, since=None, all_versions=False,
+                    limit=0, stage_batch=0, load_staging=True):
+    archive_dir = os.path.abspath(archive_dir)
+    entries = archived_entries(archive_dir, since, all_versions)
+    if limit:
+        entries = entries[:limit]
+    if not entries:
+        print("Archive không có trang nào phù hợp")
+        return None
+    chunks = chunk_entries(entries)
+    print(f"Parse lại {len(entries)} trang ({len(chunks)} nhóm) với {workers or os.cpu_count()} process")
+
+    crawl_log_id = logger.log_reparse_start(len(entries), archive_dir) if logger else None
+    file_sink, sink = open_record_sink(stage_batch)
+    failed = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(reparse_chunk, archive_dir, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                books, chunk_failed = future.result()
+                for book in books:
+                    sink.write(book)
+                failed += chunk_failed
+                print(f"    📊 {sink.count + failed}/{len(entries)} trang")
+    except KeyboardInterrupt:
+        print(f"\nNgười dùng dừng - đã parse {sink.count} sách")
+        if logger and crawl_log_id:
+            logger.log_crawl_error(crawl_log_id, f"Reparse interrupted by user. Parsed {sink.count} books")
+        return None
+    finally:
+        sink.close()
+
+    print(f"Parse lại: {sink.count} thành công, {failed} lỗi")
+    return finish_crawl_results(file_sink, sink.count, len(entries), crawl_log_id,
+                                staging=sink.sink_of(StagingBatchSink), load_staging=load_staging)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Trích xuất lại sách từ HTML archive (offline)')
+    parser.add_argument('--archive', default=DEFAULT_ARCHIVE_DIR, help='Thư mục html_archive')
+    parser.add_argument('--workers', type=int, default=None, help='Số process (mặc định: số CPU)')
+    parser.add_argument('--since', help='Chỉ trang tải từ ngày này (YYYY-MM-DD)')
+    parser.add_argument('--all-versions', action='store_true',
+                        help='Parse mọi phiên bản đã lưu thay vì chỉ bản mới nhất của mỗi sản phẩm')
+    parser.add_argument('--limit', type=int, default=0, help='Số trang tối đa (0 = tất cả)')
+    parser.add_argument('--stage-batch', type=int, default=0,
+                        help='Insert vào staging mỗi N sách (0 = load CSV khi kết thúc)')
+    parser.add_argument('--no-staging', action='store_true', help='Chỉ ghi JSONL/CSV, không load staging')
+    args = parser.parse_args()
+
+    since = datetime.strptime(args.since, '%Y-%m-%d').timestamp() if args.since else None
+    reparse_archive(args.archive, args.workers, since, args.all_versions, args.limit,
+                    args.stage_batch, not args.no_staging)
+
+
+if __name__ == "__main__":
+    main()
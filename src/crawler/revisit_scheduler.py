@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Revisit Scheduler
+Ước lượng tần suất thay đổi của từng sản phẩm từ lịch sử staging_books
+(sold_count_numeric, discount_price, rating_count theo time_collect) và chọn
+các URL nên crawl lại trong một ngân sách request cố định.
+
+Tần suất thay đổi dùng ước lượng Poisson của Cho & Garcia-Molina:
+    rate = -ln((n - X + 0.5) / (n + 0.5)) * n / T
+với n khoảng quan sát, X khoảng có thay đổi, T tổng thời gian (giờ).
+Điểm ưu tiên = xác suất sản phẩm đã thay đổi kể từ lần crawl gần nhất
+    P = 1 - exp(-rate * tuổi)
+
+Cách dùng:
+    python src/crawler/revisit_scheduler.py --budget 50 [--days 30]
+"""
+import argparse
+import math
+import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'etl'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
+from product_url import canonicalize_product_url, product_key
+
+# Sản phẩm chưa đủ lịch sử: giả định thay đổi khoảng một lần mỗi tuần
+DEFAULT_PRIOR_RATE = 1 / 168.0
+# Sản phẩm chưa từng thay đổi vẫn được xem lại, tối thiểu khoảng một lần mỗi tháng
+MIN_RATE = 1 / 720.0
+HISTORY_DAYS = 30
+
+HISTORY_SQL = """
+    SELECT product_key, url, time_collect, sold_count_numeric, discount_price, rating_count
+    FROM staging_books
+    WHERE time_collect >= NOW() - INTERVAL %s DAY
+      AND url IS NOT NULL AND url <> ''
+    ORDER BY time_collect
+"""
+
+
+def load_history(conn, days=HISTORY_DAYS):
+    """{product_key: {'url': ..., 'observations': [(time_collect, (sold, price, rating_count)), ...]}}"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(HISTORY_SQL, (days,))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    history = {}
+    for key, url, time_collect, *values in rows:
+        url = canonicalize_product_url(url)
+        key = key or product_key(url)
+        if not key or time_collect is None:
+            continue
+        entry = history.setdefault(key, {'url': url, 'observations': []})
+        entry['url'] = url
+        entry['observations'].append((time_collect, tuple(_normalize(v) for v in values)))
+    return history
+
+
+def _normalize(value):
+    return float(value) if value is not None else None
+
+
+def estimate_change_rate(observations):
+    """
+    Số lần thay đổi mỗi giờ từ các quan sát đã sắp xếp theo thời gian.
+    None nếu chưa đủ hai quan sát ở hai thời điểm khác nhau.
+    """
+    intervals = 0
+    changes = 0
+    total_hours = 0.0
+    for (prev_time, prev_values), (time_collect, values) in zip(observations, observations[1:]):
+        hours = (time_collect - prev_time).total_seconds() / 3600
+        if hours <= 0:
+            continue
+        intervals += 1
+        total_hours += hours
+        if values != prev_values:
+            changes += 1
+    if not intervals:
+        return None
+    rate = -math.log((intervals - changes + 0.5) / (intervals + 0.5)) * intervals / total_hours
+    return max(rate, MIN_RATE)
+
+
+def prior_rate(rates):
+    """Trung vị tần suất của các sản phẩm đã có lịch sử, dùng cho sản phẩm mới"""
+    known = sorted(r for r in rates if r is not None)
+    if not known:
+        return DEFAULT_PRIOR_RATE
+    mid = len(known) // 2
+    median = known[mid] if len(known) % 2 else (known[mid - 1] + known[mid]) / 2
+    return median or DEFAULT_PRIOR_RATE
+
+
+def schedule_revisits(history, budget, now=None):
+    """
+    Chọn tối đa budget sản phẩm có xác suất đã thay đổi cao nhất.
+    Trả về list dict {url, product_key, rate, age_hours, score} theo thứ tự ưu tiên.
+    """
+    if budget <= 0 or not history:
+        return []
+    now = now or datetime.now()
+
+    rates = {key: estimate_change_rate(entry['observations']) for key, entry in history.items()}
+    fallback_rate = prior_rate(rates.values())
+
+    candidates = []
+    for key, entry in history.items():
+        rate = rates[key] if rates[key] is not None else fallback_rate
+        age_hours = max((now - entry['observations'][-1][0]).total_seconds() / 3600, 0.0)
+        candidates.append({
+            'url': entry['url'],
+            'product_key': key,
+            'rate': rate,
+            'age_hours': age_hours,
+            'score': 1 - math.exp(-rate * age_hours),
+        })
+
+    candidates.sort(key=lambda c: (c['score'], c['rate']), reverse=True)
+    return candidates[:budget]
+
+
+def plan_revisits(budget, days=HISTORY_DAYS):
+    """Kế hoạch revisit từ staging; trả về list rỗng nếu không kết nối được MySQL"""
+    if budget <= 0:
+        return []
+    try:
+        from load_csv_to_staging import get_mysql_connection
+        conn = get_mysql_connection()
+    except Exception as e:
+        print(f"Không đọc được lịch sử staging cho revisit: {e}")
+        return []
+    try:
+        return schedule_revisits(load_history(conn, days), budget)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lập kế hoạch crawl lại theo tần suất thay đổi')
+    parser.add_argument('--budget', type=int, default=50, help='Số trang chi tiết được phép tải lại')
+    parser.add_argument('--days', type=int, default=HISTORY_DAYS, help='Số ngày lịch sử staging dùng để ước lượng')
+    args = parser.parse_args()
+
+    plan = plan_revisits(args.budget, args.days)
+    print(f"KẾ HOẠCH REVISIT: {len(plan)}/{args.budget} sách")
+    print("-" * 60)
+    for i, item in enumerate(plan, 1):
+        print(f"{i:>3}. P={item['score']:.2f}  {item['rate'] * 24:.2f} lần/ngày  "
+              f"{item['age_hours']:.0f}h  {item['url']}")
+
+
+if __name__ == "__main__":
+    main()
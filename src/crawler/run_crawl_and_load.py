@@ -100,14 +100,14 @@ def main():
     
     if os.path.exists(backup_dir):
         csv_files = [f for f in os.listdir(backup_dir) if f.endswith('.csv')]
-        json_files = [f for f in os.listdir(backup_dir) if f.endswith('.json')]
+        json_files = [f for f in os.listdir(backup_dir) if f.endswith('.jsonl')]
         
         if csv_files:
             csv_files.sort(reverse=True)
             json_files.sort(reverse=True)
             print(f"📁 Files created:")
             print(f"   CSV: {os.path.join(backup_dir, csv_files[0])}")
-            print(f"   JSON: {os.path.join(backup_dir, json_files[0])}")
+            print(f"   JSONL: {os.path.join(backup_dir, json_files[0])}")
     
     print("\n✅ CLEAN WORKFLOW HOÀN THÀNH!")
     print("\n🔄 WORKFLOW TIẾP THEO:")
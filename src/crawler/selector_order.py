@@ -0,0 +1,177 @@
+"""
+Selector Order
+Thứ tự selector tự điều chỉnh cho các trường có chuỗi fallback (số đánh giá).
+Chỉ dùng cho chuỗi mà selector nào trúng cũng cho cùng một giá trị: đổi thứ tự chỉ
+đổi chi phí, không đổi kết quả (giá thì không - xem html_parser.PRICE_SELECTORS).
+Mỗi chuỗi ghi lại selector nào trúng, tốn bao nhiêu ms; lần sau các selector được
+thử theo chi phí kỳ vọng cho một lần trúng (tổng ms / số lần trúng) tăng dần, nên
+trường hợp phổ biến trúng ngay lần đầu và các fallback đắt (quét toàn trang) gần
+như không phải chạy.
+
+- Số liệu mặc định gộp cho mọi trang (trang sản phẩm Fahasa dùng chung một layout);
+  trang có layout khác có thể truyền template riêng. Template mới (chưa đủ
+  WARMUP_PAGES trang) dùng thứ tự chung của mọi template
+- WARMUP_PAGES trang đầu và cứ mỗi EXPLORE_EVERY trang của một template: thử hết
+  chuỗi (vẫn lấy giá trị của selector trúng đầu tiên) để số liệu các selector khác
+  không bị cũ
+- Trạng thái lưu ở data/.crawl_state/selector_order.json cho lần chạy sau
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
+from state_file import write_json_atomic
+
+DEFAULT_STATE_PATH = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'data', '.crawl_state', 'selector_order.json'
+)
+ALL_TEMPLATES = '*'
+WARMUP_PAGES = 3
+EXPLORE_EVERY = 50
+# Giảm một nửa số liệu cũ khi một selector đã thử quá số lần này, để thích nghi khi trang đổi
+DECAY_ATTEMPTS = 1000
+
+
+def _cost_per_hit(entry):
+    attempts, hits, ms = entry
+    return ms / hits if hits else float('inf')
+
+
+class SelectorChain:
+    def __init__(self, name, selectors, lock, stats=None):
+        self.name = name
+        self.selectors = list(selectors)
+        self._lock = lock
+        # template -> {'pages': n, 'selectors': {selector: [attempts, hits, ms]}}
+        self.stats = stats if stats is not None else {}
+
+    def _ordered(self, template):
+        stats = self.stats.get(template)
+        if not stats or stats['pages'] < WARMUP_PAGES:
+            stats = self.stats.get(ALL_TEMPLATES)
+        if not stats:
+            return list(self.selectors)
+        entries = stats['selectors']
+        return sorted(self.selectors,
+                      key=lambda s: (_cost_per_hit(entries[s]) if s in entries else float('inf'),
+                                     self.selectors.index(s)))
+
+    def plan(self, template):
+        """(thứ tự selector, có thử hết chuỗi không) cho một trang"""
+        with self._lock:
+            pages = self.stats.get(template, {}).get('pages', 0)
+            return self._ordered(template), pages < WARMUP_PAGES or pages % EXPLORE_EVERY == 0
+
+    def record(self, template, results):
+        """results: [(selector, ms, hit)] của một trang"""
+        with self._lock:
+            for key in {template, ALL_TEMPLATES}:
+                stats = self.stats.setdefault(key, {'pages': 0, 'selectors': {}})
+                stats['pages'] += 1
+                for selector, ms, hit in results:
+                    entry = stats['selectors'].setdefault(selector, [0, 0, 0.0])
+                    entry[0] += 1
+                    entry[1] += int(hit)
+                    entry[2] += ms
+                    if entry[0] > DECAY_ATTEMPTS:
+                        stats['selectors'][selector] = [v / 2 for v in entry]
+
+    def first(self, attempt, probe=None, template=ALL_TEMPLATES):
+        """
+        Thử selector theo thứ tự đã học. attempt(selector) trả về giá trị hoặc None
+        (lỗi cũng tính là không trúng). Trả về giá trị của selector trúng đầu tiên.
+        probe: FieldProbe của field_metrics (tùy chọn)
+        template: khoá layout trang nếu các trang không cùng layout
+        """
+        order, explore = self.plan(template)
+        value = None
+        found = False
+        results = []
+        for selector in order:
+            if not found and probe is not None:
+                probe.attempt(selector)
+            started = time.perf_counter()
+            try:
+                result = attempt(selector)
+            except Exception:
+                result = None
+            results.append((selector, (time.perf_counter() - started) * 1000, result is not None))
+            if result is not None and not found:
+                value, found = result, True
+                if probe is not None:
+                    probe.hit = True
+                if not explore:
+                    break
+        self.record(template, results)
+        return value
+
+    def summary(self):
+        with self._lock:
+            stats = self.stats.get(ALL_TEMPLATES)
+            if not stats:
+                return f"{self.name}: chưa có số liệu"
+            order = self._ordered(ALL_TEMPLATES)
+            parts = []
+            for selector in order[:3]:
+                attempts, hits, ms = stats['selectors'].get(selector, [0, 0, 0.0])
+                if attempts:
+                    parts.append(f"{selector} ({hits / attempts:.0%} trúng, {ms / attempts:.1f}ms)")
+            return f"{self.name} [{stats['pages']} trang]: " + ' > '.join(parts)
+
+
+class SelectorRegistry:
+    def __init__(self, state_path=DEFAULT_STATE_PATH):
+        self.state_path = os.path.abspath(state_path) if state_path else None
+        self.chains = {}
+        self._lock = threading.Lock()
+        self._state = {}
+        self._load()
+
+    def _load(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self._state = json.load(f)['chains']
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Không đọc được thứ tự selector, dùng mặc định: {e}")
+
+    def chain(self, name, selectors):
+        """SelectorChain theo tên; số liệu của selector không còn trong danh sách bị bỏ"""
+        with self._lock:
+            if name not in self.chains:
+                stats = {}
+                for template, saved in self._state.get(name, {}).items():
+                    stats[template] = {
+                        'pages': saved.get('pages', 0),
+                        'selectors': {s: v for s, v in saved.get('selectors', {}).items() if s in selectors},
+                    }
+                self.chains[name] = SelectorChain(name, selectors, self._lock, stats)
+            return self.chains[name]
+
+    def save(self):
+        if not self.state_path:
+            return
+        with self._lock:
+            chains = dict(self._state)
+            for name, chain in self.chains.items():
+                chains[name] = {
+                    template: {'pages': stats['pages'],
+                               'selectors': {s: [round(v, 3) for v in entry]
+                                             for s, entry in stats['selectors'].items()}}
+                    for template, stats in chain.stats.items()
+                }
+            state = {'chains': chains, 'updated_at': time.strftime('%Y-%m-%d %H:%M:%S')}
+        write_json_atomic(self.state_path, state, ensure_ascii=False)
+
+    def summary(self):
+        with self._lock:
+            chains = [chain for chain in self.chains.values() if chain.stats]
+        return '\n'.join(chain.summary() for chain in chains)
+
+
+# Dùng chung cho mọi extractor trong một process
+selector_registry = SelectorRegistry()
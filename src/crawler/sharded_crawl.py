@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Sharded Crawl
+Crawl toàn bộ cây danh mục sách Fahasa: category_planner chia danh mục lá
+thành shard, mỗi shard chạy trong một process riêng (session Chrome / HTTP riêng,
+ghi JSONL riêng), cuối cùng gộp và loại trùng theo product_key rồi load staging.
+
+Cách dùng:
+    python src/crawler/sharded_crawl.py --shards 4 --engine http [--books 0] [--max-pages 50]
+    python src/crawler/sharded_crawl.py --plan-only
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from category_planner import (
+    MAX_DEPTH, ROOT_CATEGORY_URL, category_listing_url, discover_categories, plan_shards
+)
+from fahasa_bulk_scraper import build_engine, fetch_listing, finish_crawl_results, logger
+from frontier import Frontier
+from http_fetcher import create_http_session, fetch_html
+from listing_harvest import listing_fingerprint
+from politeness import AdaptiveDelay
+from record_sink import RotatingFileSink
+from selector_order import selector_registry
+from product_url import product_key
+from work_queue import SQLiteBroker, SharedPoliteness
+
+SHARD_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'data', '.crawl_state', 'shards')
+BOOKS_PER_PAGE = 24
+SLOTS_DB = 'slots.db'
+
+
+def crawl_shard(shard_id, category_urls, target, output_dir, engine='http', extract_mode='webdriver',
+                browser_profile='full', fresh_hours=24, max_pages=50):
+    """
+    Chạy trong process con: crawl lần lượt các danh mục của shard.
+    target=0: không giới hạn (tới hết danh mục hoặc max_pages).
+    Trả về (shard_id, số sách, số URL lỗi).
+    Các shard xếp request qua chung một file slots.db trong output_dir nên tổng tốc độ
+    tới fahasa.com vẫn là tốc độ của một crawler, không nhân theo số shard.
+    """
+    delay = AdaptiveDelay()
+    slots = SQLiteBroker(os.path.join(output_dir, SLOTS_DB))
+    politeness = SharedPoliteness(slots, delay)
+    session_factory, close_session, get_listing_items, fetch_detail = build_engine(
+        engine, extract_mode, browser_profile=browser_profile, politeness=politeness)
+    frontier = Frontier()
+    file_sink = RotatingFileSink(prefix=f'shard{shard_id:02d}', directory=output_dir)
+    failed = 0
+    session = session_factory()
+    try:
+        for category_url in category_urls:
+            template = category_listing_url(category_url)
+            seen = set()
+            for page in range(1, max_pages + 1):
+                if target and file_sink.count >= target:
+                    return shard_id, file_sink.count, failed
+                url = template.format(limit=BOOKS_PER_PAGE, page=page)
+                items = fetch_listing(get_listing_items, session, url, politeness)
+                politeness.wait('listing')
+                new_items = [item for item in (items or []) if item['url'] not in seen]
+                # Trang vượt quá cuối danh mục thường lặp lại trang cuối
+                if not new_items:
+                    break
+                seen.update(item['url'] for item in new_items)
+
+                for item in new_items:
+                    if target and file_sink.count >= target:
+                        break
+                    if not frontier.needs_fetch(item['url'], fresh_hours, listing_fingerprint(item)):
+                        continue
+                    book = fetch_detail(session, item['url'])
+                    if book:
+                        file_sink.write(book)
+                        frontier.mark_fetched(book, listing_fingerprint(item))
+                    else:
+                        failed += 1
+                    politeness.wait('detail')
+                print(f"[shard {shard_id}] {category_url} trang {page}: tổng {file_sink.count} sách")
+                politeness.wait('page')
+        return shard_id, file_sink.count, failed
+    finally:
+        file_sink.close()
+        close_session(session)
+        frontier.close()
+        slots.close()
+        delay.save()
+        selector_registry.save()
+
+
+def merge_shards(output_dir):
+    """Gộp JSONL của các shard vào sink chính, loại trùng theo product_key. Trả về (file_sink, số sách)"""
+    merged = RotatingFileSink()
+    seen = set()
+    duplicates = 0
+    for path in sorted(glob.glob(os.path.join(output_dir, '*.jsonl'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    book = json.loads(line)
+                except ValueError:
+                    continue
+                key = product_key(book.get('url'))
+                if key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+                merged.write(book)
+    merged.close()
+    print(f"Gộp shard: {merged.count} sách, bỏ {duplicates} bản trùng")
+    return merged, merged.count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl Fahasa theo shard danh mục')
+    parser.add_argument('--shards', type=int, default=4, help='Số shard / process song song')
+    parser.add_argument('--books', type=int, default=0, help='Tổng số sách (0 = toàn bộ danh mục)')
+    parser.add_argument('--max-pages', type=int, default=50, help='Số trang tối đa mỗi danh mục')
+    parser.add_argument('--depth', type=int, default=MAX_DEPTH, help='Độ sâu cây danh mục (1 = category_2)')
+    parser.add_argument('--root', default=ROOT_CATEGORY_URL, help='Danh mục gốc')
+    parser.add_argument('--engine', choices=['selenium', 'http'], default='http')
+    parser.add_argument('--extract', default='webdriver', help='Selenium extract mode')
+    parser.add_argument('--browser-profile', choices=['full', 'lite'], default='lite')
+    parser.add_argument('--fresh-hours', type=float, default=24,
+                        help='Bỏ qua sách đã crawl trong N giờ qua')
+    parser.add_argument('--plan-only', action='store_true', help='Chỉ in kế hoạch shard')
+    args = parser.parse_args()
+
+    http = create_http_session()
+    categories = discover_categories(lambda url: fetch_html(http, url), args.root, args.depth)
+    http.close()
+    shards = plan_shards(categories, args.shards)
+    print(f"Tìm thấy {len(categories)} danh mục, chia thành {len(shards)} shard")
+    for i, shard in enumerate(shards):
+        print(f"   shard {i}: {len(shard)} danh mục")
+    if args.plan_only or not shards:
+        return
+
+    crawl_log_id = logger.log_crawl_start(args.books) if logger else None
+    output_dir = os.path.abspath(os.path.join(SHARD_DIR, datetime.now().strftime('%Y%m%d_%H%M%S')))
+    os.makedirs(output_dir, exist_ok=True)
+    per_shard = math.ceil(args.books / len(shards)) if args.books else 0
+
+    try:
+        with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+            futures = [
+                executor.submit(crawl_shard, i, shard, per_shard, output_dir, args.engine, args.extract,
+                                args.browser_profile, args.fresh_hours, args.max_pages)
+                for i, shard in enumerate(shards)
+            ]
+            for future in as_completed(futures):
+                try:
+                    shard_id, collected, failed = future.result()
+                    print(f"✅ shard {shard_id}: {collected} sách, {failed} lỗi")
+                except Exception as e:
+                    print(f"❌ shard lỗi: {e}")
+    except KeyboardInterrupt:
+        print("\nNgười dùng dừng - gộp các sách đã thu thập")
+
+    # Gộp cả khi bị dừng giữa chừng: mọi sách đã ghi trong file shard đều được giữ
+    merged, collected = merge_shards(output_dir)
+    finish_crawl_results(merged, collected, args.books or collected or 1, crawl_log_id)
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Sitemap Discovery
+Tìm URL sản phẩm từ XML sitemap thay vì lật trang danh mục 24 sách/lần:
+- đọc sitemap index và urlset theo kiểu streaming (lxml iterparse, giải phóng
+  từng phần tử sau khi đọc) nên sitemap hàng trăm nghìn URL không chiếm nhiều RAM
+- tự nhận gzip theo magic bytes (.xml.gz) kể cả khi server không gửi Content-Encoding
+- nguồn có thể là URL http(s) hoặc file cục bộ (fixture); sitemap con có đường dẫn
+  tương đối được tìm cạnh file cha
+- chỉ trả về sản phẩm có lastmod mới hơn lần tải gần nhất trong frontier
+
+Cách dùng:
+    python src/crawler/sitemap_discovery.py --output data/.crawl_state/sitemap_urls.txt
+    python src/crawler/sitemap_discovery.py --sitemap data/sitemaps/sitemap_index.xml.gz --limit 500
+"""
+import argparse
+import gzip
+import os
+import re
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urljoin
+
+from lxml import etree
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from frontier import Frontier
+from http_fetcher import REQUEST_TIMEOUT, create_http_session
+
+ROBOTS_URL = "https://www.fahasa.com/robots.txt"
+DEFAULT_SITEMAP_URL = "https://www.fahasa.com/sitemap.xml"
+PRODUCT_URL_PATTERN = r'^https://(www\.)?fahasa\.com/[^/?#]+\.html$'
+GZIP_MAGIC = b'\x1f\x8b'
+MAX_SITEMAP_DEPTH = 3
+
+
+def parse_lastmod(value):
+    """W3C datetime (2025-11-20, 2025-11-20T08:15:00+07:00, ...Z) -> epoch giây; None nếu không đọc được"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+class _PrefixedStream:
+    """Stream đọc lại các byte đầu đã lấy ra để kiểm tra magic bytes"""
+
+    def __init__(self, head, stream):
+        self.head = head
+        self.stream = stream
+
+    def read(self, size=-1):
+        if not self.head:
+            return self.stream.read(size)
+        if size is None or size < 0:
+            data, self.head = self.head + self.stream.read(), b''
+            return data
+        data, self.head = self.head[:size], self.head[size:]
+        if len(data) < size:
+            data += self.stream.read(size - len(data))
+        return data
+
+
+def _decompressed(stream):
+    """Bọc stream bằng GzipFile nếu nội dung là gzip"""
+    head = stream.read(2)
+    stream = _PrefixedStream(head, stream)
+    if head == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=stream)
+    return stream
+
+
+def iter_sitemap_entries(stream):
+    """
+    Duyệt một sitemap (urlset hoặc sitemapindex) từ stream bytes.
+    Yield (kind, loc, lastmod) với kind là 'url' hoặc 'sitemap'.
+    """
+    parser = etree.iterparse(_decompressed(stream), events=('end',), tag=('{*}url', '{*}sitemap'),
+                             resolve_entities=False, no_network=True, huge_tree=True)
+    for _, elem in parser:
+        loc = elem.findtext('{*}loc')
+        if loc and loc.strip():
+            yield etree.QName(elem).localname, loc.strip(), parse_lastmod(elem.findtext('{*}lastmod'))
+        # Giải phóng phần tử đã đọc để bộ nhớ không tăng theo kích thước sitemap
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+
+def _is_remote(location):
+    return location.startswith(('http://', 'https://'))
+
+
+@contextmanager
+def open_sitemap(location, session=None):
+    """Mở sitemap (URL hoặc file cục bộ) dưới dạng stream bytes"""
+    if _is_remote(location):
+        session = session or create_http_session()
+        response = session.get(location, stream=True, timeout=REQUEST_TIMEOUT)
+        try:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            yield response.raw
+        finally:
+            response.close()
+    else:
+        path = location[len('file://'):] if location.startswith('file://') else location
+        with open(path, 'rb') as f:
+            yield f
+
+
+def sitemaps_from_robots(robots_text):
+    """Các dòng 'Sitemap:' trong robots.txt"""
+    return [line.split(':', 1)[1].strip() for line in robots_text.splitlines()
+            if line.lower().startswith('sitemap:') and line.split(':', 1)[1].strip()]
+
+
+def default_sitemaps(session=None):
+    """Sitemap khai báo trong robots.txt, hoặc /sitemap.xml nếu không có"""
+    session = session or create_http_session()
+    try:
+        response = session.get(ROBOTS_URL, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return sitemaps_from_robots(response.text) or [DEFAULT_SITEMAP_URL]
+    except Exception as e:
+        print(f"Không đọc được robots.txt ({e}), dùng {DEFAULT_SITEMAP_URL}")
+        return [DEFAULT_SITEMAP_URL]
+
+
+def _child_location(parent, loc):
+    if _is_remote(loc) or _is_remote(parent) or os.path.isabs(loc):
+        return urljoin(parent, loc) if _is_remote(parent) else loc
+    return os.path.join(os.path.dirname(parent), loc)
+
+
+def walk_sitemaps(roots, session=None, max_depth=MAX_SITEMAP_DEPTH):
+    """Yield (url, lastmod) của mọi URL trong các sitemap, đi theo sitemap index tới max_depth"""
+    seen = set()
+    stack = [(root, 0) for root in reversed(roots)]
+    while stack:
+        location, depth = stack.pop()
+        if location in seen:
+            continue
+        seen.add(location)
+        children = []
+        try:
+            with open_sitemap(location, session) as stream:
+                for kind, loc, lastmod in iter_sitemap_entries(stream):
+                    if kind == 'url':
+                        yield loc, lastmod
+                    elif depth < max_depth:
+                        children.append((_child_location(location, loc), depth + 1))
+        except Exception as e:
+            print(f"Lỗi đọc sitemap {location}: {e}")
+        stack.extend(reversed(children))
+
+
+def discover_changed_products(roots, frontier, pattern=PRODUCT_URL_PATTERN, fresh_hours=24,
+                              limit=0, session=None):
+    """
+    URL sản phẩm trong sitemap cần crawl (mới hoặc lastmod sau lần tải gần nhất),
+    sắp xếp theo lastmod mới nhất trước. Mọi sản phẩm tìm thấy đều được ghi vào frontier.
+    """
+    product_re = re.compile(pattern)
+    changed = []
+    batch = []
+    seen = 0
+    for url, lastmod in walk_sitemaps(roots, session):
+        if not product_re.match(url):
+            continue
+        seen += 1
+        batch.append(url)
+        if len(batch) >= 1000:
+            frontier.add_many(batch)
+            batch = []
+        if frontier.changed_since(url, lastmod, fresh_hours):
+            changed.append((url, lastmod))
+    if batch:
+        frontier.add_many(batch)
+
+    changed.sort(key=lambda entry: entry[1] or 0, reverse=True)
+    print(f"Sitemap: {seen} sản phẩm, {len(changed)} mới / đã thay đổi")
+    if limit:
+        changed = changed[:limit]
+    return [url for url, _ in changed]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tìm sản phẩm mới / đã thay đổi từ sitemap Fahasa')
+    parser.add_argument('--sitemap', action='append',
+                        help='URL hoặc file sitemap (lặp lại được; mặc định lấy từ robots.txt)')
+    parser.add_argument('--pattern', default=PRODUCT_URL_PATTERN, help='Regex URL sản phẩm')
+    parser.add_argument('--fresh-hours', type=float, default=24,
+                        help='URL không có lastmod: crawl lại nếu đã tải quá N giờ')
+    parser.add_argument('--limit', type=int, default=0, help='Số URL tối đa (0 = tất cả)')
+    parser.add_argument('--output', help='Ghi danh sách URL ra file (dùng cho distributed_crawl.py seed --urls)')
+    args = parser.parse_args()
+
+    session = create_http_session()
+    frontier = Frontier()
+    try:
+        roots = args.sitemap or default_sitemaps(session)
+        urls = discover_changed_products(roots, frontier, args.pattern, args.fresh_hours,
+                                         args.limit, session)
+    finally:
+        frontier.close()
+        session.close()
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.writelines(url + '\n' for url in urls)
+        print(f"Đã ghi {len(urls)} URL: {args.output}")
+    else:
+        for url in urls:
+            print(url)
+
+
+if __name__ == "__main__":
+    main()
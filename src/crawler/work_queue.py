@@ -0,0 +1,304 @@
+"""
+Work Queue
+Hàng đợi công việc cho crawl nhiều node: node seed đưa URL sản phẩm vào hàng đợi,
+các node worker thuê (lease) task, crawl rồi đẩy kết quả và ack; node collect
+lấy kết quả ra file/staging.
+
+- Task được thuê với visibility timeout: worker chết hoặc treo thì lease hết hạn
+  và task tự quay lại hàng đợi (tính một lần thử); quá max_attempts thì vào 'dead'
+- complete() ghi kết quả và ack trong cùng transaction, chỉ khi worker còn giữ lease
+- drain_results() ack từng kết quả đã giao cho handler (handler lỗi giữa batch không làm
+  ghi lại các kết quả trước đó); bản ghi hỏng vào dead_results để không bị giao lại mãi
+- reserve_slot() chia khung thời gian request theo host cho mọi node, để giới hạn
+  politeness áp dụng cho cả cụm chứ không riêng từng máy
+
+WorkQueue là interface; SQLiteBroker là bản cài đặt cục bộ (một file SQLite dùng chung
+cho nhiều process trên cùng máy) để chạy và thử nghiệm trên một máy Linux.
+"""
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'utils'))
+from book_record import BookRecord
+from product_url import canonicalize_product_url, product_key
+from politeness import WAIT_FACTORS
+
+DEFAULT_QUEUE_DB = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'data', '.crawl_state', 'queue.db'
+)
+VISIBILITY_TIMEOUT = 300
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 30
+
+
+class WorkQueue(ABC):
+    """Các thao tác mà worker/seed/collect cần từ một broker"""
+
+    @abstractmethod
+    def put(self, urls, priority=0, requeue=False):
+        ...
+
+    @abstractmethod
+    def lease(self, owner, count=1, visibility_timeout=VISIBILITY_TIMEOUT):
+        ...
+
+    @abstractmethod
+    def extend(self, task_id, owner, visibility_timeout=VISIBILITY_TIMEOUT):
+        ...
+
+    @abstractmethod
+    def complete(self, task_id, owner, book):
+        ...
+
+    @abstractmethod
+    def nack(self, task_id, owner, error=None, retry_delay=RETRY_DELAY):
+        ...
+
+    @abstractmethod
+    def drain_results(self, handler, batch_size=500):
+        ...
+
+    @abstractmethod
+    def reserve_slot(self, host, interval):
+        ...
+
+    @abstractmethod
+    def stats(self):
+        ...
+
+    def close(self):
+        pass
+
+
+class SQLiteBroker(WorkQueue):
+    def __init__(self, path=DEFAULT_QUEUE_DB, max_attempts=MAX_ATTEMPTS):
+        self.path = os.path.abspath(path)
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url_key TEXT NOT NULL UNIQUE,
+                url TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                state TEXT NOT NULL DEFAULT 'ready',
+                lease_owner TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                enqueued_at REAL NOT NULL,
+                last_error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_tasks_ready ON tasks (state, priority DESC, id);
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                task_id INTEGER NOT NULL,
+                owner TEXT NOT NULL,
+                book TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS dead_results (
+                id INTEGER PRIMARY KEY,
+                task_id INTEGER NOT NULL,
+                owner TEXT NOT NULL,
+                book TEXT NOT NULL,
+                error TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS host_slots (
+                host TEXT PRIMARY KEY,
+                next_at REAL NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    def put(self, urls, priority=0, requeue=False):
+        """Thêm URL (bỏ qua URL đã có; requeue=True đưa lại task đã xong/dead). Trả về số task được thêm/đưa lại"""
+        now = time.time()
+        rows = []
+        for url in urls:
+            url = canonicalize_product_url(url)
+            rows.append((product_key(url), url, priority, now, now))
+        reset = "state = 'ready', attempts = 0, available_at = excluded.available_at, priority = excluded.priority"
+        conflict = (f"DO UPDATE SET {reset} WHERE tasks.state IN ('done', 'dead')" if requeue
+                    else "DO NOTHING")
+        with self._lock:
+            before = self.conn.total_changes
+            self.conn.executemany(f"""
+                INSERT INTO tasks (url_key, url, priority, available_at, enqueued_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(url_key) {conflict}
+            """, rows)
+            self.conn.commit()
+            return self.conn.total_changes - before
+
+    def lease(self, owner, count=1, visibility_timeout=VISIBILITY_TIMEOUT):
+        """Thuê tối đa count task; trả về list dict {id, url, attempts}"""
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            # Lease hết hạn ở lần thử cuối: không cho thuê lại nữa
+            self.conn.execute("""
+                UPDATE tasks SET state = 'dead', lease_owner = NULL, last_error = 'lease expired'
+                WHERE state = 'leased' AND lease_until < ? AND attempts >= ?
+            """, (now, self.max_attempts))
+            rows = self.conn.execute("""
+                SELECT id, url, attempts FROM tasks
+                WHERE (state = 'ready' AND available_at <= ?) OR (state = 'leased' AND lease_until < ?)
+                ORDER BY priority DESC, id LIMIT ?
+            """, (now, now, count)).fetchall()
+            self.conn.executemany("""
+                UPDATE tasks SET state = 'leased', lease_owner = ?, lease_until = ?, attempts = attempts + 1
+                WHERE id = ?
+            """, [(owner, now + visibility_timeout, row[0]) for row in rows])
+            self.conn.commit()
+        return [{'id': row[0], 'url': row[1], 'attempts': row[2] + 1} for row in rows]
+
+    def _owned(self, task_id, owner):
+        return self.conn.execute(
+            "SELECT 1 FROM tasks WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+            (task_id, owner)
+        ).fetchone() is not None
+
+    def extend(self, task_id, owner, visibility_timeout=VISIBILITY_TIMEOUT):
+        with self._lock:
+            cursor = self.conn.execute("""
+                UPDATE tasks SET lease_until = ? WHERE id = ? AND state = 'leased' AND lease_owner = ?
+            """, (time.time() + visibility_timeout, task_id, owner))
+            self.conn.commit()
+            return cursor.rowcount == 1
+
+    def complete(self, task_id, owner, book):
+        """Ghi kết quả và ack; False nếu lease đã hết hạn và task thuộc về worker khác"""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            if not self._owned(task_id, owner):
+                self.conn.rollback()
+                return False
+            self.conn.execute(
+                "INSERT INTO results (task_id, owner, book, created_at) VALUES (?, ?, ?, ?)",
+                (task_id, owner, json.dumps(BookRecord.from_mapping(book).to_dict(), ensure_ascii=False),
+                 time.time())
+            )
+            self.conn.execute(
+                "UPDATE tasks SET state = 'done', lease_owner = NULL, lease_until = NULL WHERE id = ?",
+                (task_id,)
+            )
+            self.conn.commit()
+            return True
+
+    def nack(self, task_id, owner, error=None, retry_delay=RETRY_DELAY):
+        """Trả task về hàng đợi (chờ retry_delay * số lần thử) hoặc đánh dấu dead khi hết lượt"""
+        with self._lock:
+            self.conn.execute("""
+                UPDATE tasks SET
+                    state = CASE WHEN attempts >= ? THEN 'dead' ELSE 'ready' END,
+                    available_at = ? + ? * attempts,
+                    lease_owner = NULL, lease_until = NULL, last_error = ?
+                WHERE id = ? AND state = 'leased' AND lease_owner = ?
+            """, (self.max_attempts, time.time(), retry_delay, error, task_id, owner))
+            self.conn.commit()
+
+    def drain_results(self, handler, batch_size=500):
+        """
+        Gọi handler(BookRecord) cho từng kết quả rồi ack (xoá) các kết quả đã xử lý, commit
+        theo batch. handler raise (lỗi ghi file...) thì các kết quả đã giao trước đó vẫn được
+        ack, kết quả lỗi và phần còn lại ở lại hàng đợi, exception được ném tiếp. Kết quả
+        không parse được thành BookRecord được chuyển sang dead_results thay vì chặn hàng
+        đợi mãi mãi. Trả về số kết quả đã giao cho handler.
+        """
+        total = 0
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    "SELECT id, book FROM results ORDER BY id LIMIT ?", (batch_size,)
+                ).fetchall()
+            if not rows:
+                return total
+            handled, rejected = [], []
+            try:
+                for row_id, book in rows:
+                    try:
+                        record = BookRecord.from_mapping(json.loads(book))
+                    except (AttributeError, TypeError, ValueError) as e:
+                        rejected.append((str(e), row_id))
+                        continue
+                    handler(record)
+                    handled.append(row_id)
+            finally:
+                self._ack_results(handled, rejected)
+                total += len(handled)
+
+    def _ack_results(self, handled, rejected):
+        with self._lock:
+            self.conn.executemany("""
+                INSERT INTO dead_results (id, task_id, owner, book, error, created_at)
+                SELECT id, task_id, owner, book, ?, created_at FROM results WHERE id = ?
+            """, rejected)
+            self.conn.executemany("DELETE FROM results WHERE id = ?",
+                                  [(row_id,) for row_id in handled] + [(row_id,) for _, row_id in rejected])
+            self.conn.commit()
+        if rejected:
+            print(f"Bỏ {len(rejected)} kết quả lỗi sang dead_results (vd: {rejected[0][0]})")
+
+    def reserve_slot(self, host, interval):
+        """Giữ khung request kế tiếp của host (cách khung trước interval giây); trả về số giây cần chờ"""
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            row = self.conn.execute("SELECT next_at FROM host_slots WHERE host = ?", (host,)).fetchone()
+            start = max(now, row[0]) if row else now
+            self.conn.execute(
+                "INSERT OR REPLACE INTO host_slots (host, next_at) VALUES (?, ?)",
+                (host, start + interval)
+            )
+            self.conn.commit()
+        return start - now
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.conn.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall())
+            counts['results'] = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            counts['dead_results'] = self.conn.execute("SELECT COUNT(*) FROM dead_results").fetchone()[0]
+            counts['workers'] = self.conn.execute(
+                "SELECT COUNT(DISTINCT lease_owner) FROM tasks WHERE state = 'leased' AND lease_until >= ?",
+                (time.time(),)
+            ).fetchone()[0]
+        return counts
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class SharedPoliteness:
+    """
+    AdaptiveDelay của node + khung request chung của cả cụm: mỗi node vẫn tự học
+    khoảng chờ theo AIMD, nhưng các request tới cùng host được xếp nối tiếp nhau
+    qua broker nên tổng tốc độ của cụm không vượt tốc độ một crawler.
+    """
+
+    def __init__(self, queue, delay, host='www.fahasa.com'):
+        self.queue = queue
+        self.delay = delay
+        self.host = host
+
+    def timed(self, fn, *args, ok=None, **kwargs):
+        return self.delay.timed(fn, *args, ok=ok, **kwargs)
+
+    def wait(self, kind='detail'):
+        interval = self.delay.delay * WAIT_FACTORS.get(kind, 1.0)
+        interval *= random.uniform(1 - self.delay.jitter, 1 + self.delay.jitter)
+        wait = self.queue.reserve_slot(self.host, interval)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
@@ -0,0 +1,225 @@
+"""
+Detail Worker Pool
+Chạy nhiều worker song song, mỗi worker giữ một session riêng (Chrome driver)
+và cùng lấy URL sản phẩm từ một hàng đợi chung.
+"""
+import queue
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class HostLimiter:
+    """Giới hạn số request đồng thời tới cùng một host"""
+
+    def __init__(self, max_per_host=2):
+        self.max_per_host = max(1, int(max_per_host))
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def _semaphore(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            sem = self._semaphores.get(host)
+            if sem is None:
+                sem = threading.BoundedSemaphore(self.max_per_host)
+                self._semaphores[host] = sem
+            return sem
+
+    def acquire(self, url):
+        sem = self._semaphore(url)
+        sem.acquire()
+        return sem
+
+
+class CrawlProgress:
+    """Bộ đếm tiến độ dùng chung giữa các worker"""
+
+    def __init__(self, target, collected=0):
+        self.target = target
+        self.collected = collected
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    @property
+    def reached(self):
+        with self._lock:
+            return self.collected >= self.target
+
+    def record_success(self):
+        """Trả về False nếu đã đủ mục tiêu (kết quả thừa sẽ bị bỏ)"""
+        with self._lock:
+            if self.collected >= self.target:
+                return False
+            self.collected += 1
+            return True
+
+    def cancel_success(self):
+        """Bỏ một lần record_success khi kết quả không ghi được"""
+        with self._lock:
+            self.collected -= 1
+
+    def record_failure(self):
+        with self._lock:
+            self.failed += 1
+
+    def summary(self):
+        with self._lock:
+            percent = (self.collected / self.target * 100) if self.target else 0.0
+            return f"{self.collected}/{self.target} ({percent:.1f}%)"
+
+
+class DetailWorkerPool:
+    """
+    Pool gồm N worker. Mỗi worker tạo session bằng session_factory,
+    gọi fetch_fn(session, url) cho từng URL và chuyển kết quả cho on_result.
+    """
+
+    def __init__(self, num_workers, session_factory, fetch_fn,
+                 progress, host_limiter=None, delay_range=(2, 4),
+                 close_fn=None, on_result=None, queue_size=0, wait=None, on_failure=None):
+        self.num_workers = max(1, int(num_workers))
+        self.session_factory = session_factory
+        self.fetch_fn = fetch_fn
+        self.progress = progress
+        self.host_limiter = host_limiter or HostLimiter()
+        self.delay_range = delay_range
+        # wait(kind) (AdaptiveDelay.wait) thay cho delay_range cố định khi được truyền vào;
+        # thời gian tải trang được báo cho AdaptiveDelay ngay trong fetch_fn (build_engine)
+        self.wait_fn = wait
+        self.close_fn = close_fn
+        self.on_result = on_result
+        self.on_failure = on_failure
+        self._results_lock = threading.Lock()
+        self._stopped = threading.Event()
+        # queue_size > 0: hàng đợi giới hạn, submit() sẽ chờ khi đầy (backpressure)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        # Số worker còn session; giảm khi session_factory lỗi
+        self._live = self.num_workers
+        self._live_lock = threading.Lock()
+
+    @property
+    def alive(self):
+        """False khi không worker nào khởi tạo được session"""
+        with self._live_lock:
+            return self._live > 0
+
+    def start(self):
+        for worker_id in range(1, self.num_workers + 1):
+            thread = threading.Thread(
+                target=self._worker, args=(worker_id,),
+                name=f"detail-worker-{worker_id}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, url):
+        self._queue.put(url)
+
+    def wait(self):
+        """Chờ tới khi tất cả URL đã submit được xử lý xong"""
+        self._queue.join()
+
+    def close(self, cancel=False):
+        """Dừng các worker; cancel=True bỏ qua các URL còn trong hàng đợi"""
+        if cancel:
+            self._stopped.set()
+        # Mỗi worker còn chạy nhận một None (worker lỗi session đã thoát, trừ worker cuối rút hàng đợi)
+        with self._live_lock:
+            consumers = max(1, self._live) if self._threads else 0
+        for _ in range(consumers):
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _worker(self, worker_id):
+        try:
+            session = self.session_factory()
+        except Exception as e:
+            print(f"[worker {worker_id}] Không khởi tạo được session: {e}")
+            with self._live_lock:
+                self._live -= 1
+                last = self._live == 0
+            # Worker khác còn session thì để chúng xử lý hàng đợi; worker cuối cùng
+            # rút hết hàng đợi và tính mọi URL là lỗi để wait() không treo
+            if last:
+                self._drain_failed(worker_id)
+            return
+
+        try:
+            while True:
+                url = self._queue.get()
+                try:
+                    if url is None:
+                        return
+                    if self.progress.reached or self._stopped.is_set():
+                        continue
+                    try:
+                        self._process(worker_id, session, url)
+                    except Exception as e:
+                        # Lỗi ngoài dự kiến không được làm chết worker (wait() sẽ treo)
+                        print(f"[worker {worker_id}] Lỗi xử lý {url}: {e}")
+                finally:
+                    self._queue.task_done()
+        finally:
+            if self.close_fn:
+                try:
+                    self.close_fn(session)
+                except Exception:
+                    pass
+
+    def _drain_failed(self, worker_id):
+        while True:
+            url = self._queue.get()
+            try:
+                if url is None:
+                    return
+                self._record_failure(worker_id, url)
+            finally:
+                self._queue.task_done()
+
+    def _record_failure(self, worker_id, url):
+        self.progress.record_failure()
+        if self.on_failure:
+            self.on_failure(url)
+        print(f"[worker {worker_id}] Không lấy được dữ liệu: {url}")
+
+    def _process(self, worker_id, session, url):
+        sem = self.host_limiter.acquire(url)
+        try:
+            book = self.fetch_fn(session, url)
+        except Exception as e:
+            print(f"[worker {worker_id}] Lỗi {url}: {e}")
+            book = None
+        finally:
+            sem.release()
+
+        if book and self.progress.record_success():
+            try:
+                if self.on_result:
+                    with self._results_lock:
+                        self.on_result(book)
+            except Exception as e:
+                # Sink / checkpoint lỗi: sách không được lưu nên tính là URL lỗi
+                print(f"[worker {worker_id}] Lỗi ghi kết quả {url}: {e}")
+                self.progress.cancel_success()
+                self._record_failure(worker_id, url)
+                return
+            print(f"[worker {worker_id}] ✅ {book['title'][:50]} - "
+                  f"📊 {self.progress.summary()}")
+            if self.delay_range:
+                time.sleep(random.uniform(*self.delay_range))
+        elif not book:
+            self._record_failure(worker_id, url)
+        if self.wait_fn:
+            self.wait_fn('detail')
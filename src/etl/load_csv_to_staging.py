@@ -3,11 +3,14 @@ CSV to Staging Loader
 Tải dữ liệu từ file CSV vào staging_books table
 """
 import mysql.connector
-import pandas as pd
+import csv
 import sys
 import os
 from datetime import datetime
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+from book_record import BookRecord
+
 # MySQL Configuration
 MYSQL_CONFIG = {
     'host': 'localhost',
@@ -21,8 +24,63 @@ def get_mysql_connection():
     """Tạo kết nối MySQL"""
     return mysql.connector.connect(**MYSQL_CONFIG)
 
-def load_csv_to_staging(csv_file_path):
-    """Load CSV file vào staging_books table"""
+STAGING_INSERT_SQL = '''
+    INSERT INTO staging_books (
+        title, author, publisher, supplier,
+        category_1, category_2, category_3,
+        original_price, discount_price, discount_percent,
+        rating, rating_count, sold_count, sold_count_numeric,
+        publish_year, language, page_count, weight, dimensions,
+        url, product_key, url_img, time_collect
+    ) VALUES (
+        %s, %s, %s, %s,
+        %s, %s, %s,
+        %s, %s, %s,
+        %s, %s, %s, %s,
+        %s, %s, %s, %s, %s,
+        %s, %s, %s, %s
+    )
+'''
+
+def staging_row_values(row):
+    """Giá trị cho STAGING_INSERT_SQL từ BookRecord, book dict hoặc dòng CSV (ép kiểu một lần trong BookRecord)"""
+    return BookRecord.from_mapping(row).staging_values()
+
+def insert_staging_rows(cursor, rows, failed=None):
+    """Insert từng dòng vào staging_books, trả về (success_count, error_count); failed: list nhận các dòng lỗi"""
+    success_count = 0
+    error_count = 0
+    
+    for idx, row in enumerate(rows):
+        try:
+            cursor.execute(STAGING_INSERT_SQL, staging_row_values(row))
+            success_count += 1
+            
+        except Exception as e:
+            print(f"Lỗi insert row {idx + 1}: {e}")
+            error_count += 1
+            if failed is not None:
+                failed.append(row)
+    
+    return success_count, error_count
+
+def load_books_to_staging(books, failed=None):
+    """Insert một lô book dict (micro-batch từ crawler) vào staging_books"""
+    conn = get_mysql_connection()
+    try:
+        cursor = conn.cursor()
+        success_count, error_count = insert_staging_rows(cursor, books, failed)
+        conn.commit()
+        cursor.close()
+        return success_count, error_count
+    finally:
+        conn.close()
+
+def load_csv_to_staging(csv_file_path, only_keys=None):
+    """
+    Load CSV file vào staging_books table.
+    only_keys: tập (url, time_collect) - chỉ load các dòng này (nạp lại phần micro-batch bị lỗi)
+    """
     try:
         # Check if file exists
         if not os.path.exists(csv_file_path):
@@ -31,10 +89,13 @@ def load_csv_to_staging(csv_file_path):
         
         # Read CSV
         print(f"Đọc file CSV: {csv_file_path}")
-        df = pd.read_csv(csv_file_path)
-        print(f"Tìm thấy {len(df)} sách trong CSV")
+        with open(csv_file_path, 'r', encoding='utf-8-sig', newline='') as f:
+            rows = list(csv.DictReader(f))
+        if only_keys is not None:
+            rows = [row for row in rows if (row.get('url'), row.get('time_collect')) in only_keys]
+        print(f"Tìm thấy {len(rows)} sách trong CSV")
         
-        if len(df) == 0:
+        if len(rows) == 0:
             print("File CSV trống")
             return True
         
@@ -42,67 +103,7 @@ def load_csv_to_staging(csv_file_path):
         conn = get_mysql_connection()
         cursor = conn.cursor()
         
-        # Prepare insert statement
-        insert_sql = '''
-            INSERT INTO staging_books (
-                title, author, publisher, supplier,
-                category_1, category_2, category_3,
-                original_price, discount_price, discount_percent,
-                rating, rating_count, sold_count, sold_count_numeric,
-                publish_year, language, page_count, weight, dimensions,
-                url, url_img, time_collect
-            ) VALUES (
-                %s, %s, %s, %s,
-                %s, %s, %s,
-                %s, %s, %s,
-                %s, %s, %s, %s,
-                %s, %s, %s, %s, %s,
-                %s, %s, %s
-            )
-        '''
-        
-        success_count = 0
-        error_count = 0
-        
-        for idx, row in df.iterrows():
-            try:
-                # Convert time_collect if needed
-                time_collect = row.get('time_collect', datetime.now())
-                if isinstance(time_collect, str):
-                    try:
-                        time_collect = datetime.strptime(time_collect, '%Y-%m-%d %H:%M:%S')
-                    except:
-                        time_collect = datetime.now()
-                
-                cursor.execute(insert_sql, (
-                    str(row.get('title', '')),
-                    str(row.get('author', '')),
-                    str(row.get('publisher', '')),
-                    str(row.get('supplier', '')),
-                    str(row.get('category_1', '')),
-                    str(row.get('category_2', '')),
-                    str(row.get('category_3', '')),
-                    float(row.get('original_price', 0)),
-                    float(row.get('discount_price', 0)),
-                    float(row.get('discount_percent', 0)),
-                    float(row.get('rating', 0)),
-                    int(row.get('rating_count', 0)),
-                    str(row.get('sold_count', '')),
-                    int(row.get('sold_count_numeric', 0)),
-                    int(row.get('publish_year', 2025)) if pd.notna(row.get('publish_year')) else None,
-                    str(row.get('language', '')),
-                    int(row.get('page_count', 0)) if pd.notna(row.get('page_count')) else None,
-                    float(row.get('weight', 0)) if pd.notna(row.get('weight')) else None,
-                    str(row.get('dimensions', '')),
-                    str(row.get('url', '')),
-                    str(row.get('url_img', '')),
-                    time_collect
-                ))
-                success_count += 1
-                
-            except Exception as e:
-                print(f"Lỗi insert row {idx + 1}: {e}")
-                error_count += 1
+        success_count, error_count = insert_staging_rows(cursor, rows)
         
         # Commit changes
         conn.commit()
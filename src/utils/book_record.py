@@ -0,0 +1,163 @@
+"""
+Book Record
+Kiểu dữ liệu chung cho một cuốn sách từ extractor tới staging_books, thay cho
+dict 22 khóa tự do:
+- __slots__: không có __dict__ cho mỗi record, thứ tự trường cố định (cột CSV / staging)
+- from_mapping: ép kiểu một lần ở ranh giới đọc vào (dòng CSV, JSON, kết quả hàng đợi);
+  sau đó staging_values() dùng thẳng giá trị, không str() / float() lại ở mỗi bước
+- truy cập kiểu dict (book['title'], book.get(...), items()) để extractor và
+  các module đang dùng book dict không phải đổi
+"""
+import math
+import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from product_url import canonicalize_product_url, product_key
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# (trường, kiểu, mặc định) theo thứ tự cột CSV và STAGING_INSERT_SQL
+BOOK_FIELDS = (
+    ('title', str, ''),
+    ('author', str, ''),
+    ('publisher', str, ''),
+    ('supplier', str, ''),
+    ('category_1', str, 'Sách trong nước'),
+    ('category_2', str, ''),
+    ('category_3', str, ''),
+    ('original_price', float, 0.0),
+    ('discount_price', float, 0.0),
+    ('discount_percent', float, 0.0),
+    ('rating', float, 0.0),
+    ('rating_count', int, 0),
+    ('sold_count', str, ''),
+    ('sold_count_numeric', int, 0),
+    ('publish_year', int, 0),
+    ('language', str, 'Tiếng Việt'),
+    ('page_count', int, 0),
+    ('weight', float, 0.0),
+    ('dimensions', str, ''),
+    ('url', str, ''),
+    ('url_img', str, ''),
+    ('time_collect', str, ''),
+)
+FIELD_NAMES = tuple(name for name, _, _ in BOOK_FIELDS)
+_FIELD_SET = frozenset(FIELD_NAMES)
+# Nguồn không có giá trị thì staging nhận NULL thay vì mặc định
+NULLABLE_FIELDS = frozenset({'publish_year', 'page_count', 'weight'})
+
+
+def _missing(value):
+    if value is None:
+        return True
+    if isinstance(value, float):
+        return math.isnan(value)
+    return isinstance(value, str) and value.strip().lower() in ('', 'nan', 'none')
+
+
+def _to_int(value):
+    # CSV cũ (pandas) ghi cột số nguyên có ô trống thành float: "2020.0"
+    return value if isinstance(value, int) else int(float(value))
+
+
+_PARSERS = {str: str, int: _to_int, float: float}
+
+
+def _parse_time(value):
+    if isinstance(value, datetime):
+        return value.strftime(TIME_FORMAT)
+    try:
+        return datetime.strptime(str(value).strip(), TIME_FORMAT).strftime(TIME_FORMAT)
+    except ValueError:
+        return datetime.now().strftime(TIME_FORMAT)
+
+
+class BookRecord:
+    __slots__ = FIELD_NAMES
+
+    def __init__(self, url='', **fields):
+        """Record với giá trị mặc định (như empty_book); fields được gán nguyên giá trị"""
+        for name, _, default in BOOK_FIELDS:
+            setattr(self, name, default)
+        self.url = canonicalize_product_url(url)
+        self.time_collect = datetime.now().strftime(TIME_FORMAT)
+        for name, value in fields.items():
+            self[name] = value
+
+    @classmethod
+    def from_mapping(cls, data):
+        """
+        Parse dict / dòng csv.DictReader / pandas Series thành BookRecord (ValueError nếu
+        giá trị sai kiểu). Ô trống / NaN -> mặc định, hoặc None với NULLABLE_FIELDS.
+        """
+        if isinstance(data, cls):
+            return data
+        record = cls.__new__(cls)
+        for name, kind, default in BOOK_FIELDS:
+            value = data.get(name)
+            if _missing(value):
+                value = None if name in NULLABLE_FIELDS else default
+            elif type(value) is not kind:
+                value = _PARSERS[kind](value)
+            setattr(record, name, value)
+        record.url = canonicalize_product_url(record.url)
+        record.time_collect = _parse_time(record.time_collect)
+        return record
+
+    def to_dict(self):
+        """Dict cho JSON (cùng 22 khóa như trước)"""
+        return {name: getattr(self, name) for name in FIELD_NAMES}
+
+    def values(self):
+        """Giá trị theo thứ tự FIELD_NAMES (một dòng CSV)"""
+        return [getattr(self, name) for name in FIELD_NAMES]
+
+    def staging_values(self):
+        """Tham số cho STAGING_INSERT_SQL (thêm product_key sau url)"""
+        return (
+            self.title, self.author, self.publisher, self.supplier,
+            self.category_1, self.category_2, self.category_3,
+            self.original_price, self.discount_price, self.discount_percent,
+            self.rating, self.rating_count, self.sold_count, self.sold_count_numeric,
+            self.publish_year, self.language, self.page_count, self.weight, self.dimensions,
+            self.url, product_key(self.url), self.url_img, self.time_collect,
+        )
+
+    # Truy cập kiểu dict
+    def __getitem__(self, name):
+        if name not in _FIELD_SET:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __setitem__(self, name, value):
+        if name not in _FIELD_SET:
+            raise KeyError(f"BookRecord không có trường {name!r}")
+        setattr(self, name, value)
+
+    def __contains__(self, name):
+        return name in _FIELD_SET
+
+    def __iter__(self):
+        return iter(FIELD_NAMES)
+
+    def __len__(self):
+        return len(FIELD_NAMES)
+
+    def get(self, name, default=None):
+        return getattr(self, name) if name in _FIELD_SET else default
+
+    def keys(self):
+        return FIELD_NAMES
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in FIELD_NAMES]
+
+    def __eq__(self, other):
+        if isinstance(other, BookRecord):
+            return self.values() == other.values()
+        return NotImplemented
+
+    def __repr__(self):
+        return f"BookRecord(url={self.url!r}, title={self.title!r})"
@@ -0,0 +1,64 @@
+"""
+Product URL Canonicalization
+Chuẩn hoá URL sản phẩm Fahasa dùng chung cho crawler, load_csv_to_staging và DW:
+bỏ tham số tracking (fhs_campaign, utm_*, ...), lấy slug / ID ổn định và
+sinh product_key CHAR(16) để join thay cho cột TEXT url.
+"""
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+PRODUCT_KEY_LENGTH = 16
+
+TRACKING_PARAM_PREFIXES = ('fhs_', 'utm_')
+TRACKING_PARAMS = {'gclid', 'fbclid', 'ref', 'src'}
+
+PRODUCT_ID_RE = re.compile(r'-(\d{5,})$')
+
+
+def _is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PARAM_PREFIXES)
+
+
+def canonicalize_product_url(url):
+    """
+    https://www.fahasa.com/mua-do-643343.html?fhs_campaign=CATEGORY
+        -> https://www.fahasa.com/mua-do-643343.html
+    """
+    if not url:
+        return ''
+    parts = urlsplit(str(url).strip())
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not _is_tracking_param(k)]
+    return urlunsplit((
+        (parts.scheme or 'https').lower(),
+        parts.netloc.lower(),
+        parts.path.rstrip('/') or '/',
+        urlencode(sorted(query)),
+        ''
+    ))
+
+
+def product_slug(url):
+    """Slug sản phẩm: đoạn cuối của path, không có .html, chữ thường"""
+    path = urlsplit(str(url).strip()).path.rstrip('/')
+    slug = path.rsplit('/', 1)[-1].lower()
+    return slug[:-len('.html')] if slug.endswith('.html') else slug
+
+
+def product_id(url):
+    """ID số ở cuối slug (vd: mua-do-643343 -> '643343'), None nếu không có"""
+    match = PRODUCT_ID_RE.search(product_slug(url))
+    return match.group(1) if match else None
+
+
+def product_key(url):
+    """
+    Khoá cố định 16 ký tự hex = LEFT(MD5(slug), 16).
+    Cùng công thức với cột product_key trong staging / DW (xem product_key_migration.sql).
+    """
+    slug = product_slug(url)
+    if not slug:
+        return None
+    return hashlib.md5(slug.encode('utf-8')).hexdigest()[:PRODUCT_KEY_LENGTH]
@@ -0,0 +1,26 @@
+"""
+State File
+Ghi file trạng thái JSON (data/.crawl_state/*.json) an toàn khi nhiều process
+(sharded crawl, worker phân tán, reparse) cùng lưu: mỗi lần ghi dùng một file tạm
+riêng (tempfile.mkstemp) trong cùng thư mục rồi os.replace, nên không process nào
+đọc phải file ghi dở hay mất file tạm của process khác.
+"""
+import json
+import os
+import tempfile
+
+
+def write_json_atomic(path, data, **dump_kwargs):
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, **dump_kwargs)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
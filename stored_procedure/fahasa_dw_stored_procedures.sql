@@ -515,7 +515,7 @@ BEGIN
     UPDATE dim_books d
     JOIN (
         SELECT 
-            s.url,
+            s.product_key,
             COALESCE(NULLIF(TRIM(s.title), ''), 'Unknown Title') as title,
             COALESCE(NULLIF(TRIM(s.author), ''), 'Unknown Author') as author,
             COALESCE(NULLIF(TRIM(s.publisher), ''), 'Unknown Publisher') as publisher,
@@ -527,8 +527,8 @@ BEGIN
             COALESCE(NULLIF(TRIM(s.dimensions), ''), 'Unknown') as dimensions,
             COALESCE(NULLIF(TRIM(s.url_img), ''), 'no-image.png') as url_img
         FROM fahasa_staging.staging_books s
-        WHERE s.url IS NOT NULL AND TRIM(s.url) != ''
-    ) s ON d.book_nk = s.url
+        WHERE s.product_key IS NOT NULL
+    ) s ON d.product_key = s.product_key
     SET 
         d.is_current = FALSE,
         d.expiry_date = CURRENT_DATE,
@@ -550,6 +550,7 @@ BEGIN
     SET v_expired_records = ROW_COUNT();
     INSERT INTO dim_books (
         book_nk,
+        product_key,
         title,
         author,
         publisher,
@@ -568,6 +569,7 @@ BEGIN
     )
     SELECT DISTINCT
         s.url as book_nk,
+        s.product_key,
         COALESCE(NULLIF(TRIM(s.title), ''), 'Unknown Title') as title,
         COALESCE(NULLIF(TRIM(s.author), ''), 'Unknown Author') as author,
         COALESCE(NULLIF(TRIM(s.publisher), ''), 'Unknown Publisher') as publisher,
@@ -584,11 +586,10 @@ BEGIN
         TRUE as is_current,
         'FAHASA_CRAWLER' as source_system
     FROM fahasa_staging.staging_books s
-    WHERE s.url IS NOT NULL 
-      AND TRIM(s.url) != ''
+    WHERE s.product_key IS NOT NULL
       AND NOT EXISTS (
           SELECT 1 FROM dim_books d
-          WHERE d.book_nk = s.url 
+          WHERE d.product_key = s.product_key
             AND d.is_current = TRUE
             AND d.title = COALESCE(NULLIF(TRIM(s.title), ''), 'Unknown Title')
             AND d.author = COALESCE(NULLIF(TRIM(s.author), ''), 'Unknown Author')
@@ -944,10 +945,9 @@ BEGIN
             END, 1
         ) as batch_id
     FROM fahasa_staging.staging_books s
-    INNER JOIN dim_books db ON s.url = db.book_nk AND db.is_current = TRUE
+    INNER JOIN dim_books db ON s.product_key = db.product_key AND db.is_current = TRUE
     INNER JOIN bridge_book_categories bbc ON db.book_sk = bbc.book_sk AND bbc.is_current = 1
-    WHERE s.url IS NOT NULL 
-      AND TRIM(s.url) != ''
+    WHERE s.product_key IS NOT NULL
       AND s.title IS NOT NULL
       AND TRIM(s.title) != '';
       
@@ -2063,13 +2063,21 @@ BEGIN
     IF v_books_count = 0 THEN
         -- Populate from staging if empty
         INSERT INTO dim_books (
-            book_sk, book_nk, title, author, publisher, supplier, 
+            book_sk, book_nk, product_key, title, author, publisher, supplier, 
             publish_year, language, page_count, weight, dimensions, 
             url, url_img, effective_date, is_current
         )
         SELECT 
             ROW_NUMBER() OVER (ORDER BY s.url) as book_sk,
             s.url as book_nk,
+            -- Cùng công thức với product_key_migration.sql: LEFT(MD5(slug), 16)
+            LEFT(MD5(
+                REGEXP_REPLACE(
+                    LOWER(SUBSTRING_INDEX(TRIM(TRAILING '/' FROM
+                        SUBSTRING_INDEX(SUBSTRING_INDEX(s.url, '#', 1), '?', 1)), '/', -1)),
+                    '\\.html$', ''
+                )
+            ), 16) as product_key,
             COALESCE(s.title, 'Unknown Title') as title,
             COALESCE(s.author, 'Unknown Author') as author,
             COALESCE(s.publisher, 'Unknown Publisher') as publisher,
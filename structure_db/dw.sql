@@ -174,6 +174,7 @@ DROP TABLE IF EXISTS `dim_books`;
 CREATE TABLE `dim_books` (
   `book_sk` int NOT NULL AUTO_INCREMENT,
   `book_nk` varchar(255) COLLATE utf8mb4_unicode_ci NOT NULL,
+  `product_key` char(16) COLLATE utf8mb4_unicode_ci DEFAULT NULL,
   `title` text COLLATE utf8mb4_unicode_ci NOT NULL,
   `author` text COLLATE utf8mb4_unicode_ci,
   `publisher` varchar(255) COLLATE utf8mb4_unicode_ci DEFAULT NULL,
@@ -194,6 +195,7 @@ CREATE TABLE `dim_books` (
   PRIMARY KEY (`book_sk`),
   UNIQUE KEY `uk_book_effective` (`book_nk`,`effective_date`),
   KEY `idx_book_nk` (`book_nk`),
+  KEY `idx_product_key` (`product_key`,`is_current`),
   KEY `idx_is_current` (`is_current`),
   KEY `idx_effective_date` (`effective_date`),
   KEY `idx_publisher` (`publisher`),
@@ -0,0 +1,53 @@
+-- Product key migration
+-- Thêm cột product_key CHAR(16) cho staging_books và dim_books, backfill từ URL hiện có.
+-- product_key = LEFT(MD5(slug), 16) với slug là đoạn cuối path URL, bỏ query/fragment
+-- và đuôi .html, chữ thường (cùng công thức với src/utils/product_url.py).
+-- Join staging <-> DW phải dùng product_key: book_nk của các dòng cũ có thể không phải URL
+-- (sp_update_dim_books_complete ghi ISBN / BOOK_<sk>) hoặc trùng phiên bản theo ngày.
+
+USE fahasa_staging;
+
+ALTER TABLE `staging_books`
+  ADD COLUMN `product_key` char(16) COLLATE utf8mb4_unicode_ci DEFAULT NULL AFTER `url`,
+  ADD KEY `idx_staging_books_product_key` (`product_key`);
+
+-- URL chuẩn: bỏ tham số tracking (?fhs_campaign=...)
+UPDATE `staging_books`
+SET `url` = SUBSTRING_INDEX(SUBSTRING_INDEX(`url`, '#', 1), '?', 1)
+WHERE `url` LIKE '%?%' OR `url` LIKE '%#%';
+
+UPDATE `staging_books`
+SET `product_key` = LEFT(MD5(
+      REGEXP_REPLACE(
+        LOWER(SUBSTRING_INDEX(TRIM(TRAILING '/' FROM `url`), '/', -1)),
+        '\\.html$', ''
+      )
+    ), 16)
+WHERE `url` IS NOT NULL AND TRIM(`url`) != '';
+
+USE fahasa_dw;
+
+ALTER TABLE `dim_books`
+  ADD COLUMN `product_key` char(16) COLLATE utf8mb4_unicode_ci DEFAULT NULL AFTER `book_nk`,
+  ADD KEY `idx_product_key` (`product_key`,`is_current`);
+
+UPDATE `dim_books`
+SET `product_key` = LEFT(MD5(
+      REGEXP_REPLACE(
+        LOWER(SUBSTRING_INDEX(TRIM(TRAILING '/' FROM
+          SUBSTRING_INDEX(SUBSTRING_INDEX(`book_nk`, '#', 1), '?', 1)), '/', -1)),
+        '\\.html$', ''
+      )
+    ), 16)
+WHERE `book_nk` IS NOT NULL AND TRIM(`book_nk`) != '';
+
+-- book_nk / url dạng URL về URL chuẩn như staging. IGNORE: nếu cùng sản phẩm đã có
+-- phiên bản URL chuẩn cùng effective_date (uk_book_effective) thì giữ nguyên dòng cũ,
+-- dòng đó vẫn join được qua product_key.
+UPDATE IGNORE `dim_books`
+SET `book_nk` = SUBSTRING_INDEX(SUBSTRING_INDEX(`book_nk`, '#', 1), '?', 1)
+WHERE `book_nk` LIKE 'http%' AND (`book_nk` LIKE '%?%' OR `book_nk` LIKE '%#%');
+
+UPDATE `dim_books`
+SET `url` = SUBSTRING_INDEX(SUBSTRING_INDEX(`url`, '#', 1), '?', 1)
+WHERE `url` LIKE '%?%' OR `url` LIKE '%#%';
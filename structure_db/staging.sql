@@ -52,13 +52,15 @@ CREATE TABLE `staging_books` (
   `weight` decimal(8,2) DEFAULT NULL,
   `dimensions` varchar(100) COLLATE utf8mb4_unicode_ci DEFAULT NULL,
   `url` text COLLATE utf8mb4_unicode_ci,
+  `product_key` char(16) COLLATE utf8mb4_unicode_ci DEFAULT NULL,
   `url_img` text COLLATE utf8mb4_unicode_ci,
   `time_collect` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
   PRIMARY KEY (`id`),
   KEY `idx_staging_books_time_collect` (`time_collect`),
   KEY `idx_staging_books_author` (`author`),
   KEY `idx_staging_books_category1` (`category_1`),
-  KEY `idx_staging_books_price` (`original_price`)
+  KEY `idx_staging_books_price` (`original_price`),
+  KEY `idx_staging_books_product_key` (`product_key`)
 ) ENGINE=InnoDB AUTO_INCREMENT=41 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 SET @@SESSION.SQL_LOG_BIN = @MYSQLDUMP_TEMP_LOG_BIN;
@@ -0,0 +1,76 @@
+"""
+Test BookRecord: ép kiểu ở from_mapping (dòng CSV, JSON, NaN của pandas) và thứ tự
+tham số staging_values cho STAGING_INSERT_SQL
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'utils'))
+from book_record import FIELD_NAMES, BookRecord
+from product_url import product_key
+
+URL = 'https://www.fahasa.com/nha-gia-kim-tai-ban-2020.html'
+
+
+def csv_row(**overrides):
+    """Dòng csv.DictReader: mọi giá trị là chuỗi"""
+    row = {name: '' for name in FIELD_NAMES}
+    row.update(title='Nhà Giả Kim', url=URL + '?utm_source=home', time_collect='2025-11-25 10:00:00')
+    row.update(overrides)
+    return row
+
+
+def test_from_mapping_coerces_csv_strings():
+    record = BookRecord.from_mapping(csv_row(
+        original_price='79000', discount_price='67150.0', rating='4.5', rating_count='120',
+        sold_count='Đã bán 2.3k', sold_count_numeric='2300', publish_year='2020.0', page_count='227'))
+
+    assert record.original_price == 79000.0 and isinstance(record.original_price, float)
+    assert record.rating_count == 120 and isinstance(record.rating_count, int)
+    # CSV cũ của pandas ghi số nguyên thành "2020.0"
+    assert record.publish_year == 2020
+    assert record.page_count == 227
+    assert record.sold_count == 'Đã bán 2.3k'
+    assert record.url == URL
+    assert record.time_collect == '2025-11-25 10:00:00'
+
+
+def test_from_mapping_defaults_for_missing_values():
+    record = BookRecord.from_mapping({'title': 'Nhà Giả Kim', 'url': URL, 'rating': float('nan'),
+                                      'weight': 'nan', 'category_1': ' '})
+
+    assert record.rating == 0.0
+    assert record.category_1 == 'Sách trong nước'
+    assert record.language == 'Tiếng Việt'
+    assert record.rating_count == 0
+    # Không có giá trị -> NULL trong staging thay vì 0
+    assert record.publish_year is None and record.page_count is None and record.weight is None
+    # time_collect thiếu / sai định dạng: thời điểm parse
+    assert len(record.time_collect) == len('2025-11-25 10:00:00')
+
+
+def test_from_mapping_rejects_bad_values():
+    with pytest.raises(ValueError):
+        BookRecord.from_mapping(csv_row(rating_count='nhiều'))
+    with pytest.raises(ValueError):
+        BookRecord.from_mapping(csv_row(original_price='79.000 đ'))
+
+
+def test_from_mapping_returns_record_unchanged():
+    record = BookRecord(URL, title='Nhà Giả Kim')
+    assert BookRecord.from_mapping(record) is record
+    assert BookRecord.from_mapping(record.to_dict()) == record
+
+
+def test_staging_values_put_product_key_after_url():
+    record = BookRecord.from_mapping(csv_row(original_price='79000', weight='0.25'))
+    values = record.staging_values()
+
+    assert len(values) == len(FIELD_NAMES) + 1
+    url_index = FIELD_NAMES.index('url')
+    assert values[:url_index] == tuple(record.values()[:url_index])
+    assert values[url_index] == URL
+    assert values[url_index + 1] == product_key(URL)
+    assert values[url_index + 2:] == (record.url_img, record.time_collect)
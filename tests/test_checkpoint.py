@@ -0,0 +1,87 @@
+"""
+Test CrawlCheckpoint: ghi nhật ký queued/done/failed/page/segment rồi đọc lại như khi --resume
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'crawler'))
+from checkpoint import CrawlCheckpoint
+
+BOOK_A = 'https://www.fahasa.com/nha-gia-kim.html'
+BOOK_B = 'https://www.fahasa.com/dac-nhan-tam.html'
+BOOK_C = 'https://www.fahasa.com/cay-cam-ngot.html'
+
+
+def write_log(path):
+    checkpoint = CrawlCheckpoint(path).start(target_books=3)
+    try:
+        checkpoint.record_page(2)
+        checkpoint.record_segment('books_part001.jsonl', 'books_part001.csv')
+        checkpoint.record_queued([BOOK_A + '?utm_source=home', BOOK_B, BOOK_C])
+        checkpoint.record_done({'url': BOOK_A})
+        checkpoint.record_failed(BOOK_B + '#reviews')
+        checkpoint.record_page(3)
+    finally:
+        checkpoint.close()
+
+
+def test_reload_restores_queue_and_progress(tmp_path):
+    path = str(tmp_path / 'checkpoint.jsonl')
+    write_log(path)
+
+    checkpoint = CrawlCheckpoint(path)
+    assert checkpoint.exists()
+    try:
+        checkpoint.load()
+        # URL được chuẩn hoá khi ghi; chỉ BOOK_C còn chờ xử lý
+        assert checkpoint.queued == [BOOK_A, BOOK_B, BOOK_C]
+        assert checkpoint.pending == [BOOK_C]
+        assert checkpoint.processed == {BOOK_A, BOOK_B}
+        assert checkpoint.collected == 1
+        assert checkpoint.page == 3
+        assert checkpoint.segments == [('books_part001.jsonl', 'books_part001.csv')]
+        assert checkpoint.is_processed(BOOK_A + '?ref=search')
+        assert not checkpoint.is_processed(BOOK_C)
+    finally:
+        checkpoint.close()
+
+
+def test_reload_ignores_partial_last_line_and_keeps_appending(tmp_path):
+    path = str(tmp_path / 'checkpoint.jsonl')
+    write_log(path)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"type": "done", "url": "https://www.fahasa.com/cay-ca')  # crash giữa chừng
+
+    checkpoint = CrawlCheckpoint(path).load()
+    try:
+        assert checkpoint.pending == [BOOK_C]
+        checkpoint.record_done({'url': BOOK_C})
+    finally:
+        checkpoint.close()
+
+    # Sự kiện ghi sau khi resume nằm trên dòng mới, không dính vào dòng ghi dở
+    resumed = CrawlCheckpoint(path).load()
+    try:
+        assert resumed.pending == []
+        assert resumed.collected == 2
+    finally:
+        resumed.close()
+
+
+def test_duplicate_done_counts_once(tmp_path):
+    path = str(tmp_path / 'checkpoint.jsonl')
+    checkpoint = CrawlCheckpoint(path).start()
+    try:
+        checkpoint.record_queued([BOOK_A])
+        checkpoint.record_done({'url': BOOK_A})
+        checkpoint.record_done({'url': BOOK_A})
+    finally:
+        checkpoint.close()
+
+    reloaded = CrawlCheckpoint(path).load()
+    try:
+        assert reloaded.collected == 1
+    finally:
+        reloaded.close()
+    reloaded.clear()
+    assert not os.path.exists(path)
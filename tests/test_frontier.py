@@ -0,0 +1,71 @@
+"""
+Test Frontier (SQLite tạm trong tmp_path): quyết định tải lại theo tuổi, fingerprint
+listing và lastmod của sitemap
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'crawler'))
+from frontier import Frontier
+
+URL = 'https://www.fahasa.com/nha-gia-kim-tai-ban-2020.html'
+BOOK = {'url': URL, 'title': 'Nhà Giả Kim (Tái Bản 2020)', 'discount_price': 59250.0}
+
+
+@pytest.fixture
+def frontier(tmp_path):
+    frontier = Frontier(str(tmp_path / 'frontier.db'))
+    yield frontier
+    frontier.close()
+
+
+def fetched_hours_ago(frontier, hours):
+    frontier.conn.execute("UPDATE frontier SET last_fetched = ?", (time.time() - hours * 3600,))
+    frontier.conn.commit()
+
+
+def test_new_or_only_discovered_url_needs_fetch(frontier):
+    assert frontier.needs_fetch(URL)
+    frontier.add(URL)
+    assert frontier.needs_fetch(URL)
+    assert frontier.stats() == {'total': 1, 'fetched': 0}
+
+
+def test_needs_fetch_by_age_and_listing_fingerprint(frontier):
+    frontier.mark_fetched(BOOK, listing_fingerprint='fp-1')
+    # URL có tham số tracking trỏ về cùng sản phẩm
+    assert not frontier.needs_fetch(URL + '?fhs_campaign=CATEGORY', fresh_hours=24)
+    assert frontier.needs_fetch(URL, fresh_hours=24, listing_fingerprint='fp-2')
+    assert not frontier.needs_fetch(URL, fresh_hours=24, listing_fingerprint='fp-1')
+
+    fetched_hours_ago(frontier, 30)
+    assert frontier.needs_fetch(URL, fresh_hours=24)
+    assert frontier.needs_fetch(URL, fresh_hours=24, listing_fingerprint='fp-1')
+    # skip_unchanged: listing không đổi thì bỏ qua bất kể tuổi
+    assert not frontier.needs_fetch(URL, fresh_hours=24, listing_fingerprint='fp-1', skip_unchanged=True)
+    assert frontier.needs_fetch(URL, fresh_hours=24, skip_unchanged=True)
+
+
+def test_changed_since(frontier):
+    assert frontier.changed_since(URL, lastmod=None)
+    frontier.mark_fetched(BOOK)
+    fetched_at = frontier.get(URL)['last_fetched']
+
+    assert frontier.changed_since(URL, fetched_at + 60)
+    assert not frontier.changed_since(URL, fetched_at - 60)
+    # Không có lastmod: xét theo fresh_hours
+    assert not frontier.changed_since(URL, None, fresh_hours=24)
+    fetched_hours_ago(frontier, 30)
+    assert frontier.changed_since(URL, None, fresh_hours=24)
+
+
+def test_mark_fetched_counts_content_changes(frontier):
+    frontier.mark_fetched(BOOK)
+    frontier.mark_fetched(dict(BOOK, time_collect='2025-11-20 08:00:00'))
+    frontier.mark_fetched(dict(BOOK, discount_price=55000.0))
+
+    row = frontier.conn.execute("SELECT fetch_count, change_count FROM frontier").fetchone()
+    assert row == (3, 1)
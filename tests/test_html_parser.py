@@ -0,0 +1,108 @@
+"""
+Test html_parser với HTML trang Fahasa lưu sẵn trong tests/fixtures/fahasa (không cần mạng)
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'crawler'))
+from batch_normalizer import apply_to_records, normalize_batch
+from html_parser import parse_book_html, parse_listing_html, parse_listing_items
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'fahasa')
+LISTING_URL = 'https://www.fahasa.com/sach-trong-nuoc.html?order=num_orders&limit=24&p=1'
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def test_parse_book_html_discounted_product():
+    book = parse_book_html(read_fixture('product_nha_gia_kim.html'),
+                           'https://www.fahasa.com/nha-gia-kim-tai-ban-2020.html?fhs_campaign=CATEGORY')
+
+    expected = {
+        'title': 'Nhà Giả Kim (Tái Bản 2020)',
+        'author': 'Paulo Coelho',
+        'publisher': 'NXB Hội Nhà Văn',
+        'supplier': 'Nhã Nam',
+        'category_1': 'Sách trong nước',
+        'category_2': 'Sách Trong Nước',
+        'category_3': 'Văn Học - Tiểu Thuyết',
+        'original_price': 79000.0,
+        'discount_price': 59250.0,
+        'discount_percent': -25.0,
+        'rating': 4.8,
+        'rating_count': 152,
+        'sold_count': '1,2k+',
+        'sold_count_numeric': 1200,
+        'publish_year': 2020,
+        'language': 'Tiếng Việt',
+        'page_count': 227,
+        'weight': 0.22,
+        'dimensions': '20.5 x 13 cm',
+        'url': 'https://www.fahasa.com/nha-gia-kim-tai-ban-2020.html',
+        'url_img': 'https://cdn0.fahasa.com/media/catalog/product/i/m/image_195509_1_36793.jpg',
+    }
+    assert {name: book[name] for name in expected} == expected
+
+
+def test_parse_book_html_without_old_price_or_rating_text():
+    book = parse_book_html(read_fixture('product_no_discount.html'), 'https://www.fahasa.com/dac-nhan-tam-khv.html')
+
+    assert book['title'] == 'Đắc Nhân Tâm'
+    assert book['discount_price'] == 86000.0
+    assert book['original_price'] == 86000.0
+    assert book['discount_percent'] == 0.0
+    assert book['supplier'] == 'First News - Trí Việt'
+    assert book['category_3'] == 'Tâm Lý - Kỹ Năng Sống'
+    # Không có 'X/5': lấy từ độ rộng thanh sao (90% = 4.5)
+    assert book['rating'] == 4.5
+    assert book['rating_count'] == 0
+    assert (book['sold_count'], book['sold_count_numeric']) == ('3.456', 3456)
+    assert (book['publish_year'], book['page_count'], book['weight']) == (2016, 320, 0.3)
+
+
+def test_raw_texts_normalized_as_batch_match_per_page_parse():
+    pages = [('product_nha_gia_kim.html', 'https://www.fahasa.com/nha-gia-kim-tai-ban-2020.html'),
+             ('product_no_discount.html', 'https://www.fahasa.com/dac-nhan-tam-khv.html')]
+    def fields(book):
+        return {name: value for name, value in book.to_dict().items() if name != 'time_collect'}
+
+    expected = [fields(parse_book_html(read_fixture(name), url)) for name, url in pages]
+
+    raws = [{} for _ in pages]
+    books = [parse_book_html(read_fixture(name), url, raw) for (name, url), raw in zip(pages, raws)]
+    assert raws[1]['sold_text'] == 'Đã bán 3.456'
+    apply_to_records(books, normalize_batch(raws)[['sold_count', 'sold_count_numeric', 'weight', 'rating']])
+
+    assert [fields(book) for book in books] == expected
+
+
+def test_parse_book_html_requires_title_and_price():
+    assert parse_book_html('', 'https://www.fahasa.com/a.html') is None
+    assert parse_book_html('<html><body><p>Không có sách</p></body></html>', 'https://www.fahasa.com/a.html') is None
+    assert parse_book_html('<html><body><h1>Sách</h1></body></html>', 'https://www.fahasa.com/a.html') is None
+
+
+def test_parse_listing_items():
+    items = parse_listing_items(read_fixture('listing_sach_trong_nuoc.html'), LISTING_URL)
+
+    # Sản phẩm flashsale bị bỏ, URL tương đối được ghép với trang danh mục và bỏ tham số campaign
+    assert items == [
+        {
+            'url': 'https://www.fahasa.com/nha-gia-kim-tai-ban-2020.html',
+            'title': 'Nhà Giả Kim (Tái Bản 2020)',
+            'price_text': '59.250 đ',
+            'discount_text': '-25%',
+            'sold_text': 'Đã bán 1,2k+',
+        },
+        {
+            'url': 'https://www.fahasa.com/dac-nhan-tam-khv.html',
+            'title': 'Đắc Nhân Tâm',
+            'price_text': '86.000 đ',
+            'discount_text': '',
+            'sold_text': '',
+        },
+    ]
+    assert parse_listing_html(read_fixture('listing_sach_trong_nuoc.html'), LISTING_URL) == [item['url'] for item in items]
@@ -0,0 +1,81 @@
+"""
+Test HTTP engine với mock server của benchmark (benchmarks/mock_fahasa_server.py):
+503 ngẫu nhiên được tải lại thay vì kích hoạt Selenium fallback, và Chrome fallback
+không khởi tạo được chỉ làm hỏng URL đó chứ không dừng lần crawl
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'src', 'crawler'))
+sys.path.append(os.path.join(ROOT, 'benchmarks'))
+from http_fetcher import HttpCrawlSession, get_book_details_http
+from mock_fahasa_server import MockFahasaServer, build_catalog, load_books
+from politeness import AdaptiveDelay
+
+
+class BrokenChrome:
+    """fallback_driver_factory khi máy không có Chrome"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        raise Exception("Không thể khởi tạo ChromeDriver")
+
+
+@pytest.fixture
+def server():
+    books = load_books()
+    if not books:
+        pytest.skip("không có dữ liệu sách trong data/2025/11")
+    mock = MockFahasaServer(build_catalog(books, 20), error_rate=0.15, seed=7).start()
+    try:
+        yield mock
+    finally:
+        mock.stop()
+
+
+def open_session(chrome):
+    # Khoảng chờ rất nhỏ: chỉ cần cơ chế lùi / thử lại, không cần chờ thật
+    politeness = AdaptiveDelay(state_path=None, initial_delay=0.01, min_delay=0.001, max_delay=0.05, jitter=0)
+    return HttpCrawlSession(fallback_driver_factory=chrome, fallback_fetch=lambda driver, url: None,
+                            politeness=politeness)
+
+
+def test_server_errors_are_retried_without_selenium_fallback(server):
+    chrome = BrokenChrome()
+    session = open_session(chrome)
+    try:
+        books = [get_book_details_http(session, f"{server.base_url}/{slug}.html") for slug in server.catalog]
+    finally:
+        session.close()
+
+    stats = server.snapshot()
+    assert stats['errors'] > 0
+    assert all(books)
+    assert stats['product'] == len(server.catalog)
+    assert chrome.calls == 0
+    assert session.politeness.backoffs == stats['errors']
+
+
+def test_fallback_init_failure_counts_as_failed_url(server):
+    server.error_rate = 0
+    chrome = BrokenChrome()
+    session = open_session(chrome)
+    try:
+        # Trang 200 nhưng không phải trang sản phẩm: HTML tĩnh thiếu dữ liệu -> fallback
+        listing = server.listing_url.format(limit=24, page=1)
+        assert get_book_details_http(session, listing) is None
+        assert get_book_details_http(session, listing) is None
+        # Sách bình thường vẫn lấy được sau khi fallback hỏng
+        slug = next(iter(server.catalog))
+        assert get_book_details_http(session, f"{server.base_url}/{slug}.html")
+    finally:
+        session.close()
+
+    # Chrome chỉ được thử khởi tạo một lần cho mỗi session
+    assert chrome.calls == 1
@@ -0,0 +1,38 @@
+"""
+Test http_fetcher.fetch_html với session giả (không cần mạng)
+"""
+import os
+import sys
+
+import requests
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'crawler'))
+from http_fetcher import fetch_html
+
+PAGE = '<html><body><h1>Nhà Giả Kim</h1></body></html>'
+
+
+class FakeSession:
+    def __init__(self, body, content_type):
+        self.body = body
+        self.content_type = content_type
+
+    def get(self, url, timeout=None, headers=None):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers['Content-Type'] = self.content_type
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = self.body
+        return response
+
+
+def test_fetch_html_decodes_utf8_without_charset():
+    html = fetch_html(FakeSession(PAGE.encode('utf-8'), 'text/html'), 'https://www.fahasa.com/a.html')
+    assert 'Nhà Giả Kim' in html
+
+
+def test_fetch_html_keeps_declared_charset():
+    session = FakeSession(PAGE.encode('cp1258', errors='ignore'), 'text/html; charset=windows-1258')
+    html = fetch_html(session, 'https://www.fahasa.com/a.html')
+    assert html == PAGE.encode('cp1258', errors='ignore').decode('cp1258')
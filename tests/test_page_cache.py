@@ -0,0 +1,88 @@
+"""
+Test PageCache (thư mục tạm): TTL, revalidate, LRU theo dung lượng và chế độ offline
+"""
+import base64
+import os
+import random
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'crawler'))
+from http_fetcher import fetch_html
+from page_cache import CacheMiss, PageCache
+
+URL = 'https://www.fahasa.com/nha-gia-kim-tai-ban-2020.html'
+
+
+class NoNetwork:
+    def get(self, *args, **kwargs):
+        raise AssertionError('không được truy cập mạng')
+
+
+def page(seed, size=30000):
+    """HTML ngẫu nhiên (gần như không nén được) để dung lượng trong cache dễ đoán"""
+    noise = base64.b64encode(random.Random(seed).randbytes(size)).decode('ascii')
+    return f'<html><body><h1>Sách {seed}</h1><p>{noise}</p></body></html>'
+
+
+def expire(cache, url, hours):
+    cache.conn.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time() - hours * 3600, url))
+    cache.conn.commit()
+
+
+def test_ttl_and_revalidation(tmp_path):
+    cache = PageCache(str(tmp_path), ttl_hours=24)
+    try:
+        assert cache.lookup(URL) is None
+        cache.store(URL + '?fhs_campaign=CATEGORY', '<h1>Nhà Giả Kim</h1>', etag='"v1"',
+                    last_modified='Thu, 20 Nov 2025 08:00:00 GMT')
+
+        entry = cache.lookup(URL)
+        assert (entry['body'], entry['fresh']) == ('<h1>Nhà Giả Kim</h1>', True)
+
+        expire(cache, URL, 25)
+        entry = cache.lookup(URL)
+        assert not entry['fresh']
+        assert PageCache.conditional_headers(entry) == {
+            'If-None-Match': '"v1"', 'If-Modified-Since': 'Thu, 20 Nov 2025 08:00:00 GMT'
+        }
+        cache.revalidated(URL)
+        assert cache.lookup(URL)['fresh']
+    finally:
+        cache.close()
+
+
+def test_evicts_least_recently_used_page(tmp_path):
+    # Mỗi trang nén ~30 KB: giới hạn 80 KB giữ được hai trang
+    cache = PageCache(str(tmp_path), max_mb=80 / 1024)
+    urls = [f'https://www.fahasa.com/sach-{i}.html' for i in range(3)]
+    try:
+        cache.store(urls[0], page(0))
+        cache.store(urls[1], page(1))
+        cache.conn.execute("UPDATE pages SET last_access = 1 WHERE url = ?", (urls[1],))
+        cache.conn.commit()
+        cache.store(urls[2], page(2))
+
+        assert cache.lookup(urls[1]) is None
+        assert cache.lookup(urls[0])['body'] == page(0)
+        assert cache.lookup(urls[2])['body'] == page(2)
+        objects = [name for _, _, files in os.walk(cache.objects_dir) for name in files]
+        assert len(objects) == 2
+    finally:
+        cache.close()
+
+
+def test_offline_serves_stale_pages_and_raises_cache_miss(tmp_path):
+    cache = PageCache(str(tmp_path), ttl_hours=1, offline=True)
+    try:
+        cache.store(URL, '<h1>Nhà Giả Kim</h1>')
+        expire(cache, URL, 48)
+
+        assert fetch_html(NoNetwork(), URL, cache=cache) == '<h1>Nhà Giả Kim</h1>'
+        with pytest.raises(CacheMiss):
+            fetch_html(NoNetwork(), 'https://www.fahasa.com/dac-nhan-tam-khv.html', cache=cache)
+        assert (cache.hits, cache.misses) == (1, 1)
+    finally:
+        cache.close()
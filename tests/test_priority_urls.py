@@ -0,0 +1,25 @@
+"""
+Test merge_priority_urls: danh sách ưu tiên (checkpoint / revisit / sitemap) không trùng sách
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'crawler'))
+from fahasa_bulk_scraper import merge_priority_urls
+
+A = 'https://www.fahasa.com/nha-gia-kim-tai-ban-2020.html'
+B = 'https://www.fahasa.com/dac-nhan-tam-khv.html'
+C = 'https://www.fahasa.com/cay-cam-ngot-cua-toi.html'
+
+
+def test_merge_keeps_first_occurrence_of_each_canonical_url():
+    pending = [A, A + '?fhs_campaign=CATEGORY']
+    revisit = [B, A]
+    sitemap = [C + '?utm_source=sitemap', B, '']
+
+    assert merge_priority_urls(pending, revisit, sitemap) == [A, B, C]
+
+
+def test_merge_drops_processed_urls():
+    processed = {B}
+    assert merge_priority_urls([A, B + '?fhs_campaign=HOME'], [C], skip=processed.__contains__) == [A, C]
@@ -0,0 +1,39 @@
+"""
+Test product_url: URL chuẩn hoá và product_key (cùng công thức LEFT(MD5(slug), 16) của SQL)
+"""
+import hashlib
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'utils'))
+from product_url import canonicalize_product_url, product_id, product_key, product_slug
+
+CANONICAL = 'https://www.fahasa.com/mua-do-643343.html'
+
+
+def test_canonicalize_strips_tracking_params_and_fragment():
+    assert canonicalize_product_url(CANONICAL + '?fhs_campaign=CATEGORY') == CANONICAL
+    assert canonicalize_product_url(
+        'HTTPS://WWW.Fahasa.com/mua-do-643343.html/?utm_source=fb&gclid=x&fbclid=y#reviews') == CANONICAL
+    # Tham số không phải tracking được giữ lại, sắp xếp theo tên
+    assert (canonicalize_product_url('https://www.fahasa.com/sach-trong-nuoc.html?p=2&order=num_orders&ref=home')
+            == 'https://www.fahasa.com/sach-trong-nuoc.html?order=num_orders&p=2')
+    assert canonicalize_product_url('//www.fahasa.com/mua-do-643343.html') == CANONICAL
+    assert canonicalize_product_url(None) == ''
+
+
+def test_slug_and_product_id():
+    assert product_slug(CANONICAL + '?fhs_campaign=CATEGORY') == 'mua-do-643343'
+    assert product_id(CANONICAL) == '643343'
+    assert product_id('https://www.fahasa.com/nha-gia-kim-tai-ban-2020.html') is None
+
+
+def test_product_key_is_stable_across_url_variants():
+    key = product_key(CANONICAL)
+    assert key == hashlib.md5(b'mua-do-643343').hexdigest()[:16]
+    assert len(key) == 16
+    for variant in (CANONICAL + '?fhs_campaign=CATEGORY', 'http://fahasa.com/Mua-Do-643343.html/',
+                    'https://www.fahasa.com/sach-trong-nuoc/mua-do-643343.html#top'):
+        assert product_key(variant) == key
+    assert product_key('https://www.fahasa.com/dac-nhan-tam-khv.html') != key
+    assert product_key('') is None
@@ -0,0 +1,93 @@
+"""
+Test record_sink: RotatingFileSink ghi JSONL + CSV theo segment, xoay file theo dung lượng,
+FanoutSink chuyển cùng một BookRecord tới mọi sink
+"""
+import csv
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'crawler'))
+from record_sink import RECORD_FIELDS, FanoutSink, RotatingFileSink
+
+
+def book(n):
+    return {
+        'title': f'Sách {n}',
+        'original_price': '100000',
+        'discount_price': 85000,
+        'rating_count': '12',
+        'url': f'https://www.fahasa.com/sach-{n}.html?utm_source=home',
+        'time_collect': '2025-11-25 10:00:00',
+    }
+
+
+class ListSink:
+    def __init__(self):
+        self.records = []
+        self.closed = False
+
+    def write(self, record):
+        self.records.append(record)
+
+    def close(self):
+        self.closed = True
+
+
+def test_rotating_sink_writes_jsonl_and_csv(tmp_path):
+    rotated = []
+    sink = RotatingFileSink(directory=str(tmp_path), on_rotate=lambda j, c: rotated.append((j, c)))
+    try:
+        sink.write(book(1))
+        sink.write(book(2))
+    finally:
+        sink.close()
+
+    assert sink.count == 2
+    assert rotated == sink.segments and len(sink.segments) == 1
+    jsonl_path, csv_path = sink.segments[0]
+    with open(jsonl_path, encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f]
+    assert [r['title'] for r in rows] == ['Sách 1', 'Sách 2']
+    # Đã ép kiểu và chuẩn hoá URL khi ghi
+    assert rows[0]['original_price'] == 100000.0 and rows[0]['rating_count'] == 12
+    assert rows[0]['url'] == 'https://www.fahasa.com/sach-1.html'
+
+    with open(csv_path, encoding='utf-8', newline='') as f:
+        csv_rows = list(csv.reader(f))
+    assert csv_rows[0] == RECORD_FIELDS
+    assert len(csv_rows) == 3
+    assert sink.csv_paths == [csv_path]
+
+
+def test_rotating_sink_rotates_by_size_and_keeps_previous_segments(tmp_path):
+    previous = [('old.jsonl', 'old.csv')]
+    # max_mb rất nhỏ: mỗi record mở một segment mới
+    sink = RotatingFileSink(directory=str(tmp_path), max_mb=0.0001, previous_segments=previous)
+    try:
+        for n in range(3):
+            sink.write(book(n))
+    finally:
+        sink.close()
+
+    assert sink.segments[0] == ('old.jsonl', 'old.csv')
+    new_segments = sink.segments[1:]
+    assert len(new_segments) == 3
+    assert len({jsonl for jsonl, _ in new_segments}) == 3
+    for jsonl_path, csv_path in new_segments:
+        assert os.path.exists(jsonl_path) and os.path.exists(csv_path)
+        with open(jsonl_path, encoding='utf-8') as f:
+            assert len(f.readlines()) == 1
+
+
+def test_fanout_parses_once_for_all_sinks(tmp_path):
+    first, second = ListSink(), ListSink()
+    fanout = FanoutSink(first, None, second)
+    fanout.write(book(1))
+    fanout.close()
+
+    assert fanout.count == 1
+    assert fanout.sink_of(ListSink) is first
+    assert first.records[0] is second.records[0]
+    assert first.records[0].url == 'https://www.fahasa.com/sach-1.html'
+    assert first.closed and second.closed
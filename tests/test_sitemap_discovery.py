@@ -0,0 +1,84 @@
+"""
+Test sitemap_discovery với sitemap lưu sẵn trong tests/fixtures/sitemaps:
+sitemap_index.xml.gz (gzip) trỏ tới một sitemap con xml thường và một sitemap con .xml.gz
+"""
+import os
+import sys
+from datetime import datetime, timezone
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'crawler'))
+from frontier import Frontier
+from sitemap_discovery import (
+    discover_changed_products, iter_sitemap_entries, open_sitemap, parse_lastmod, walk_sitemaps
+)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'sitemaps')
+INDEX = os.path.join(FIXTURES, 'sitemap_index.xml.gz')
+
+
+def epoch(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def test_parse_lastmod():
+    assert parse_lastmod('2025-11-25T03:00:00Z') == epoch(2025, 11, 25, 3)
+    assert parse_lastmod(' 2025-11-20T08:15:00+07:00 ') == epoch(2025, 11, 20, 1, 15)
+    assert parse_lastmod('') is None
+    assert parse_lastmod('hôm qua') is None
+
+
+def test_gzipped_sitemap_index_entries():
+    with open_sitemap(INDEX) as stream:
+        entries = list(iter_sitemap_entries(stream))
+
+    assert entries == [
+        ('sitemap', 'sitemap_products_1.xml', epoch(2025, 11, 20, 1, 15)),
+        ('sitemap', 'sitemap_products_2.xml.gz', epoch(2025, 11, 25)),
+    ]
+
+
+def test_walk_sitemaps_follows_index_into_plain_and_gzipped_children():
+    urls = list(walk_sitemaps([INDEX]))
+
+    assert urls == [
+        ('https://www.fahasa.com/nha-gia-kim-tai-ban-2020.html', epoch(2025, 11, 20, 1, 15)),
+        ('https://www.fahasa.com/dac-nhan-tam-khv.html', datetime(2025, 10, 1).timestamp()),
+        ('https://www.fahasa.com/sach-trong-nuoc/van-hoc-trong-nuoc.html', datetime(2025, 11, 24).timestamp()),
+        ('https://www.fahasa.com/cay-cam-ngot-cua-toi.html', epoch(2025, 11, 25, 3)),
+        ('https://www.fahasa.com/tuoi-tre-dang-gia-bao-nhieu.html', None),
+        ('https://www.fahasa.com/customer/account/login/', None),
+    ]
+    # max_depth=0: chỉ đọc index, không đi vào sitemap con
+    assert list(walk_sitemaps([INDEX], max_depth=0)) == []
+
+
+def test_discover_changed_products_filters_by_lastmod(tmp_path):
+    frontier = Frontier(str(tmp_path / 'frontier.db'))
+    try:
+        for url in ('https://www.fahasa.com/nha-gia-kim-tai-ban-2020.html',
+                    'https://www.fahasa.com/dac-nhan-tam-khv.html',
+                    'https://www.fahasa.com/tuoi-tre-dang-gia-bao-nhieu.html'):
+            frontier.mark_fetched({'url': url, 'title': url})
+        # Hai sách tải lần cuối ngày 01/11; sách không có lastmod vừa tải xong (còn trong fresh_hours)
+        frontier.conn.execute("UPDATE frontier SET last_fetched = ? WHERE url NOT LIKE '%tuoi-tre%'",
+                              (epoch(2025, 11, 1),))
+        frontier.conn.commit()
+
+        urls = discover_changed_products([INDEX], frontier)
+
+        # Sản phẩm chưa từng tải + sản phẩm có lastmod sau lần tải, lastmod mới nhất trước;
+        # trang danh mục và URL không phải sản phẩm bị bỏ
+        assert urls == [
+            'https://www.fahasa.com/cay-cam-ngot-cua-toi.html',
+            'https://www.fahasa.com/nha-gia-kim-tai-ban-2020.html',
+        ]
+        assert discover_changed_products([INDEX], frontier, limit=1) == [
+            'https://www.fahasa.com/cay-cam-ngot-cua-toi.html'
+        ]
+        # fresh_hours=0: sách không có lastmod luôn được crawl lại
+        assert 'https://www.fahasa.com/tuoi-tre-dang-gia-bao-nhieu.html' in discover_changed_products(
+            [INDEX], frontier, fresh_hours=0)
+        # Mọi sản phẩm tìm thấy đều được ghi vào frontier
+        assert frontier.stats() == {'total': 4, 'fetched': 3}
+    finally:
+        frontier.close()
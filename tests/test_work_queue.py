@@ -0,0 +1,99 @@
+"""
+Test SQLiteBroker: lease hết hạn quay lại hàng đợi, quá max_attempts thì dead,
+kết quả hỏng vào dead_results, handler lỗi giữa batch không làm ghi lặp kết quả
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'crawler'))
+from work_queue import SQLiteBroker
+
+URLS = [f'https://www.fahasa.com/sach-{n}.html' for n in range(3)]
+
+
+@pytest.fixture
+def broker(tmp_path):
+    queue = SQLiteBroker(str(tmp_path / 'queue.db'), max_attempts=2)
+    try:
+        yield queue
+    finally:
+        queue.close()
+
+
+def test_put_deduplicates_canonical_urls(broker):
+    assert broker.put(URLS) == 3
+    assert broker.put([URLS[0] + '?utm_source=home', URLS[1] + '#reviews']) == 0
+    assert broker.stats()['ready'] == 3
+
+
+def test_expired_lease_is_released_then_dead(broker):
+    broker.put(URLS[:1])
+    # visibility_timeout âm: lease hết hạn ngay (worker chết)
+    first = broker.lease('worker-a', visibility_timeout=-1)
+    assert [t['attempts'] for t in first] == [1]
+
+    second = broker.lease('worker-b', visibility_timeout=-1)
+    assert second == [{'id': first[0]['id'], 'url': URLS[0], 'attempts': 2}]
+    # Worker cũ mất lease: không ack được nữa
+    assert not broker.complete(first[0]['id'], 'worker-a', {'url': URLS[0], 'title': 'A'})
+    assert not broker.extend(first[0]['id'], 'worker-a')
+
+    # Hết max_attempts: task vào dead thay vì được thuê lại
+    assert broker.lease('worker-c') == []
+    stats = broker.stats()
+    assert stats['dead'] == 1 and stats['results'] == 0
+
+
+def test_nack_retries_until_dead(broker):
+    broker.put(URLS[:1])
+    task = broker.lease('worker-a')[0]
+    broker.nack(task['id'], 'worker-a', error='HTTP 503', retry_delay=0)
+    assert broker.stats()['ready'] == 1
+
+    task = broker.lease('worker-a')[0]
+    broker.nack(task['id'], 'worker-a', error='HTTP 503', retry_delay=0)
+    assert broker.stats()['dead'] == 1
+    assert broker.put(URLS[:1], requeue=True) == 1
+    assert broker.stats()['ready'] == 1
+
+
+def complete_all(broker, owner='worker-a'):
+    for task in broker.lease(owner, count=len(URLS)):
+        assert broker.complete(task['id'], owner, {'url': task['url'], 'title': task['url']})
+
+
+def test_invalid_results_go_to_dead_results(broker):
+    broker.put(URLS)
+    complete_all(broker)
+    broker.conn.execute("UPDATE results SET book = '{\"url\": \"x\", \"rating_count\": \"nhiều\"}' "
+                        "WHERE id = (SELECT MIN(id) FROM results)")
+    broker.conn.commit()
+
+    written = []
+    assert broker.drain_results(written.append) == 2
+    assert [r.url for r in written] == URLS[1:]
+    stats = broker.stats()
+    assert stats['results'] == 0 and stats['dead_results'] == 1 and stats['done'] == 3
+
+
+def test_handler_failure_does_not_redeliver_written_results(broker):
+    broker.put(URLS)
+    complete_all(broker)
+    written, fail_once = [], [URLS[1]]
+
+    def flaky_write(record):
+        if record.url in fail_once:
+            fail_once.remove(record.url)
+            raise OSError('disk full')
+        written.append(record.url)
+
+    with pytest.raises(OSError):
+        broker.drain_results(flaky_write, batch_size=10)
+    assert broker.stats()['results'] == 2
+
+    assert broker.drain_results(flaky_write, batch_size=10) == 2
+    # URLS[0] đã ghi trước lỗi và được ack: không bị ghi lại
+    assert written == URLS
+    assert broker.stats()['results'] == 0
@@ -0,0 +1,58 @@
+"""
+Test DetailWorkerPool: lỗi của session / sink không làm worker chết và wait() không treo
+"""
+import os
+import sys
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'crawler'))
+from worker_pool import CrawlProgress, DetailWorkerPool
+
+URLS = [f'https://www.fahasa.com/sach-{i}.html' for i in range(6)]
+
+
+def run_pool(pool, urls):
+    """Chạy pool trong thread riêng, trả về False nếu wait() treo"""
+    def crawl():
+        with pool:
+            for url in urls:
+                pool.submit(url)
+            pool.wait()
+
+    thread = threading.Thread(target=crawl, daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    return not thread.is_alive()
+
+
+def test_sink_error_counts_url_as_failed_and_keeps_worker_alive():
+    written, failed = [], []
+
+    def on_result(book):
+        if book['url'].endswith('sach-1.html'):
+            raise OSError('disk full')
+        written.append(book['url'])
+
+    progress = CrawlProgress(target=len(URLS))
+    pool = DetailWorkerPool(1, lambda: None, lambda session, url: {'url': url, 'title': url}, progress,
+                            delay_range=None, on_result=on_result, on_failure=failed.append)
+
+    assert run_pool(pool, URLS)
+    assert failed == [URLS[1]]
+    assert written == URLS[:1] + URLS[2:]
+    assert (progress.collected, progress.failed) == (5, 1)
+
+
+def test_session_factory_failure_counts_every_url():
+    def broken_session():
+        raise RuntimeError('no chromedriver')
+
+    failed = []
+    progress = CrawlProgress(target=len(URLS))
+    pool = DetailWorkerPool(2, broken_session, lambda session, url: None, progress,
+                            delay_range=None, on_failure=failed.append, queue_size=2)
+
+    assert run_pool(pool, URLS)
+    assert not pool.alive
+    assert sorted(failed) == sorted(URLS)
+    assert progress.collected == 0
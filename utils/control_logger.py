@@ -227,6 +227,43 @@ class ControlLogger:
             error_message=str(error_message)
         )
     
+    def log_reparse_start(self, records, archive_path, config_id=None):
+        """Log bắt đầu trích xuất lại từ HTML archive (kết thúc dùng log_crawl_success / log_crawl_error)"""
+        return self.log_operation(
+            operation_type="REPARSE_START",
+            status=LogStatus.RUNNING,
+            log_level=LogLevel.INFO,
+            count=records,
+            destination_path=archive_path,
+            location="reparse_archive.py",
+            error_message=f"Re-parsing {records} archived pages",
+            config_id=config_id
+        )
+    
+    def log_crawl_rate(self, rate, delay, config_id=None):
+        """Log tốc độ crawl mà bộ điều khiển politeness đã chọn"""
+        return self.log_operation(
+            operation_type="CRAWL_RATE",
+            status=LogStatus.SUCCESS,
+            log_level=LogLevel.INFO,
+            location="fahasa_bulk_scraper.py",
+            error_message=f"Adaptive delay {delay:.2f}s ({rate:.2f} req/s)",
+            config_id=config_id
+        )
+    
+    def log_field_metrics(self, pages, slowest, path, config_id=None):
+        """Log tổng hợp thời gian trích xuất từng trường (các trường chậm nhất)"""
+        return self.log_operation(
+            operation_type="CRAWL_FIELD_METRICS",
+            status=LogStatus.SUCCESS,
+            log_level=LogLevel.INFO,
+            count=pages,
+            destination_path=path,
+            location="fahasa_bulk_scraper.py",
+            error_message=f"Chậm nhất: {slowest}",
+            config_id=config_id
+        )
+    
     def log_etl_start(self, stage, source_table, target_table, config_id=None):
         """Log bắt đầu ETL"""
         return self.log_operation(